@@ -1,15 +1,22 @@
 """
 Script ULTRA-CONSERVADOR para evitar bloqueos de YouTube
-Pausas muy largas entre descargas para completar los 100 videos sin problemas
+Tasa inicial baja y backoff AIMD ante 429/bloqueos (scripts/subtitle_fetcher.py)
 """
 import os
+import sys
 import json
 import time
-import random
 from youtube_transcript_api import YouTubeTranscriptApi
 from datetime import datetime
 import re
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+from subtitle_fetcher import fetch_all, is_block_error, limiter_for
+
+# Conservador: 1 descarga en vuelo, empieza en 6/min y sube sólo si no hay bloqueos
+CONCURRENCY = 1
+INITIAL_RATE = 0.1
+
 def sanitize_filename(filename):
     """Limpia un nombre de archivo de caracteres no válidos"""
     invalid_chars = '<>:"/\\|?*'
@@ -110,6 +117,8 @@ def download_video_transcript(video_id, video_title, output_dir, video_number, t
         }
         
     except Exception as e:
+        if is_block_error(e):
+            raise  # fetch_all reduce la tasa y reintenta
         error_msg = str(e)
         print(f"✗ ERROR: {error_msg[:80]}...")
         
@@ -172,83 +181,28 @@ def download_batch_conservative():
     print(f"\n{'='*70}")
     print("⚙️  CONFIGURACIÓN ULTRA-CONSERVADORA:")
     print(f"{'='*70}")
-    print("• Pausa entre videos: 10-15 segundos (aleatorio)")
-    print("• Pausa cada 5 videos: 60 segundos")
-    print("• Pausa cada 15 videos: 120 segundos (2 minutos)")
-    print("• Esto tomará tiempo pero evitará bloqueos 100%")
+    print(f"• Descargas simultáneas: {CONCURRENCY}")
+    print(f"• Tasa inicial: {INITIAL_RATE * 60:.0f} videos/min (sube con cada éxito)")
+    print("• Ante 429/bloqueo: tasa a la mitad + pausa exponencial y reintento")
     print(f"{'='*70}")
-    print(f"\n⏱️  Tiempo estimado: ~{len(pending) * 14 / 60:.0f} minutos")
+    print(f"\n⏱️  Tiempo estimado (tasa inicial): ~{len(pending) / (INITIAL_RATE * 60):.0f} minutos")
     print(f"{'='*70}\n")
     
     input("✋ Presiona ENTER para comenzar la descarga lenta y segura...")
     print(f"\n{'='*70}\n")
     
-    # Variables
-    results = []
-    successful = 0
-    failed = 0
-    consecutive_failures = 0
     start_time = time.time()
-    
-    # Procesar pending
-    for idx, video_info in enumerate(pending, 1):
+    jobs = []
+    for video_info in pending:
         original_idx = videos.index(video_info) + 1
-        video_id = video_info['id']
-        video_title = video_info.get('title', f'Video {original_idx}')
-        
-        result = download_video_transcript(
-            video_id,
-            video_title,
-            output_dir,
-            original_idx,
-            len(videos)
-        )
-        
-        results.append(result)
-        
-        if result['success']:
-            successful += 1
-            consecutive_failures = 0
-        else:
-            failed += 1
-            consecutive_failures += 1
-            
-            # Si hay muchos fallos consecutivos, pausar MÁS
-            if consecutive_failures >= 3:
-                print(f"\n⚠️  3 fallos consecutivos. Pausa extendida de 5 minutos...")
-                time.sleep(300)
-                consecutive_failures = 0
-            elif 'blocking' in result.get('error', '').lower():
-                print(f"\n⚠️  Bloqueo detectado. Pausa de 3 minutos...")
-                time.sleep(180)
-        
-        # Progreso
-        total_completed = len(completed) + successful
-        progress = (total_completed / len(videos)) * 100
-        elapsed = (time.time() - start_time) / 60
-        
-        print(f"📊 Global: {total_completed}/{len(videos)} ({progress:.1f}%) | Sesión: ✓{successful} ✗{failed} | Tiempo: {elapsed:.1f}min")
-        
-        # Pausas estratégicas MUY conservadoras
-        if idx < len(pending):
-            if idx % 15 == 0:
-                print(f"\n⏸️  PAUSA LARGA (120 seg) - Checkpoint cada 15 videos...")
-                for i in range(120, 0, -10):
-                    print(f"   {i} segundos...", end='\r')
-                    time.sleep(10)
-                print()
-            elif idx % 5 == 0:
-                print(f"\n⏸️  Pausa media (60 seg) - Checkpoint cada 5 videos...")
-                for i in range(60, 0, -10):
-                    print(f"   {i} segundos...", end='\r')
-                    time.sleep(10)
-                print()
-            else:
-                # Pausa aleatoria 10-15 segundos
-                pause = random.uniform(10, 15)
-                print(f"⏸️  Pausa: {pause:.0f}s...", end=' ')
-                time.sleep(pause)
-                print("✓")
+        jobs.append((video_info['id'], video_info.get('title', f'Video {original_idx}'),
+                     output_dir, original_idx, len(videos)))
+    
+    results = fetch_all(jobs, lambda job: download_video_transcript(*job),
+                        concurrency=CONCURRENCY, rate=INITIAL_RATE)
+    successful = sum(1 for r in results if r['success'])
+    failed = len(results) - successful
+    print(f"\n🚦 Bloqueos detectados: {limiter_for().blocks}")
     
     # Resumen final
     elapsed_total = (time.time() - start_time) / 60
@@ -1,22 +1,38 @@
 """
 MASTER PLAYLIST PROCESSOR
 =========================
-Procesa TODAS las playlists en sequence:
-1. Descarga subtítulos de YouTube
-2. Procesa con IA (DeepSeek) para extraer contenido
+Procesa TODAS las playlists como un grafo de etapas por video:
+
+    descarga de subtítulos ──(sin subtítulos)──> audio ──> Whisper ──┐
+        └──────────────────────────────────────────────── extracción IA ──> consolidación
+
+Cada video avanza solo por el grafo (scripts/pipeline_dag.py): mientras
+uno se transcribe otro se descarga y otro pasa por el LLM. Cada etapa
+tiene su propio número de workers (--download-workers, --whisper-workers,
+...) y las colas se ordenan por el campo 'priority' de PLAYLISTS (y por
+número de video dentro de cada playlist).
 
 Diseñado para correr en background durante varias horas.
-Robusto contra fallos, con reintentos automáticos.
+Robusto contra fallos, con reintentos automáticos por etapa.
 """
 
 import os
 import sys
 import json
 import time
-import subprocess
+import argparse
+import threading
 from pathlib import Path
 from datetime import datetime, timedelta
-from typing import Dict, List, Tuple
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent / 'scripts'))
+import manifest_index
+from manifest_index import get_playlist_counts
+from pipeline_dag import PipelineDAG
+from playlist_catalog import get_playlist
+from subtitle_fetcher import download_transcript, is_block_error, sanitize_filename
+from transcription_backends import AUDIO_EXTENSIONS
 
 # ============================================================================
 # CONFIGURACIÓN
@@ -26,6 +42,7 @@ from typing import Dict, List, Tuple
 PLAYLISTS = [
     {
         'name': 'sefer_yetzirah',
+        'url': 'https://www.youtube.com/playlist?list=PLJMifOLgCzqXAvZhSaWgdSoywAOTYskGi',
         'display': 'Sefer Yetzirah',
         'total_videos': 19,
         'downloaded_key': 'sefer_yetzirah',
@@ -37,6 +54,7 @@ PLAYLISTS = [
     },
     {
         'name': 'tefila',
+        'url': 'https://www.youtube.com/playlist?list=PLJMifOLgCzqXPslhwmh15iQPZuNSPXuWt',
         'display': 'Tefilá',
         'total_videos': 48,
         'downloaded_key': 'tefila',
@@ -48,6 +66,7 @@ PLAYLISTS = [
     },
     {
         'name': 'arbol_vida',
+        'url': 'https://www.youtube.com/playlist?list=PLJMifOLgCzqXLCiy3lO_VflsLmK5mGiVV',
         'display': 'Árbol de la Vida',
         'total_videos': 87,
         'downloaded_key': 'arbol_vida',
@@ -59,6 +78,7 @@ PLAYLISTS = [
     },
     {
         'name': 'secretos_zohar',
+        'url': 'https://www.youtube.com/playlist?list=PLJMifOLgCzqU80cECmKxsC-bfT58x6xwX',
         'display': 'Secretos del Zohar',
         'total_videos': 230,
         'downloaded_key': 'secretos_zohar',
@@ -73,6 +93,7 @@ PLAYLISTS = [
 # Archivos y directorios
 PROGRESS_FILE = Path('download_progress.json')
 OUTPUT_DIR = Path('contenido_procesado')
+AUDIO_DIR = Path('audios')
 LOG_DIR = Path('logs')
 LOG_DIR.mkdir(exist_ok=True)
 
@@ -80,20 +101,35 @@ LOG_DIR.mkdir(exist_ok=True)
 LOG_FILE = LOG_DIR / f'master_processor_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log'
 RETRY_DELAY = 60  # segundos antes de reintentar tras fallo
 
+# Workers por etapa (cada una con su pool; todas corren a la vez)
+STAGE_WORKERS = {
+    'download': 2,      # YouTube: pocas, y la etapa se pausa si hay bloqueo
+    'audio': 2,
+    'whisper': 1,       # cada worker carga su propio modelo
+    'extract': 2,       # solicitudes en vuelo contra el proveedor IA
+    'consolidate': 1,   # en lote: varios videos terminados = una consolidación
+}
+WHISPER_BACKEND = os.getenv('WHISPER_BACKEND', 'faster-whisper')
+WHISPER_MODEL = os.getenv('WHISPER_MODEL', 'medium')
+AUDIO_FORMAT = 'opus'   # 16 kHz mono: listo para Whisper y mucho más liviano que MP3
+
 # ============================================================================
 # FUNCIONES DE LOGGING
 # ============================================================================
 
+_log_lock = threading.Lock()
+
 def log(msg: str, level: str = 'INFO'):
-    """Log con timestamp a archivo y consola"""
+    """Log con timestamp a archivo y consola (varios workers escriben a la vez)"""
     timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     log_msg = f"[{timestamp}] [{level}] {msg}"
     
-    print(log_msg)
-    sys.stdout.flush()
-    
-    with open(LOG_FILE, 'a', encoding='utf-8') as f:
-        f.write(log_msg + '\n')
+    with _log_lock:
+        print(log_msg)
+        sys.stdout.flush()
+        
+        with open(LOG_FILE, 'a', encoding='utf-8') as f:
+            f.write(log_msg + '\n')
 
 def log_section(title: str):
     """Log de sección con formato"""
@@ -106,270 +142,300 @@ def log_section(title: str):
 # FUNCIONES DE ESTADO
 # ============================================================================
 
-def get_download_status(playlist: Dict) -> Tuple[int, int]:
-    """Obtiene estado de descarga de una playlist"""
-    if not PROGRESS_FILE.exists():
-        return 0, playlist['total_videos']
-    
+def get_ai_processing_status(playlist: Dict) -> Tuple[int, int]:
+    """Obtiene cuántos videos de esta playlist ya fueron procesados con IA"""
+    # El manifest asigna cada *_extracted.json a su playlist por el nombre de
+    # la transcripción (sin globs ni diferencias de conjuntos entre patrones)
+    counts = get_playlist_counts(Path(playlist['transcript_dir']).name)
+    processed = counts['processed']
+    total_transcripts = counts['subtitles']
+
+    pending = max(0, total_transcripts - processed)
+
+    return min(processed, playlist['total_videos']), pending
+
+def get_playlist_videos(playlist: Dict) -> List[Dict[str, str]]:
+    """[{'id', 'title'}] desde el catálogo compartido; si YouTube falla, los IDs de download_progress.json"""
+    videos = get_playlist(playlist['url'])
+    if videos:
+        return videos
+
     try:
         with open(PROGRESS_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        key = playlist['downloaded_key']
-        if key not in data:
-            return 0, playlist['total_videos']
-        
-        downloaded = len(data[key].get('downloaded', []))
-        pending = playlist['total_videos'] - downloaded
-        return downloaded, pending
-        
+            video_ids = json.load(f)[playlist['downloaded_key']]['video_ids']
+        log(f"⚠️ {playlist['display']}: sin respuesta de YouTube, usando download_progress.json", 'WARNING')
+        return [{'id': vid, 'title': f"{playlist['display']} - Video {i}"} for i, vid in enumerate(video_ids, 1)]
     except Exception as e:
-        log(f"Error leyendo progreso de descarga: {e}", 'ERROR')
-        return 0, playlist['total_videos']
+        log(f"✗ {playlist['display']}: no se pudo obtener la lista de videos ({e})", 'ERROR')
+        return []
 
-def get_ai_processing_status(playlist: Dict) -> Tuple[int, int]:
-    """Obtiene cuántos videos de esta playlist ya fueron procesados con IA"""
-    if not OUTPUT_DIR.exists():
-        return 0, playlist['total_videos']
-    
-    # Contar archivos procesados específicos de la playlist
-    pattern = playlist.get('file_pattern', '*_extracted.json')
-    
-    # Special case for secretos_zohar which might overlap with others if using *
-    if playlist['name'] == 'secretos_zohar':
-        # Count all minus known others, or rely on specific naming if possible
-        # Currently tracking via specific excludes might be safer
-        all_files = set(OUTPUT_DIR.glob('*_extracted.json'))
-        known_others = set()
-        for p in PLAYLISTS:
-            if p['name'] != 'secretos_zohar':
-                known_others.update(OUTPUT_DIR.glob(p['file_pattern']))
-        
-        processed_files = list(all_files - known_others)
-    else:
-        processed_files = list(OUTPUT_DIR.glob(pattern))
-    
-    processed = len(processed_files)
-    
-    # Para esta playlist específica, necesitamos ver cuántos JSONs hay en transcripciones
+def files_by_index(folder: Path, suffixes: Tuple[str, ...]) -> Dict[str, Path]:
+    """{'NNN': archivo} de los archivos con esas extensiones (un solo listado por carpeta)"""
+    if not folder.exists():
+        return {}
+    return {
+        path.name[:3]: path for path in sorted(folder.iterdir())
+        if path.suffix in suffixes and path.name[:3].isdigit() and not path.name.endswith('.part')
+    }
+
+def audio_folder(playlist: Dict) -> Path:
+    return AUDIO_DIR / Path(playlist['transcript_dir']).name
+
+def plan_playlist(playlist: Dict, extracted: set) -> List[Tuple[str, Dict[str, Any]]]:
+    """Tareas iniciales de una playlist: cada video entra al grafo en la etapa donde quedó"""
     transcript_dir = Path(playlist['transcript_dir'])
-    if transcript_dir.exists():
-        # Buscar tanto .json como .json3
-        json_files = list(transcript_dir.glob('*.json')) + list(transcript_dir.glob('*.json3'))
-        total_transcripts = len(json_files)
-    else:
-        total_transcripts = 0
-    
-    pending = max(0, total_transcripts - processed)
-    
-    return min(processed, playlist['total_videos']), pending
+    transcripts = files_by_index(transcript_dir, ('.json', '.json3'))
+    audios = files_by_index(audio_folder(playlist), AUDIO_EXTENSIONS)
+    # ERROR_NNN_<id>.txt: YouTube ya respondió que ese video no tiene subtítulos
+    no_subs = {path.name[6:9] for path in transcript_dir.glob('ERROR_*')} if transcript_dir.exists() else set()
+
+    tasks = []
+    for number, video in enumerate(get_playlist_videos(playlist), 1):
+        key = f"{number:03d}"
+        task = {
+            'playlist': playlist,
+            'video': video,
+            'number': number,
+            'priority': (playlist['priority'], number),
+            'label': f"{playlist['name']} #{key}",
+        }
+        if key in transcripts:
+            task['stem'] = transcripts[key].stem
+            if task['stem'] in extracted:
+                continue
+            tasks.append(('extract', task))
+        elif key in audios:
+            task['audio'] = audios[key]
+            tasks.append(('whisper', task))
+        elif key in no_subs:
+            tasks.append(('audio', task))
+        else:
+            tasks.append(('download', task))
+    return tasks
 
 # ============================================================================
-# FUNCIONES DE PROCESAMIENTO
+# ETAPAS (cada una recibe la tarea de un video y devuelve la siguiente etapa)
 # ============================================================================
 
-def download_playlist_subtitles(playlist: Dict) -> bool:
-    """Descarga subtítulos de una playlist"""
-    log_section(f"Descargando: {playlist['display']}")
-    
-    downloaded, pending = get_download_status(playlist)
-    
-    log(f"Estado: {downloaded}/{playlist['total_videos']} descargados, {pending} pendientes")
-    
-    if pending == 0:
-        log(f"✓ {playlist['display']} ya está completamente descargado", 'SUCCESS')
-        return True
-    
-    # Usar el script correcto que usa download_progress.json
-    cmd = [
-       sys.executable,
-        'scripts/download_all_playlists.py'
-    ]
-    
-    log(f"Ejecutando: {' '.join(cmd)}")
-    log(f"Tiempo estimado: ~{playlist['est_download_mins']} minutos")
-    
-    try:
-        start_time = time.time()
-        
-        # Ejecutar mostrando output en tiempo real
-        result = subprocess.run(cmd)
-        
-        duration = (time.time() - start_time) / 60
-        
-        if result.returncode == 0:
-            log(f"✓ Descarga completada en {duration:.1f} minutos", 'SUCCESS')
-            return True
-        else:
-            log(f"✗ Descarga falló (código {result.returncode})", 'ERROR')
-            return False
-            
-    except Exception as e:
-        log(f"✗ Error ejecutando descarga: {e}", 'ERROR')
-        return False
+_extractor = None
+_extractor_lock = threading.Lock()
+_whisper = threading.local()
 
-def process_playlist_with_ai(playlist: Dict) -> bool:
-    """Procesa transcripciones de una playlist con IA"""
-    log_section(f"Procesando con IA: {playlist['display']}")
+def load_extractor():
+    """extract_content_ai se importa al primer uso (crea el cliente OpenAI/Ollama)"""
+    global _extractor
+    with _extractor_lock:
+        if _extractor is None:
+            import extract_content_ai
+            _extractor = extract_content_ai
+    return _extractor
 
-    # ========================================================================
-    # REMOTE WHISPER SYNC INTEGRATION
-    # ========================================================================
-    if playlist['name'] == 'secretos_zohar':
-        log("🔄 Sincronizando transcripciones remotas (Whisper Server)...")
+def build_dag(workers: Dict[str, int]) -> PipelineDAG:
+    """Grafo download -> (audio -> whisper) -> extract -> consolidate
+
+    Con workers['whisper'] == 0 no se crean las etapas de audio: los videos
+    sin subtítulos se informan y quedan fuera.
+    """
+    dag = PipelineDAG(retry_delay=RETRY_DELAY, log=log)
+    use_whisper = workers['whisper'] > 0
+
+    def download(task):
+        playlist, video = task['playlist'], task['video']
+        os.makedirs(playlist['transcript_dir'], exist_ok=True)
         try:
-             # Ensure scripts module can be imported
-             sys.path.append(str(Path.cwd()))
-             from scripts.remote_whisper_client import sync_remote_transcripts
-             count = sync_remote_transcripts()
-             log(f"✓ Sincronización completada: {count} nuevos archivos descargados")
+            result = download_transcript(video['id'], video['title'], playlist['transcript_dir'], task['number'],
+                                         Path(playlist['transcript_dir']).name)
         except Exception as e:
-             log(f"⚠️ Error sincronizando: {e}", 'ERROR')
-    # ========================================================================
-    
-    processed, pending = get_ai_processing_status(playlist)
-    
-    log(f"Estado: {processed} procesados, ~{pending} pendientes")
-    
-    if pending == 0:
-        log(f"✓ {playlist['display']} ya está completamente procesado", 'SUCCESS')
-        return True
-    
-    # Comando para procesar con IA
-    cmd = [
-        sys.executable,
-        'scripts/extract_content_ai.py',
-        '--playlist', playlist['name']
-    ]
-    
-    log(f"Ejecutando: {' '.join(cmd)}")
-    log(f"Tiempo estimado: ~{playlist['est_ai_mins']} minutos")
-    
-    try:
-        start_time = time.time()
-        
-        # Ejecutar mostrando output en tiempo real
-        result = subprocess.run(cmd)
-        
-        duration = (time.time() - start_time) / 60
-        
-        if result.returncode == 0:
-            log(f"✓ Procesamiento IA completado en {duration:.1f} minutos", 'SUCCESS')
-            return True
-        else:
-            log(f"✗ Procesamiento IA falló (código {result.returncode})", 'ERROR')
-            return False
-            
-    except Exception as e:
-        log(f"✗ Error ejecutando procesamiento IA: {e}", 'ERROR')
-        return False
+            if is_block_error(e):
+                dag.pause('download', RETRY_DELAY)
+            raise
+        if result['success']:
+            task['stem'] = f"{task['number']:03d}_{sanitize_filename(video['title'])}"
+            return 'extract'
+        if not use_whisper:
+            log(f"⏭️ {task['label']}: sin subtítulos (etapa Whisper desactivada)")
+            return None
+        return 'audio'
+
+    def audio(task):
+        from download_audio import download_audio, find_audio
+        video = task['video']
+        folder = audio_folder(task['playlist'])
+        folder.mkdir(parents=True, exist_ok=True)
+        try:
+            success, msg = download_audio(video['id'], folder, task['number'], video['title'],
+                                          audio_format=AUDIO_FORMAT)
+        except Exception as e:
+            if is_block_error(e):
+                dag.pause('audio', RETRY_DELAY)
+            raise
+        path = find_audio(folder, task['number']) if success else None
+        if path is None:
+            raise RuntimeError(msg if not success else "audio no encontrado tras la descarga")
+        manifest_index.mark_audio(folder.name, path.stem, True, path.stat().st_size, path.suffix[1:])
+        task['audio'] = path
+        return 'whisper'
+
+    def whisper(task):
+        from transcription_backends import load_backend, write_transcript_files
+        # Un modelo por worker, cargado una sola vez
+        if getattr(_whisper, 'engine', None) is None:
+            log(f"📥 Cargando modelo '{WHISPER_MODEL}' ({WHISPER_BACKEND}) en {threading.current_thread().name}")
+            _whisper.engine = load_backend(WHISPER_BACKEND, WHISPER_MODEL)
+        path = task['audio']
+        folder = Path(task['playlist']['transcript_dir'])
+        folder.mkdir(parents=True, exist_ok=True)
+        result = _whisper.engine.transcribe(path, language='es')
+        write_transcript_files(result, folder / f"{path.stem}.srt", folder / f"{path.stem}.json")
+        manifest_index.mark_transcript(folder.name, path.stem, 'whisper')
+        task['stem'] = path.stem
+        return 'extract'
+
+    def extract(task):
+        folder = Path(task['playlist']['transcript_dir'])
+        json_file = next((folder / f"{task['stem']}{suffix}" for suffix in ('.json', '.json3')
+                          if (folder / f"{task['stem']}{suffix}").exists()), None)
+        if json_file is None:
+            raise RuntimeError(f"transcripción no encontrada: {task['stem']}")
+        result = load_extractor().process_video(json_file, task['playlist']['name'])
+        if not result:
+            raise RuntimeError("extracción fallida")
+        return 'consolidate'
+
+    def consolidate(tasks):
+        import consolidate_zohar_data
+        log(f"🗂️ Consolidando ({len(tasks)} videos nuevos)...")
+        consolidate_zohar_data.consolidate()
+        return None
+
+    dag.add_stage('download', download, workers['download'])
+    if use_whisper:
+        dag.add_stage('audio', audio, workers['audio'])
+        dag.add_stage('whisper', whisper, workers['whisper'])
+    dag.add_stage('extract', extract, workers['extract'])
+    dag.add_stage('consolidate', consolidate, workers['consolidate'], batch=True)
+    return dag
 
 # ============================================================================
 # FUNCIÓN PRINCIPAL
 # ============================================================================
 
 def main():
-    """Procesa todas las playlists secuencialmente"""
-    
+    """Procesa todas las playlists como un grafo de etapas por video"""
+    parser = argparse.ArgumentParser(description='Descarga, transcripción y extracción IA de todas las playlists')
+    parser.add_argument('--playlists', nargs='+', choices=[p['name'] for p in PLAYLISTS], default=None,
+                        help='Playlists a procesar (default: todas)')
+    for stage, default in STAGE_WORKERS.items():
+        if stage != 'consolidate':
+            parser.add_argument(f'--{stage}-workers', type=int, default=default,
+                                help=f'Workers de la etapa {stage} (default: {default})')
+    parser.add_argument('--no-whisper', action='store_true',
+                        help='No descargar audio ni transcribir los videos sin subtítulos')
+    parser.add_argument('--dry-run', action='store_true', help='Mostrar en qué etapa entra cada video y salir')
+    args = parser.parse_args()
+
+    workers = {stage: getattr(args, f'{stage}_workers', default) for stage, default in STAGE_WORKERS.items()}
+    if args.no_whisper:
+        workers['whisper'] = 0
+    playlists = sorted((p for p in PLAYLISTS if not args.playlists or p['name'] in args.playlists),
+                       key=lambda p: p['priority'])
+
     log_section("MASTER PLAYLIST PROCESSOR - INICIANDO")
     log(f"Directorio de trabajo: {os.getcwd()}")
     log(f"Archivo de log: {LOG_FILE}")
-    log(f"Total de playlists: {len(PLAYLISTS)}")
-    
-    # Calcular tiempo total estimado
-    total_download_mins = sum(p['est_download_mins'] for p in PLAYLISTS)
-    total_ai_mins = sum(p['est_ai_mins'] for p in PLAYLISTS)
-    total_mins = total_download_mins + total_ai_mins
-    
+    log(f"Total de playlists: {len(playlists)}")
+    log("Workers por etapa: " + ", ".join(f"{stage}={n}" for stage, n in workers.items()))
+
+    # Las etapas se solapan: el total se acerca a la más lenta, no a la suma
+    total_mins = max(sum(p['est_download_mins'] for p in playlists), sum(p['est_ai_mins'] for p in playlists))
     log(f"Tiempo estimado total: ~{total_mins} minutos ({total_mins/60:.1f} horas)")
-    
+
     estimated_completion = datetime.now() + timedelta(minutes=total_mins)
     log(f"Finalización estimada: {estimated_completion.strftime('%Y-%m-%d %H:%M:%S')}")
-    
+
     log("")
     log("IMPORTANTE: Este proceso puede tomar varias horas.")
     log("Puede dejarlo corriendo en background de forma segura.")
     log("Para monitorear progreso, use: Get-Content -Path logs\\*.log -Tail 50 -Wait")
     log("")
-    
-    # Iniciar automáticamente (diseñado para correr en background)
-    log("Iniciando proceso automáticamente en 3 segundos...")
-    time.sleep(3)
-    
-    overall_start = time.time()
-    
+
     # ========================================================================
-    # FASE 1: DESCARGAS
+    # REMOTE WHISPER SYNC INTEGRATION
     # ========================================================================
-    
-    log_section("FASE 1: DESCARGA DE SUBTÍTULOS")
-    
-    for playlist in PLAYLISTS:
-        success = False
-        retries = 0
-        max_retries = 3
-        
-        while not success and retries < max_retries:
-            if retries > 0:
-                log(f"Reintento {retries}/{max_retries} para {playlist['display']}")
-                time.sleep(RETRY_DELAY)
-            
-            success = download_playlist_subtitles(playlist)
-            
-            if not success:
-                retries += 1
-        
-        if not success:
-            log(f"✗ FALLO CRÍTICO: No se pudo descargar {playlist['display']} después de {max_retries} intentos", 'ERROR')
-            log("Continuando con siguiente playlist...")
-        
-        # Pausa entre playlists
-        log("Pausa de 30 segundos antes de siguiente playlist...")
-        time.sleep(30)
-    
+    if any(p['name'] == 'secretos_zohar' for p in playlists) and not args.dry_run:
+        log("🔄 Sincronizando transcripciones remotas (Whisper Server)...")
+        try:
+            from remote_whisper_client import sync_remote_transcripts
+            count = sync_remote_transcripts()
+            log(f"✓ Sincronización completada: {count} nuevos archivos descargados")
+        except Exception as e:
+            log(f"⚠️ Error sincronizando: {e}", 'ERROR')
+
     # ========================================================================
-    # FASE 2: PROCESAMIENTO CON IA
+    # PLAN: cada video entra en la etapa donde quedó
     # ========================================================================
-    
-    log_section("FASE 2: PROCESAMIENTO CON IA")
-    
-    for playlist in PLAYLISTS:
-        success = False
-        retries = 0
-        max_retries = 3
-        
-        while not success and retries < max_retries:
-            if retries > 0:
-                log(f"Reintento {retries}/{max_retries} para {playlist['display']}")
-                time.sleep(RETRY_DELAY)
-            
-            success = process_playlist_with_ai(playlist)
-            
-            if not success:
-                retries += 1
-        
-        if not success:
-            log(f"✗ FALLO CRÍTICO: No se pudo procesar {playlist['display']} con IA después de {max_retries} intentos", 'ERROR')
-            log("Continuando con siguiente playlist...")
-        
-        # Pausa entre playlists
-        log("Pausa de 10 segundos antes de siguiente playlist...")
-        time.sleep(10)
-    
+
+    log_section("PLANIFICANDO")
+    extracted = ({path.name[:-len('_extracted.json')] for path in OUTPUT_DIR.glob('*_extracted.json')}
+                 if OUTPUT_DIR.exists() else set())
+    plan = []
+    for playlist in playlists:
+        tasks = plan_playlist(playlist, extracted)
+        by_stage = {}
+        for stage, _ in tasks:
+            by_stage[stage] = by_stage.get(stage, 0) + 1
+        summary = ", ".join(f"{stage}: {n}" for stage, n in by_stage.items()) or "nada pendiente"
+        log(f"{playlist['display']} (prioridad {playlist['priority']}): {summary}")
+        plan.extend(tasks)
+
+    if not workers['whisper']:
+        skipped = [task for stage, task in plan if stage in ('audio', 'whisper')]
+        if skipped:
+            log(f"⏭️ {len(skipped)} videos sin subtítulos quedan fuera (--no-whisper)")
+        plan = [(stage, task) for stage, task in plan if stage not in ('audio', 'whisper')]
+
+    if args.dry_run:
+        return
+
+    if not plan:
+        log("✓ Todas las playlists ya están procesadas", 'SUCCESS')
+        return
+
+    if not load_extractor().provider_ready():
+        log("✗ El proveedor IA no está disponible; abortando", 'ERROR')
+        sys.exit(1)
+
+    # ========================================================================
+    # EJECUCIÓN: todas las etapas a la vez
+    # ========================================================================
+
+    log_section(f"PROCESANDO {len(plan)} VIDEOS")
+    overall_start = time.time()
+
+    dag = build_dag(workers)
+    for stage, task in plan:
+        dag.submit(stage, task)
+    stats = dag.run()
+
     # ========================================================================
     # RESUMEN FINAL
     # ========================================================================
-    
+
     overall_duration = (time.time() - overall_start) / 60
-    
+
     log_section("PROCESO COMPLETADO")
     log(f"Duración total: {overall_duration:.1f} minutos ({overall_duration/60:.1f} horas)")
     log(f"Archivo de log completo: {LOG_FILE}")
-    
+    for stage, counter in stats.items():
+        log(f"   {stage:<12} {counter['done']} ok, {counter['retried']} reintentos, {counter['failed']} fallidos")
+    for playlist in playlists:
+        processed, pending = get_ai_processing_status(playlist)
+        log(f"   {playlist['display']}: {processed} procesados, {pending} pendientes")
+
     # Estadísticas finales
     total_processed = len(list(OUTPUT_DIR.glob('*_extracted.json'))) if OUTPUT_DIR.exists() else 0
     log(f"Total de archivos procesados: {total_processed}")
-    
+
     log("")
     log("✓ Master Playlist Processor finalizado exitosamente")
     log("Revise los logs para detalles completos")
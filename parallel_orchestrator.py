@@ -6,10 +6,15 @@ import os
 from datetime import datetime
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent / 'scripts'))
+from manifest_index import get_counts
+from stage_queue import pending_counts, EXTRACT
+
 # Configuración
 SCRIPTS_DIR = Path("scripts")
 LOG_DIR = Path("logs")
 LOG_DIR.mkdir(exist_ok=True)
+AI_WORKERS = 2  # Solicitudes en paralelo contra Ollama
 
 def run_downloader():
     """Ejecuta el proceso de descarga continuo"""
@@ -46,36 +51,34 @@ def run_downloader():
                 time.sleep(30)
 
 def run_processor_ollama():
-    """Ejecuta el proceso de extracción IA continuo"""
+    """Ejecuta el proceso de extracción IA continuo
+    
+    Un único extract_content_ai.py --follow que escucha la cola de etapas
+    (stage_queue): cada subtítulo o transcripción Whisper terminada se
+    extrae en segundos, sin re-ejecutar el script por playlist ni esperar
+    ciclos de 120 s. Sólo se relanza si el proceso termina.
+    """
     log_file = LOG_DIR / f"processor_ai_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
     print(f"[PROCESSOR] Iniciando proceso IA con Ollama... (Log: {log_file})")
     
-    # Procesar playlist por playlist
-    playlists = ['sefer_yetzirah', 'arbol_vida', 'tefila', 'secretos_zohar']
-    
-    cmd_base = [sys.executable, "-u", str(SCRIPTS_DIR / "extract_content_ai.py")]
+    cmd = [sys.executable, "-u", str(SCRIPTS_DIR / "extract_content_ai.py"),
+           "--follow", "--workers", str(AI_WORKERS)]
     
     with open(log_file, "w", encoding='utf-8') as f:
         while True:
-            for playlist in playlists:
-                f.write(f"\n[PROCESSOR] Procesando playlist: {playlist}\n")
+            try:
+                proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, encoding='utf-8')
                 
-                cmd = cmd_base + ["--playlist", playlist]
+                for line in proc.stdout:
+                    f.write(line)
+                    f.flush()
                 
-                try:
-                    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, encoding='utf-8')
-                    
-                    for line in proc.stdout:
-                        f.write(line)
-                        f.flush()
-                    
-                    proc.wait()
-                    
-                except Exception as e:
-                    f.write(f"\n[PROCESSOR] Error en {playlist}: {e}\n")
-            
-            f.write("\n[PROCESSOR] Ciclo de todas las playlists completado. Esperando 120s antes de reiniciar...\n")
-            time.sleep(120)
+                proc.wait()
+                f.write(f"\n[PROCESSOR] El consumidor terminó (código {proc.returncode}). Relanzando en 30s...\n")
+                
+            except Exception as e:
+                f.write(f"\n[PROCESSOR] Excepción: {e}\n")
+            time.sleep(30)
 
 def monitor_progress():
     """Monitorea el estado de las carpetas"""
@@ -85,41 +88,24 @@ def monitor_progress():
         print(f"  MONITOR DE PROCESO PARALELO - {datetime.now().strftime('%H:%M:%S')}")
         print("="*60)
         
-        # Contar archivos
-        base_dir = Path("transcripciones")
-        output_dir = Path("contenido_procesado")
-        
+        # Conteos desde el manifest (lo actualizan los procesos de descarga e IA)
         print(f"{'PLAYLIST':<20} | {'DESCARGADOS':<12} | {'PROCESADOS IA':<12}")
         print("-" * 50)
         
         total_dl = 0
         total_ai = 0
         
-        if base_dir.exists():
-            for d in base_dir.iterdir():
-                if d.is_dir():
-                    # Contar json y json3
-                    dl_count = len(list(d.glob("*.json"))) + len(list(d.glob("*.json3")))
-                    
-                    # Contar procesados (esto es aproximado, idealmente leeríamos metadata)
-                    # El script extract_content_ai guarda como {source_stem}_extracted.json
-                    # Podemos buscar cuántos extracted coinciden con archivos de esta carpeta
-                    ai_count = 0
-                    if output_dir.exists():
-                        # Un método simple es contar por prefijo si los nombres de archivo son únicos
-                        # O simplemente contar totales globales por ahora para velocidad
-                        pass 
-                    
-                    print(f"{d.name:<20} | {dl_count:<12} | {'?':<12}")
-                    total_dl += dl_count
+        for playlist, counts in get_counts().items():
+            total_ai += counts['processed']
+            if not playlist:
+                continue  # Procesados sin transcripción conocida: sólo cuentan en el total
+            print(f"{playlist:<20} | {counts['subtitles']:<12} | {counts['processed']:<12}")
+            total_dl += counts['subtitles']
         
         print("-" * 50)
         
-        # Contar total procesado real
-        if output_dir.exists():
-            total_ai = len(list(output_dir.glob("*_extracted.json")))
-        
         print(f"TOTAL GLOBAL: Descargados: {total_dl} | Procesados IA: {total_ai}")
+        print(f"En cola para IA: {pending_counts().get(EXTRACT, 0)}")
         print("\nPresiona Ctrl+C para detener todo.")
         
         time.sleep(10)
@@ -11,8 +11,9 @@ from typing import List
 import time
 
 sys.path.insert(0, str(Path(__file__).parent))
-from state_manager import load_state, mark_completed, increment_stat, update_phase
+from state_manager import load_state, mark_completed, increment_stat, update_phase, transaction
 from extract_content_ai import load_transcription
+import manifest_index
 
 BASE_DIR = Path("c:/Users/paparinots/Documents/Kabbalah")
 TRANSCRIPTS_DIR = BASE_DIR / "transcripciones"
@@ -108,10 +109,12 @@ def process_playlist_batch(playlist: str) -> bool:
                 
                 print(f"   [SAVED] Guardado: {output_file.name}")
                 
-                # Update state
+                # Update state (ambos cambios en una sola transacción)
                 idx = extract_index(transcript_file.name)
-                mark_completed(playlist, idx, 'ai')
-                increment_stat(playlist, 'ai_processed', 1)
+                with transaction():
+                    mark_completed(playlist, idx, 'ai')
+                    increment_stat(playlist, 'ai_processed', 1)
+                manifest_index.mark_processed(playlist, transcript_file.stem)
                 
                 success_count += 1
             else:
@@ -5,12 +5,18 @@ Press Ctrl+C to stop
 """
 
 import os
+import sys
 import json
 import time
 import subprocess
 from datetime import datetime
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent))
+from subtitle_fetcher import RateLimited, fetch_all, limiter_for
+from ytdlp_engine import get_engine
+from playlist_catalog import diff_playlist
+
 # Configuration
 BASE_DIR = Path("c:/Users/paparinots/Documents/Kabbalah")
 TRANSCRIPTS_DIR = BASE_DIR / "transcripciones"
@@ -18,8 +24,8 @@ STATUS_FILE = BASE_DIR / "download_status.json"
 LOG_FILE = BASE_DIR / "download_log.txt"
 
 # Timer settings
-INTERVAL_MINUTES = 10  # Run every 10 minutes
-BATCH_SIZE = 3  # Download 3 per playlist per run (to avoid rate limiting)
+INTERVAL_MINUTES = 10  # Re-check playlists every 10 minutes
+CONCURRENCY = 3  # Downloads in flight (rate is adapted by subtitle_fetcher on 429s)
 
 PLAYLISTS = {
     "secretos_zohar": {
@@ -49,34 +55,23 @@ def log(message):
         f.write(line + "\n")
 
 def get_playlist_videos(playlist_url):
-    """Get list of video IDs"""
-    cmd = f'yt-dlp --flat-playlist --print id "{playlist_url}"'
-    try:
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=120, cwd=str(BASE_DIR))
-        if result.returncode == 0 and result.stdout.strip():
-            return [vid.strip() for vid in result.stdout.strip().split('\n') if vid.strip()]
-    except Exception as e:
-        log(f"Error fetching playlist: {e}")
-    return []
+    """Get list of video IDs (catálogo con TTL: no consulta YouTube en cada ciclo)"""
+    diff = diff_playlist(playlist_url)
+    for video in diff['added']:
+        log(f"  🆕 Nuevo video en la playlist: {video['id']} {video['title'][:50]}")
+    return [v['id'] for v in diff['videos']]
 
 def download_subtitle(video_id, output_dir, index):
-    """Download subtitle for single video"""
-    output_template = f"{index:03d}_%(title)s"
-    url = f"https://www.youtube.com/watch?v={video_id}"
-    cmd = f'yt-dlp --skip-download --write-auto-sub --sub-lang es --sub-format json3 -o "{output_template}" "{url}"'
-    
+    """Download subtitle for single video (yt-dlp en proceso; 429 -> RateLimited)"""
     try:
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=120, cwd=str(output_dir))
-        if result.returncode == 0 and "Writing video subtitles" in result.stdout:
-            return True, "OK"
-        elif "no subtitles" in (result.stdout + result.stderr).lower():
-            return False, "No subs"
-        else:
-            return False, "Error"
-    except subprocess.TimeoutExpired:
-        return False, "Timeout"
+        success, msg = get_engine().download_subtitles([(index, video_id)], Path(output_dir))[0]
+    except RateLimited:
+        raise
     except Exception as e:
         return False, str(e)[:20]
+    if success:
+        return True, "OK"
+    return False, "No subs" if "No subtitles" in msg else "Error"
 
 def load_status():
     if STATUS_FILE.exists():
@@ -115,26 +110,18 @@ def run_download_cycle():
         downloaded = count_downloaded(folder)
         log(f"  {playlist_name}: {downloaded}/{len(videos)}")
         
-        # Download missing (limited batch)
-        count = 0
-        for idx, video_id in enumerate(videos, 1):
-            if count >= BATCH_SIZE:
-                break
-            
-            pattern = f"{idx:03d}_*.json3"
-            if list(folder.glob(pattern)):
-                continue
-            
+        # Download all missing (token bucket + AIMD backoff instead of fixed batches)
+        existing = {f.name[:3] for f in folder.glob("*.json3")}
+        missing = [(idx, video_id) for idx, video_id in enumerate(videos, 1) if f"{idx:03d}" not in existing]
+        
+        def fetch(job):
+            idx, video_id = job
             success, msg = download_subtitle(video_id, folder, idx)
-            
-            if success:
-                count += 1
-                total_new += 1
-                log(f"    ✅ {idx}/{len(videos)}")
-            else:
-                log(f"    ❌ {idx}: {msg}")
-            
-            time.sleep(2)  # Small delay between downloads
+            log(f"    ✅ {idx}/{len(videos)}" if success else f"    ❌ {idx}: {msg}")
+            return {'success': success}
+        
+        results = fetch_all(missing, fetch, concurrency=CONCURRENCY)
+        total_new += sum(1 for r in results if r['success'])
         
         # Update status
         status[playlist_name] = {
@@ -144,14 +131,15 @@ def run_download_cycle():
         }
         save_status(status)
     
-    log(f"Cycle complete. Downloaded {total_new} new subtitles.")
+    log(f"Cycle complete. Downloaded {total_new} new subtitles. "
+        f"(rate {limiter_for().rate * 60:.1f}/min, blocks {limiter_for().blocks})")
     return total_new
 
 def main():
     log("=" * 50)
     log("AUTO-DOWNLOAD STARTED")
     log(f"Interval: {INTERVAL_MINUTES} minutes")
-    log(f"Batch size: {BATCH_SIZE} per playlist")
+    log(f"Concurrency: {CONCURRENCY} (adaptive rate limit)")
     log("Press Ctrl+C to stop")
     log("=" * 50)
     
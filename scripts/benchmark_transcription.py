@@ -0,0 +1,204 @@
+"""
+Benchmark de backends de transcripción
+
+Transcribe una muestra FIJA de clases (los primeros N MP3 ordenados por
+nombre, o los archivos indicados) con cada backend y compara:
+- Tiempo de pared y RTF (tiempo / duración del audio)
+- WER (word error rate) contra una transcripción de referencia
+
+La referencia es el .json/.json3/.srt con el mismo nombre en --reference-dir
+(subtítulos de YouTube o una transcripción revisada). Si no existe, se usa
+la salida del PRIMER backend de la lista como referencia.
+
+Uso:
+    python scripts/benchmark_transcription.py --audio-dir audios/secretos_zohar --sample 3
+    python scripts/benchmark_transcription.py --backends whisper:medium faster-whisper:medium:int8 \\
+        --reference-dir transcripciones/secretos_zohar --output benchmark_whisper.json
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import unicodedata
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent))
+from transcription_backends import backend_available, load_backend
+
+def normalize_words(text: str) -> List[str]:
+    """Minúsculas, sin acentos ni puntuación, separado en palabras"""
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r'[^\w\s]', ' ', text.casefold())
+    return text.split()
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """WER = distancia de edición en palabras / palabras de la referencia
+
+    Programación dinámica con una sola fila (memoria O(n)); para una clase
+    de una hora tarda del orden de decenas de segundos.
+    """
+    ref = normalize_words(reference)
+    hyp = normalize_words(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, 1):
+            cost = 0 if ref_word == hyp_word else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+        previous = current
+    return previous[-1] / len(ref)
+
+def load_reference_text(path: Path) -> Optional[str]:
+    """Lee el texto de una transcripción (whisper JSON, json3, youtube_transcript_api o SRT)"""
+    if path.suffix == '.srt':
+        lines = path.read_text(encoding='utf-8').splitlines()
+        return ' '.join(l for l in lines if l.strip() and '-->' not in l and not l.strip().isdigit())
+
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    if isinstance(data, list):
+        return ' '.join(seg.get('text', '') for seg in data)
+    if 'events' in data:
+        return ' '.join(''.join(s.get('utf8', '') for s in e.get('segs', [])) for e in data['events'])
+    if 'segments' in data:
+        return ' '.join(seg.get('text', '') for seg in data['segments'])
+    if 'transcript' in data:
+        return ' '.join(seg.get('text', '') for seg in data['transcript'])
+    return data.get('text')
+
+def find_reference(mp3: Path, reference_dir: Optional[Path]) -> Optional[str]:
+    if not reference_dir:
+        return None
+    for suffix in ('.json', '.json3', '.es.json3', '.srt'):
+        candidate = reference_dir / f"{mp3.stem}{suffix}"
+        if candidate.exists():
+            return load_reference_text(candidate)
+    return None
+
+def parse_backend_spec(spec: str) -> Dict[str, Optional[str]]:
+    """'faster-whisper:medium:int8' -> {'backend', 'model', 'compute_type'}"""
+    parts = spec.split(':')
+    return {
+        'spec': spec,
+        'backend': parts[0],
+        'model': parts[1] if len(parts) > 1 else 'medium',
+        'compute_type': parts[2] if len(parts) > 2 else None,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de backends de transcripción')
+    parser.add_argument('--audio-dir', default='audios/secretos_zohar', help='Carpeta con los MP3')
+    parser.add_argument('--files', nargs='*', default=None, help='MP3 específicos (en lugar de --sample)')
+    parser.add_argument('--sample', type=int, default=3, help='Primeros N MP3 ordenados (default: 3)')
+    parser.add_argument('--backends', nargs='+', default=['whisper:medium', 'faster-whisper:medium:int8'],
+                        help='Backends a comparar como backend:modelo[:compute_type]')
+    parser.add_argument('--reference-dir', default=None,
+                        help='Carpeta con transcripciones de referencia (mismo nombre que el MP3)')
+    parser.add_argument('--language', default='es')
+    parser.add_argument('--threads', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--output', default=None, help='Guardar resultados en JSON')
+    args = parser.parse_args()
+
+    if args.files:
+        sample = [Path(f) for f in args.files]
+    else:
+        sample = sorted(Path(args.audio_dir).glob("*.mp3"))[:args.sample]
+
+    if not sample:
+        print(f"❌ No hay MP3 para el benchmark en {args.audio_dir}")
+        return
+
+    specs = [parse_backend_spec(s) for s in args.backends]
+    reference_dir = Path(args.reference_dir) if args.reference_dir else None
+
+    print("=" * 70)
+    print("BENCHMARK DE TRANSCRIPCIÓN")
+    print("=" * 70)
+    print(f"Muestra: {len(sample)} archivos | Threads: {args.threads}")
+    for mp3 in sample:
+        print(f"   - {mp3.name}")
+
+    # Transcribir con cada backend
+    outputs: Dict[str, Dict[str, Dict]] = {}
+    for spec in specs:
+        if not backend_available(spec['backend']):
+            print(f"\n⚠️ {spec['spec']}: backend no instalado, se omite")
+            continue
+
+        print(f"\n📥 {spec['spec']}: cargando modelo...")
+        load_start = time.time()
+        engine = load_backend(spec['backend'], spec['model'], threads=args.threads,
+                              compute_type=spec['compute_type'])
+        print(f"   ✅ Cargado en {time.time() - load_start:.1f}s")
+
+        outputs[spec['spec']] = {}
+        for mp3 in sample:
+            print(f"   🎙️ {mp3.name}...", flush=True)
+            start = time.time()
+            result = engine.transcribe(mp3, language=args.language)
+            elapsed = time.time() - start
+            audio_seconds = result["segments"][-1]["end"] if result["segments"] else 0.0
+            outputs[spec['spec']][mp3.name] = {
+                'text': result['text'],
+                'elapsed': elapsed,
+                'audio_seconds': audio_seconds,
+            }
+            print(f"      {elapsed:.1f}s para {audio_seconds / 60:.1f} min de audio", flush=True)
+        del engine
+
+    if not outputs:
+        print("\n❌ Ningún backend disponible")
+        return
+
+    # Referencias: archivo externo o el primer backend
+    baseline = next(iter(outputs))
+    references = {}
+    for mp3 in sample:
+        text = find_reference(mp3, reference_dir)
+        references[mp3.name] = (text, 'archivo') if text else (outputs[baseline][mp3.name]['text'], baseline)
+
+    # Resumen
+    summary = []
+    for spec_name, per_file in outputs.items():
+        total_elapsed = sum(r['elapsed'] for r in per_file.values())
+        total_audio = sum(r['audio_seconds'] for r in per_file.values())
+        wers = [word_error_rate(references[name][0], r['text']) for name, r in per_file.items()]
+        summary.append({
+            'backend': spec_name,
+            'wall_seconds': round(total_elapsed, 1),
+            'audio_seconds': round(total_audio, 1),
+            'rtf': round(total_elapsed / total_audio, 3) if total_audio else None,
+            'wer': round(sum(wers) / len(wers), 4) if wers else None,
+            'files': {name: {'elapsed': round(r['elapsed'], 1), 'wer': round(w, 4)}
+                      for (name, r), w in zip(per_file.items(), wers)},
+        })
+
+    base_wall = summary[0]['wall_seconds'] or 1
+    print("\n" + "=" * 70)
+    print(f"{'BACKEND':<32} {'PARED':>9} {'RTF':>7} {'WER':>7} {'SPEEDUP':>8}")
+    print("-" * 70)
+    for row in summary:
+        rtf = f"{row['rtf']:.3f}" if row['rtf'] is not None else '-'
+        wer = f"{row['wer'] * 100:.1f}%" if row['wer'] is not None else '-'
+        speedup = base_wall / row['wall_seconds'] if row['wall_seconds'] else 0
+        print(f"{row['backend']:<32} {row['wall_seconds']:>8.1f}s {rtf:>7} {wer:>7} {speedup:>7.2f}x")
+    print("=" * 70)
+    ref_sources = {src for _, src in references.values()}
+    print(f"Referencia WER: {', '.join(sorted(ref_sources))}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'sample': [m.name for m in sample], 'results': summary}, f, ensure_ascii=False, indent=2)
+        print(f"💾 Resultados: {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,14 @@
 
 import os
+import sys
 import json
 import subprocess
 from pathlib import Path
 from datetime import datetime
 
+sys.path.insert(0, str(Path(__file__).parent))
+from playlist_catalog import get_playlist
+
 # Import configuration from download_robust
 # We assume download_robust.py is in the same directory or accessible
 try:
@@ -53,42 +57,16 @@ CACHE_FILE = BASE_DIR / "playlist_cache.json"
 REPORT_FILE = BASE_DIR / "DETAILED_STATUS.md"
 
 def get_playlist_videos(playlist_url):
-    """Fetch video IDs from YouTube using yt-dlp"""
-    cmd = f'yt-dlp --flat-playlist --print id --print title "{playlist_url}"'
-    try:
-        # cwd=BASE_DIR ensures we are in the right context if needed
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=120, encoding='utf-8', cwd=str(BASE_DIR))
-        if result.returncode == 0 and result.stdout.strip():
-            lines = [line.strip() for line in result.stdout.strip().split('\n') if line.strip()]
-            videos = []
-            # Output is alternating ID and Title because of --print id --print title
-            # Actually, standard --print outputs line by line. 
-            # Let's parse carefully. 
-            # Better approach: yt-dlp -j --flat-playlist
-            return fetch_playlist_json(playlist_url)
-    except Exception as e:
-        print(f"Error fetching playlist: {e}")
-    return []
+    """Fetch videos ({'id', 'title'}) from the shared playlist catalog"""
+    return fetch_playlist_json(playlist_url)
 
 def fetch_playlist_json(playlist_url):
-    cmd = f'yt-dlp --flat-playlist -j "{playlist_url}"'
-    videos = []
+    """[{'id', 'title'}] desde el catálogo (sólo consulta YouTube si venció el TTL)"""
     try:
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=180, encoding='utf-8', cwd=str(BASE_DIR))
-        if result.returncode == 0:
-            for line in result.stdout.strip().split('\n'):
-                if line.strip():
-                    try:
-                        data = json.loads(line)
-                        videos.append({
-                            'id': data.get('id'),
-                            'title': data.get('title', 'Unknown Title')
-                        })
-                    except:
-                        pass
+        return get_playlist(playlist_url)
     except Exception as e:
         print(f"Error fetching JSON playlist: {e}")
-    return videos
+        return []
 
 def update_cache():
     cache = {}
@@ -100,37 +78,35 @@ def update_cache():
             pass
 
     for name, config in PLAYLISTS.items():
-        # Only fetch if not in cache or manually forced (we'll just fetch if empty or old for now)
-        # For this tool, let's trust the cache if it has items, but maybe refresh if requested.
-        # We will assume we want to refresh if the list is empty.
-        
-        if name not in cache or not cache[name].get('videos'):
-            print(f"Fetching playlist info for {name}...")
-            videos = fetch_playlist_json(config['url'])
-            if videos:
+        # El catálogo decide si hace falta consultar YouTube (TTL); así los
+        # videos nuevos aparecen en el reporte sin forzar un refresco manual
+        videos = fetch_playlist_json(config['url'])
+        if videos:
+            cache[name] = {
+                'videos': videos,
+                'last_updated': datetime.now().isoformat()
+            }
+        elif cache.get(name, {}).get('videos'):
+            print(f"Failed to fetch {name} from YouTube. Keeping previous report data.")
+        else:
+            print(f"Failed to fetch {name} from YouTube. Checking local download_progress.json...")
+            # Fallback to download_progress.json
+            if not 'progress_data' in locals():
+                 try:
+                    with open(BASE_DIR / 'download_progress.json', 'r', encoding='utf-8') as f:
+                        progress_data = json.load(f)
+                 except:
+                    progress_data = {}
+            
+            if name in progress_data and 'video_ids' in progress_data[name]:
+                ids = progress_data[name]['video_ids']
+                print(f"  Found {len(ids)} videos in local progress records.")
                 cache[name] = {
-                    'videos': videos,
+                    'videos': [{'id': vid_id, 'title': 'Offline Record'} for vid_id in ids],
                     'last_updated': datetime.now().isoformat()
                 }
             else:
-                print(f"Failed to fetch {name} from YouTube. Checking local download_progress.json...")
-                # Fallback to download_progress.json
-                if not 'progress_data' in locals():
-                     try:
-                        with open(BASE_DIR / 'download_progress.json', 'r', encoding='utf-8') as f:
-                            progress_data = json.load(f)
-                     except:
-                        progress_data = {}
-                
-                if name in progress_data and 'video_ids' in progress_data[name]:
-                    ids = progress_data[name]['video_ids']
-                    print(f"  Found {len(ids)} videos in local progress records.")
-                    cache[name] = {
-                        'videos': [{'id': vid_id, 'title': 'Offline Record'} for vid_id in ids],
-                        'last_updated': datetime.now().isoformat()
-                    }
-                else:
-                    print(f"  No local records found for {name}")
+                print(f"  No local records found for {name}")
     
     with open(CACHE_FILE, 'w', encoding='utf-8') as f:
         json.dump(cache, f, indent=2, ensure_ascii=False)
@@ -3,6 +3,7 @@ import paramiko
 SERVER_IP = "192.168.100.21"
 USERNAME = "willy"
 PASSWORD = "Passw0rd"
+REMOTE_BASE = "/home/willy"
 REMOTE_TRANSCRIPT_DIR = "/home/willy/kabbalah_transcripciones"
 REMOTE_AUDIO_DIR = "/home/willy/kabbalah_audios"
 
@@ -35,13 +36,20 @@ def check_status():
 
         # Check Process
         print(f"\n⚙️ Checking Running Processes...")
-        stdin, stdout, stderr = client.exec_command("ps aux | grep transcribe_server.py")
+        stdin, stdout, stderr = client.exec_command("ps aux | grep -E 'transcribe_server.py|transcription_daemon.py' | grep -v grep")
         output = stdout.read().decode()
-        if "python3" in output and "transcribe_server.py" in output:
+        if "python3" in output:
              print("   ✅ Whisper script is RUNNING.")
              print(output.strip())
         else:
              print("   ⚠️ Whisper script is NOT running.")
+        
+        # Daemon queue (see transcription_daemon.py)
+        stdin, stdout, stderr = client.exec_command(f"python3 {REMOTE_BASE}/transcription_daemon.py --status")
+        queue_status = stdout.read().decode().strip()
+        if queue_status:
+            print(f"\n📬 Transcription queue:")
+            print(queue_status)
             
         sftp.close()
         
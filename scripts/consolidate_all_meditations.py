@@ -1,8 +1,13 @@
 import json
 import os
+import sys
 import glob
 import re
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from data_bundles import write_json_compact, write_shards
+from search_index import build_index
+
 # Paths
 PROCESSED_DIR = "contenido_procesado"
 OUTPUT_FILE = "kabbalah-app/data/meditations_all.json"
@@ -93,11 +98,12 @@ def main():
         "meditaciones": all_meditations
     }
     
-    os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        json.dump(output_data, f, ensure_ascii=False, indent=2)
-        
-    print(f"✅ Created {OUTPUT_FILE} with {len(all_meditations)} meditations.")
+    write_json_compact(OUTPUT_FILE, output_data)
+    # Un shard por categoría para que cada página cargue sólo la suya
+    shards = write_shards('meditations', all_meditations, lambda m: m['category'], 'category')
+
+    print(f"✅ Created {OUTPUT_FILE} with {len(all_meditations)} meditations ({len(shards)} category shards).")
+    build_index()
 
 if __name__ == "__main__":
     main()
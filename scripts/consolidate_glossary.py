@@ -1,5 +1,10 @@
 import json
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from data_bundles import write_json_compact, write_shards
+from search_index import build_index
 
 # Paths
 OUTPUT_FILE = "kabbalah-app/data/glossary.json"
@@ -62,11 +67,12 @@ def main():
     # Sort
     sorted_concepts = sorted(concepts.values(), key=lambda x: x['termino'])
     
-    os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        json.dump(sorted_concepts, f, ensure_ascii=False, indent=2)
-        
-    print(f"✅ Consolidated {len(sorted_concepts)} terms.")
+    write_json_compact(OUTPUT_FILE, sorted_concepts)
+    # Un shard por letra inicial (índice A-Z del glosario)
+    shards = write_shards('glossary', sorted_concepts, lambda x: x['termino'][:1] or 'otros', 'letter')
+
+    print(f"✅ Consolidated {len(sorted_concepts)} terms ({len(shards)} letter shards).")
+    build_index()
 
 if __name__ == "__main__":
     main()
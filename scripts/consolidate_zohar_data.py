@@ -1,87 +1,234 @@
+"""
+Consolida contenido_procesado/*_extracted.json en kabbalah-app/data/zohar_db.json
+
+Incremental: cada archivo se normaliza una sola vez y su item (ya
+serializado) queda en una caché SQLite junto con el mtime/tamaño del
+archivo y, si se usó, el de la transcripción original (fallback de
+video_id). En cada corrida sólo se re-parsean los archivos nuevos o
+modificados; la salida se arma escribiendo los fragmentos cacheados uno
+tras otro (sin cargar ni re-serializar la base completa) y se reemplaza
+de forma atómica. Si nada cambió no se reescribe.
+
+La salida es compacta (sin indentación) y además se escribe un shard por
+playlist en kabbalah-app/data/bundles/zohar_db/ (ver data_bundles.py);
+sólo se reescriben los shards de las playlists con cambios. Al final se
+reconstruye el índice de búsqueda (search_index.py).
+
+Uso:
+    python scripts/consolidate_zohar_data.py [--rebuild]
+"""
+
 import json
 import os
+import re
+import sys
 import glob
+import sqlite3
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from data_bundles import COMPACT, load_index, shard_path, slugify, update_index, write_shard_stream
+from search_index import build_index
 
 # Paths
 PROCESSED_DIR = "contenido_procesado"
 OUTPUT_FILE = "kabbalah-app/data/zohar_db.json"
+CACHE_DB = os.getenv("ZOHAR_DB_CACHE", "cache/zohar_db_fragments.sqlite")
+CACHE_VERSION = 2  # subir si cambia el formato de los fragmentos (invalida la caché)
+DATASET = "zohar_db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fragments (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    source_path TEXT,
+    source_mtime REAL,
+    video_number INTEGER NOT NULL DEFAULT 0,
+    shard TEXT NOT NULL DEFAULT 'otros',
+    fragment TEXT
+)
+"""
+
+def open_cache():
+    os.makedirs(os.path.dirname(CACHE_DB) or ".", exist_ok=True)
+    conn = sqlite3.connect(CACHE_DB)
+    conn.execute("PRAGMA journal_mode=WAL")
+    if conn.execute("PRAGMA user_version").fetchone()[0] != CACHE_VERSION:
+        conn.execute("DROP TABLE IF EXISTS fragments")
+        conn.execute(f"PRAGMA user_version = {CACHE_VERSION}")
+    conn.execute(_SCHEMA)
+    return conn
+
+def file_mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+def shard_for(data):
+    """Playlist del item: carpeta de la transcripción original (transcripciones\\<playlist>\\x.json)"""
+    parts = [part for part in re.split(r'[\\/]', data.get('source_file') or '') if part]
+    return slugify(parts[-2]) if len(parts) >= 2 else 'otros'
+
+def normalize_file(file_path):
+    """Item normalizado de un *_extracted.json, la transcripción usada como fallback (o None) y su shard"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    # The extracted JSON structure might vary slightly, let's normalize it
+    # We expect the root to have metadata and the extracted fields
+
+    item = {
+        'metadata': data.get('metadata', {}),
+        'meditaciones': data.get('meditaciones', []),
+        'nombres_divinos': data.get('nombres_divinos', []),
+        'conceptos': data.get('conceptos', []),
+        'intenciones_principales': data.get('intenciones_principales', [])
+    }
+    source_path = None
+
+    # Fallback: If metadata is missing or video_id is empty, try to get it from source_file
+    if not item['metadata'].get('video_id') and 'source_file' in data:
+        source_rel_path = data['source_file']
+        # source_file path might be relative or absolute, normalize it
+        # It seems to be "transcripciones\Playlist\Filename.json"
+
+        if os.path.exists(source_rel_path):
+            source_path = source_rel_path
+            with open(source_rel_path, 'r', encoding='utf-8') as sf:
+                source_data = json.load(sf)
+                original_metadata = source_data.get('metadata', {})
+
+                # Merge original metadata with existing (preserving extracted fields if any)
+                if original_metadata:
+                    # Ensure we have the base fields
+                    item['metadata']['video_id'] = original_metadata.get('video_id', '')
+                    item['metadata']['titulo'] = original_metadata.get('video_title', item['metadata'].get('titulo', ''))
+                    item['metadata']['video_number'] = original_metadata.get('video_number', 0)
+                    if not item['metadata'].get('duracion_minutos'):
+                         item['metadata']['duracion_minutos'] = 0 # Placeholder if not found
+
+    return item, source_path, shard_for(data)
+
+def render_fragment(item):
+    """Item serializado tal como queda dentro de "items" (compacto)"""
+    return json.dumps(item, **COMPACT)
+
+def refresh_cache(conn, files):
+    """Re-procesa sólo los archivos nuevos/modificados; devuelve (actualizados, eliminados, shards tocados)"""
+    cached = {row[0]: row[1:] for row in conn.execute(
+        "SELECT path, mtime, size, source_path, source_mtime, shard FROM fragments")}
+    updated = 0
+    touched = set()
 
-def main():
-    print("🔄 Consolidating Zohar data...")
-    
-    # Find all extracted JSON files
-    files = glob.glob(os.path.join(PROCESSED_DIR, "*_extracted.json"))
-    print(f"   Found {len(files)} processed files.")
-    
-    all_items = []
-    
     for file_path in files:
+        stat = os.stat(file_path)
+        entry = cached.get(file_path)
+        if entry:
+            mtime, size, source_path, source_mtime, shard = entry
+            if (mtime == stat.st_mtime and size == stat.st_size
+                    and (source_path is None or file_mtime(source_path) == source_mtime)):
+                continue
+            touched.add(shard)
+
+        fragment, source_path, video_number, shard = None, None, 0, 'otros'
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                # The extracted JSON structure might vary slightly, let's normalize it
-                # We expect the root to have metadata and the extracted fields
-                
-                # If the AI wrapped it in a specific key, handle it. 
-                # Assuming the root is the object we want, or it has 'metadata'
-                
-                item = {
-                    'metadata': data.get('metadata', {}),
-                    'meditaciones': data.get('meditaciones', []),
-                    'nombres_divinos': data.get('nombres_divinos', []),
-                    'conceptos': data.get('conceptos', []),
-                    'intenciones_principales': data.get('intenciones_principales', [])
-                }
-                
-                # Fallback: If metadata is missing or video_id is empty, try to get it from source_file
-                if not item['metadata'].get('video_id') and 'source_file' in data:
-                    source_rel_path = data['source_file']
-                    # source_file path might be relative or absolute, normalize it
-                    # It seems to be "transcripciones\Playlist\Filename.json"
-                    
-                    if os.path.exists(source_rel_path):
-                        with open(source_rel_path, 'r', encoding='utf-8') as sf:
-                            source_data = json.load(sf)
-                            original_metadata = source_data.get('metadata', {})
-                            
-                            # Merge original metadata with existing (preserving extracted fields if any)
-                            if original_metadata:
-                                # Ensure we have the base fields
-                                item['metadata']['video_id'] = original_metadata.get('video_id', '')
-                                item['metadata']['titulo'] = original_metadata.get('video_title', item['metadata'].get('titulo', ''))
-                                item['metadata']['video_number'] = original_metadata.get('video_number', 0)
-                                if not item['metadata'].get('duracion_minutos'):
-                                     item['metadata']['duracion_minutos'] = 0 # Placeholder if not found
-                                     
-                # Validate again
-                if item['metadata'].get('video_id'):
-                    all_items.append(item)
-                else:
-                    print(f"   ⚠️  Skipping {file_path}: Missing video_id even after fallback")
-                    
+            item, source_path, shard = normalize_file(file_path)
+            # Validate again
+            if item['metadata'].get('video_id'):
+                fragment = render_fragment(item)
+                number = item['metadata'].get('video_number', 0)
+                video_number = number if isinstance(number, int) else 0
+            else:
+                print(f"   ⚠️  Skipping {file_path}: Missing video_id even after fallback")
         except Exception as e:
             print(f"   ❌ Error reading {file_path}: {e}")
 
-    # Sort by video number if available
-    try:
-        all_items.sort(key=lambda x: x['metadata'].get('video_number', 0))
-    except:
-        pass
-
-    # Create final DB structure
-    db = {
-        "total_videos": len(all_items),
-        "last_updated": os.path.getmtime(PROCESSED_DIR) if os.path.exists(PROCESSED_DIR) else 0,
-        "items": all_items
-    }
-    
+        conn.execute(
+            "INSERT OR REPLACE INTO fragments (path, mtime, size, source_path, source_mtime, video_number, shard, fragment) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (file_path, stat.st_mtime, stat.st_size, source_path,
+             file_mtime(source_path) if source_path else None, video_number, shard, fragment)
+        )
+        touched.add(shard)
+        updated += 1
+
+    removed = set(cached) - set(files)
+    touched.update(cached[path][4] for path in removed)
+    conn.executemany("DELETE FROM fragments WHERE path = ?", [(path,) for path in removed])
+    conn.commit()
+    return updated, len(removed), touched
+
+def write_db(conn):
+    """Escribe zohar_db.json fragmento por fragmento (tmp + replace); devuelve el total de items"""
+    total = conn.execute("SELECT COUNT(*) FROM fragments WHERE fragment IS NOT NULL").fetchone()[0]
+    last_updated = os.path.getmtime(PROCESSED_DIR) if os.path.exists(PROCESSED_DIR) else 0
+
     # Ensure directory exists
     os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
-    
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        json.dump(db, f, ensure_ascii=False, indent=2)
-        
-    print(f"✅ Database created with {len(all_items)} items at {OUTPUT_FILE}")
+
+    tmp_file = f"{OUTPUT_FILE}.{os.getpid()}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        f.write(f'{{"total_videos":{total},"last_updated":{json.dumps(last_updated)},"items":[')
+        # Sort by video number if available
+        rows = conn.execute("SELECT fragment FROM fragments WHERE fragment IS NOT NULL "
+                            "ORDER BY video_number, path")
+        for i, (fragment,) in enumerate(rows):
+            if i:
+                f.write(",")
+            f.write(fragment)
+        f.write("]}")
+    os.replace(tmp_file, OUTPUT_FILE)
+    return total
+
+def write_shards(conn, touched):
+    """Reescribe los shards por playlist con cambios (o que falten) y actualiza bundles/index.json"""
+    previous = load_index()['datasets'].get(DATASET, {}).get('shards', {})
+    counts = dict(conn.execute("SELECT shard, COUNT(*) FROM fragments WHERE fragment IS NOT NULL GROUP BY shard"))
+
+    shards = {}
+    for shard, count in counts.items():
+        if shard not in touched and shard in previous and shard_path(DATASET, shard).exists():
+            shards[shard] = previous[shard]
+            continue
+        rows = conn.execute("SELECT fragment FROM fragments WHERE fragment IS NOT NULL AND shard = ? "
+                            "ORDER BY video_number, path", (shard,))
+        shards[shard] = write_shard_stream(DATASET, shard, count, (fragment for (fragment,) in rows))
+    update_index(DATASET, 'playlist', shards)
+    return len(shards)
+
+def consolidate(rebuild=False):
+    """Actualiza la caché con los archivos cambiados y reescribe zohar_db.json si hace falta"""
+    print("🔄 Consolidating Zohar data...")
+
+    # Find all extracted JSON files
+    files = sorted(glob.glob(os.path.join(PROCESSED_DIR, "*_extracted.json")))
+    print(f"   Found {len(files)} processed files.")
+
+    conn = open_cache()
+    try:
+        if rebuild:
+            conn.execute("DELETE FROM fragments")
+        updated, removed, touched = refresh_cache(conn, files)
+        print(f"   {updated} new/changed, {removed} removed, {len(files) - updated} cached.")
+
+        if not updated and not removed and os.path.exists(OUTPUT_FILE):
+            print(f"✅ No changes, {OUTPUT_FILE} is up to date")
+            return
+
+        total = write_db(conn)
+        shards = write_shards(conn, touched)
+    finally:
+        conn.close()
+
+    print(f"✅ Database created with {total} items at {OUTPUT_FILE} ({shards} playlist shards)")
+    build_index()
+
+def main():
+    parser = argparse.ArgumentParser(description='Consolida *_extracted.json en zohar_db.json (incremental)')
+    parser.add_argument('--rebuild', action='store_true', help='Ignorar la caché y re-procesar todos los archivos')
+    args = parser.parse_args()
+    consolidate(rebuild=args.rebuild)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,198 @@
+"""
+Data Bundles - Salida compacta y por shards para la app Next.js
+
+Los consolidadores escribían un único JSON con indent=2 por dataset
+(zohar_db.json, meditations_all.json, glossary.json) que la app lee
+entero en cada ruta; crece linealmente con las playlists. Además del
+archivo monolítico (ahora compacto, sin indentación) cada consolidador
+escribe shards en kabbalah-app/data/bundles/:
+
+    bundles/index.json                       # manifest chico: qué shard tiene qué
+    bundles/zohar_db/secretos_zohar.json     # un shard por playlist
+    bundles/meditations/arbol-de-la-vida.json  # uno por categoría
+    bundles/glossary/k.json                  # uno por letra inicial
+
+index.json:
+    {"version": 1, "generated_at": "...", "datasets": {
+        "zohar_db": {"shard_by": "playlist", "count": 230, "shards": {
+            "secretos_zohar": {"file": "zohar_db/secretos_zohar.json", "count": 230,
+                               "bytes": 48211, "sha1": "3f2a..."}}}}}
+
+Cada shard: {"dataset", "shard", "count", "items": [...]}. La app lee
+index.json y sólo el shard que necesita; "sha1" sirve de ETag.
+
+Uso:
+    from data_bundles import write_json_compact, write_shards
+    python scripts/data_bundles.py --benchmark     # tamaño y tiempo de parseo
+"""
+
+import os
+import re
+import json
+import gzip
+import time
+import hashlib
+import argparse
+import unicodedata
+from pathlib import Path
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List
+
+DATA_DIR = Path(os.getenv("APP_DATA_DIR", "kabbalah-app/data"))
+BUNDLES_DIR = DATA_DIR / "bundles"
+INDEX_FILE = BUNDLES_DIR / "index.json"
+INDEX_VERSION = 1
+
+# Dataset -> archivo monolítico (para --benchmark)
+MONOLITHIC_FILES = {
+    'zohar_db': DATA_DIR / "zohar_db.json",
+    'meditations': DATA_DIR / "meditations_all.json",
+    'glossary': DATA_DIR / "glossary.json",
+}
+
+COMPACT = {'ensure_ascii': False, 'separators': (',', ':')}
+
+def slugify(text: str) -> str:
+    """'Árbol de la Vida' -> 'arbol-de-la-vida' (nombre de archivo estable)"""
+    text = unicodedata.normalize('NFKD', str(text)).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^a-z0-9_]+', '-', text.lower()).strip('-') or 'otros'
+
+def file_info(path: Path, root: Path = BUNDLES_DIR) -> Dict[str, Any]:
+    data = path.read_bytes()
+    return {'file': path.relative_to(root).as_posix(), 'bytes': len(data),
+            'sha1': hashlib.sha1(data).hexdigest()[:16]}
+
+def write_json_compact(path: Path, data: Any):
+    """JSON sin indentación, escritura atómica (tmp + replace)"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, **COMPACT)
+    os.replace(tmp, path)
+
+def shard_path(dataset: str, shard: str) -> Path:
+    return BUNDLES_DIR / dataset / f"{shard}.json"
+
+def load_index() -> Dict[str, Any]:
+    if INDEX_FILE.exists():
+        try:
+            with open(INDEX_FILE, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            if index.get('version') == INDEX_VERSION:
+                return index
+        except Exception as e:
+            print(f"⚠️ index.json ilegible ({e}), se regenera")
+    return {'version': INDEX_VERSION, 'datasets': {}}
+
+def update_index(dataset: str, shard_by: str, shards: Dict[str, Dict[str, Any]]):
+    """Reemplaza la entrada de un dataset en index.json y borra los shards que ya no existen"""
+    index = load_index()
+    index['generated_at'] = datetime.now().isoformat(timespec='seconds')
+    index['datasets'][dataset] = {
+        'shard_by': shard_by,
+        'count': sum(shard['count'] for shard in shards.values()),
+        'shards': dict(sorted(shards.items())),
+    }
+    write_json_compact(INDEX_FILE, index)
+
+    folder = BUNDLES_DIR / dataset
+    keep = {Path(shard['file']).name for shard in shards.values()}
+    for path in folder.glob("*.json"):
+        if path.name not in keep:
+            path.unlink()
+
+def write_shards(dataset: str, items: Iterable[Dict[str, Any]], shard_key: Callable[[Dict[str, Any]], str],
+                 shard_by: str) -> Dict[str, Dict[str, Any]]:
+    """Agrupa items por shard_key(item), escribe un shard compacto por grupo y actualiza index.json"""
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for item in items:
+        groups.setdefault(slugify(shard_key(item)), []).append(item)
+
+    shards = {}
+    for shard, shard_items in groups.items():
+        path = shard_path(dataset, shard)
+        write_json_compact(path, {'dataset': dataset, 'shard': shard, 'count': len(shard_items), 'items': shard_items})
+        shards[shard] = dict(file_info(path), count=len(shard_items))
+    update_index(dataset, shard_by, shards)
+    return shards
+
+def write_shard_stream(dataset: str, shard: str, count: int, fragments: Iterable[str]) -> Dict[str, Any]:
+    """Escribe un shard a partir de items ya serializados (compactos), sin cargarlos en memoria"""
+    path = shard_path(dataset, shard)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(f'{{"dataset":{json.dumps(dataset)},"shard":{json.dumps(shard)},"count":{count},"items":[')
+        for i, fragment in enumerate(fragments):
+            if i:
+                f.write(",")
+            f.write(fragment)
+        f.write("]}")
+    os.replace(tmp, path)
+    return dict(file_info(path), count=count)
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+
+def _parse_ms(text: str, repeat: int) -> float:
+    """Mediana de json.loads en milisegundos"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        json.loads(text)
+        times.append(time.perf_counter() - start)
+    return sorted(times)[len(times) // 2] * 1000
+
+def benchmark(repeat: int = 20) -> List[Dict[str, Any]]:
+    """Compara, por dataset: indent=2 vs compacto vs shards (bytes, gzip y tiempo de parseo)"""
+    index = load_index()
+    rows = []
+    for dataset, path in MONOLITHIC_FILES.items():
+        if not path.exists():
+            continue
+        data = json.loads(path.read_text(encoding='utf-8'))
+        variants = {
+            'indent=2': json.dumps(data, ensure_ascii=False, indent=2),
+            'compacto': json.dumps(data, **COMPACT),
+        }
+        shards = index['datasets'].get(dataset, {}).get('shards', {})
+        shard_texts = [shard_path(dataset, name).read_text(encoding='utf-8') for name in shards
+                       if shard_path(dataset, name).exists()]
+        if shard_texts:
+            variants['shard mayor'] = max(shard_texts, key=len)
+            variants['shard medio'] = sorted(shard_texts, key=len)[len(shard_texts) // 2]
+        for variant, text in variants.items():
+            raw = text.encode('utf-8')
+            rows.append({'dataset': dataset, 'variant': variant, 'bytes': len(raw),
+                         'gzip': len(gzip.compress(raw)), 'parse_ms': _parse_ms(text, repeat),
+                         'shards': len(shard_texts)})
+    return rows
+
+def print_benchmark(rows: List[Dict[str, Any]]):
+    print(f"{'DATASET':<12} {'VARIANTE':<12} {'BYTES':>10} {'GZIP':>9} {'PARSE ms':>9}")
+    for row in rows:
+        print(f"{row['dataset']:<12} {row['variant']:<12} {row['bytes']:>10,} {row['gzip']:>9,} "
+              f"{row['parse_ms']:>9.3f}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Bundles compactos por shard para la app')
+    parser.add_argument('--benchmark', action='store_true', help='Medir tamaño y tiempo de parseo por variante')
+    parser.add_argument('--repeat', type=int, default=20, help='Repeticiones de json.loads (default: 20)')
+    args = parser.parse_args()
+
+    if args.benchmark:
+        print_benchmark(benchmark(args.repeat))
+        return
+
+    index = load_index()
+    if not index['datasets']:
+        print("(sin bundles: ejecuta los consolidadores)")
+    for dataset, entry in index['datasets'].items():
+        total = sum(shard['bytes'] for shard in entry['shards'].values())
+        print(f"{dataset:<12} {entry['count']:>6} items en {len(entry['shards'])} shards "
+              f"por {entry['shard_by']} ({total / 1024:.1f} KB)")
+
+if __name__ == "__main__":
+    main()
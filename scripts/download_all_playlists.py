@@ -1,9 +1,14 @@
 import json
 import os
+import sys
 import time
 from youtube_transcript_api import YouTubeTranscriptApi
 from datetime import datetime
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import manifest_index
+import stage_queue
+
 # Paths
 PROGRESS_FILE = "download_progress.json"
 OUTPUT_BASE_DIR = "transcripciones"
@@ -68,6 +73,8 @@ def download_transcript(video_id, playlist_name, index):
                 'transcript': transcript_data
             }, f, ensure_ascii=False, indent=2)
             
+        manifest_index.mark_transcript(playlist_name, base_filename, 'youtube', video_id=video_id)
+        stage_queue.enqueue(stage_queue.EXTRACT, playlist_name, base_filename)
         print(f"  + Downloaded successfully.")
         return True
 
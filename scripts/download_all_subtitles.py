@@ -1,15 +1,18 @@
 """
 Script MEJORADO con control de rate limiting y capacidad de reanudar
-Versión con pausas más largas para evitar bloqueos de YouTube
+Descargas concurrentes con token bucket + backoff AIMD (subtitle_fetcher.py)
 """
 import os
+import sys
 import json
 import time
-import random
 from youtube_transcript_api import YouTubeTranscriptApi
 from datetime import datetime
 import re
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from subtitle_fetcher import fetch_all, is_block_error, limiter_for, CONCURRENCY, INITIAL_RATE
+
 def sanitize_filename(filename):
     """Limpia un nombre de archivo de caracteres no válidos"""
     invalid_chars = '<>:"/\\|?*'
@@ -125,6 +128,8 @@ def download_video_transcript(video_id, video_title, output_dir, video_number, t
         }
         
     except Exception as e:
+        if is_block_error(e):
+            raise  # fetch_all reduce la tasa y reintenta
         error_msg = str(e)
         print(f"✗ ERROR: {error_msg[:100]}...")
         
@@ -193,67 +198,25 @@ def download_with_resume():
     print(f"\n{'='*70}")
     print("CONFIGURACIÓN DE DESCARGA:")
     print(f"{'='*70}")
-    print("Pausa entre videos: 2-4 segundos (aleatorio)")
-    print("Pausa cada 10 videos: 30 segundos")
-    print("Pausa cada 30 videos: 60 segundos")
-    print("Esto evita bloqueos de YouTube")
+    print(f"Descargas simultáneas: {CONCURRENCY}")
+    print(f"Tasa inicial: {INITIAL_RATE * 60:.0f} videos/min (AIMD: sube con éxitos, baja a la mitad con 429)")
+    print("Los videos bloqueados se reintentan tras una pausa exponencial")
     print(f"{'='*70}")
     
     input("\nPresiona ENTER para comenzar...")
     
-    # Variables de seguimiento
-    results = []
-    successful = 0
-    failed = 0
     start_time = time.time()
-    
-    # Procesar pending videos
-    for idx, video_info in enumerate(pending, 1):
+    jobs = []
+    for video_info in pending:
         # Encontrar el número original del video
         original_idx = videos.index(video_info) + 1
-        
-        video_id = video_info['id']
-        video_title = video_info.get('title', f'Video {original_idx}')
-        
-        result = download_video_transcript(
-            video_id,
-            video_title,
-            output_dir,
-            original_idx,
-            len(videos)
-        )
-        
-        results.append(result)
-        
-        if result['success']:
-            successful += 1
-        else:
-            failed += 1
-            
-            # Si hay error de bloqueo, pausar más tiempo
-            if 'blocking requests' in result.get('error', '').lower():
-                print("\n⚠️  YouTube bloqueó la IP. Pausando 2 minutos...")
-                time.sleep(120)
-        
-        # Progreso
-        total_completed = len(completed) + successful
-        progress = (total_completed / len(videos)) * 100
-        print(f"\n📈 Progreso Global: {total_completed}/{len(videos)} ({progress:.1f}%)")
-        print(f"   En esta sesión: ✓ {successful} | ✗ {failed}")
-        
-        # Pausas estratégicas más largas
-        if idx < len(pending):  # Si no es el último
-            if idx % 30 == 0:
-                print("\n⏸️  Pausa larga (60 seg) - checkpoint cada 30 videos...")
-                time.sleep(60)
-            elif idx % 10 == 0:
-                print("\n⏸️  Pausa media (30 seg) - checkpoint cada 10 videos...")
-                time.sleep(30)
-            else:
-                # Pausa aleatoria entre 2-4 segundos
-                pause = random.uniform(2, 4)
-                print(f"⏸️  Pausa {pause:.1f}s...")
-                time.sleep(pause)
+        jobs.append((video_info['id'], video_info.get('title', f'Video {original_idx}'),
+                     output_dir, original_idx, len(videos)))
+    
+    results = fetch_all(jobs, lambda job: download_video_transcript(*job))
+    successful = sum(1 for r in results if r['success'])
+    failed = len(results) - successful
+    print(f"\n🚦 Bloqueos detectados: {limiter_for().blocks}")
     
     # Tiempo total
     elapsed_time = time.time() - start_time
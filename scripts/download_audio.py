@@ -1,132 +1,183 @@
 """
 Robust Audio Downloader for Videos Without Subtitles
 - Resumes from where it left off if interrupted
-- Tracks progress in JSON file
-- Downloads MP3 audio at 128kbps
+- Tracks progress in JSON file (saved atomically after every video)
+- Downloads MP3 audio at 128kbps, or ASR mode (16 kHz mono opus/flac/wav) per playlist
+- Several downloads in flight (--workers), with adaptive rate limit
+- Partial downloads (.part) resume with HTTP Range instead of restarting
 - Includes retry logic for failed downloads
 """
 
 import os
+import sys
 import json
-import subprocess
 import time
+import argparse
+import threading
 from pathlib import Path
 from datetime import datetime
 
+sys.path.insert(0, str(Path(__file__).parent))
+import manifest_index
+from ytdlp_engine import AUDIO_FORMATS, get_engine
+from transcription_backends import AUDIO_EXTENSIONS
+from playlist_catalog import get_playlist
+from subtitle_fetcher import RateLimited, fetch_all, limiter_for
+
 # Configuration
 BASE_DIR = Path("c:/Users/paparinots/Documents/Kabbalah")
 TRANSCRIPTS_DIR = BASE_DIR / "transcripciones"
 AUDIO_DIR = BASE_DIR / "audios"
 PROGRESS_FILE = BASE_DIR / "audio_download_progress.json"
 
+# Descargas simultáneas (cada thread tiene su propio YoutubeDL)
+CONCURRENCY = 3
+INITIAL_RATE = 0.2   # inicios de descarga por segundo (sube si no hay bloqueos)
+PROGRESS_SETS = ('downloaded', 'failed', 'skipped')
+
 # Playlist configuration
 PLAYLIST_CONFIG = {
     "secretos_zohar": {
         "url": "https://www.youtube.com/playlist?list=PLJMifOLgCzqU80cECmKxsC-bfT58x6xwX",
-        "folder": "secretos_zohar"
+        "folder": "secretos_zohar",
+        # mp3 (128k, escucha) | opus / flac / wav (16 kHz mono, listos para Whisper)
+        "audio_format": "mp3"
     }
 }
 
+_progress_lock = threading.RLock()
+
+def new_playlist_progress():
+    return {name: set() for name in PROGRESS_SETS} | {'last_updated': None}
+
 def load_progress():
-    """Load download progress from file"""
+    """Load download progress from file (listas del JSON -> sets en memoria)"""
+    progress = {}
     if PROGRESS_FILE.exists():
         try:
             with open(PROGRESS_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
+                progress = json.load(f)
         except:
             pass
-    return {}
+    for entry in progress.values():
+        for name in PROGRESS_SETS:
+            entry[name] = set(entry.get(name, []))
+    return progress
 
 def save_progress(progress):
-    """Save download progress to file"""
-    with open(PROGRESS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(progress, f, indent=2, ensure_ascii=False)
+    """Save download progress to file (escritura atómica: tmp + replace)
+
+    Un corte a mitad de la escritura deja el archivo anterior intacto.
+    """
+    with _progress_lock:
+        data = {
+            playlist: {key: sorted(value) if key in PROGRESS_SETS else value for key, value in entry.items()}
+            for playlist, entry in progress.items()
+        }
+        tmp = PROGRESS_FILE.with_name(f".{PROGRESS_FILE.name}.{os.getpid()}.tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, PROGRESS_FILE)
 
 def get_playlist_videos(playlist_url):
-    """Get list of video IDs and titles from playlist"""
-    cmd = f'yt-dlp --flat-playlist --print "%(id)s|%(title)s" "{playlist_url}"'
-    try:
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=180)
-        if result.returncode == 0 and result.stdout.strip():
-            videos = []
-            for line in result.stdout.strip().split('\n'):
-                if '|' in line:
-                    vid_id, title = line.split('|', 1)
-                    videos.append({'id': vid_id.strip(), 'title': title.strip()})
-            return videos
-    except Exception as e:
-        print(f"Error fetching playlist: {e}")
-    return []
+    """Get list of video IDs and titles from playlist (catálogo compartido con TTL)"""
+    return get_playlist(playlist_url)
+
+def indexed_files(folder, suffixes):
+    """Índices ({índice:03d}) con algún archivo de esas extensiones (un solo listado)"""
+    if not folder.exists():
+        return set()
+    return {
+        path.name[:3] for path in folder.iterdir()
+        if path.suffix in suffixes and path.name[:3].isdigit()
+        and 'ERROR' not in path.name and 'NO_SUBS' not in path.name
+    }
 
 def has_subtitle(folder, index, video_id):
     """Check if video already has subtitle downloaded"""
-    patterns = [
-        f"{index:03d}_*.json3",
-        f"{index:03d}_*.json",
-        f"{index:03d}_*.txt"
-    ]
-    for pattern in patterns:
-        matches = list(folder.glob(pattern))
-        valid = [m for m in matches if 'ERROR' not in m.name and 'NO_SUBS' not in m.name]
-        if valid:
-            return True
-    return False
+    return f"{index:03d}" in indexed_files(folder, ('.json3', '.json', '.txt'))
+
+def find_audio(folder, index):
+    """Audio ya descargado de ese índice (cualquier formato) o None"""
+    return next((path for path in sorted(folder.glob(f"{index:03d}_*"))
+                 if path.suffix in AUDIO_EXTENSIONS), None)
 
 def has_audio(folder, index):
     """Check if audio already downloaded"""
-    pattern = f"{index:03d}_*.mp3"
-    return len(list(folder.glob(pattern))) > 0
+    return find_audio(folder, index) is not None
 
-def download_audio(video_id, output_dir, index, title, retries=3):
-    """Download audio as MP3 128kbps with retry logic"""
+def download_audio(video_id, output_dir, index, title, retries=3, audio_format='mp3'):
+    """Download audio (MP3 128kbps or an ASR format) with retry logic"""
     # Sanitize title for filename
     safe_title = "".join(c for c in title if c.isalnum() or c in " -_").strip()[:80]
     output_template = f"{index:03d}_{safe_title}"
-    url = f"https://www.youtube.com/watch?v={video_id}"
     
     for attempt in range(retries):
-        cmd = f'yt-dlp -x --audio-format mp3 --audio-quality 128K --no-playlist -o "{output_template}.%(ext)s" "{url}"'
-        
+        # yt-dlp en proceso: sesión y extractores reutilizados entre videos.
+        # Cada reintento continúa el .part existente (Range) en vez de empezar de cero
         try:
-            result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=600, cwd=str(output_dir))
-            if result.returncode == 0:
+            success, error = get_engine().download_audio([(output_template, video_id)], Path(output_dir),
+                                                          audio_format)[0]
+            if success:
                 return True, "Success"
-            error = result.stderr[:100] if result.stderr else "Unknown error"
-            if attempt < retries - 1:
-                print(f"     ⚠️ Reintentando ({attempt + 2}/{retries})...")
-                time.sleep(5)
-        except subprocess.TimeoutExpired:
             if attempt < retries - 1:
-                print(f"     ⚠️ Timeout, reintentando...")
+                print(f"     ⚠️ #{index} Reintentando ({attempt + 2}/{retries})...")
                 time.sleep(5)
-            else:
-                return False, "Timeout after retries"
+        except RateLimited:
+            raise  # fetch_all reduce la tasa y reintenta
         except Exception as e:
             return False, str(e)
     
     return False, f"Failed after {retries} attempts"
 
+def download_job(job, progress, playlist_name, folder, audio_folder, total, audio_format):
+    """Descarga un video (corre en un thread) y guarda el progreso al terminar"""
+    i, idx, video = job
+    print(f"  [{i}/{total}] #{idx} - {video['title'][:45]}...", flush=True)
+
+    success, msg = download_audio(video['id'], audio_folder, idx, video['title'], audio_format=audio_format)
+
+    audio = find_audio(audio_folder, idx) if success else None
+    if success:
+        print(f"     ✅ #{idx} Descargado", flush=True)
+        if audio:
+            manifest_index.mark_audio(folder, audio.stem, True, audio.stat().st_size, audio.suffix[1:])
+    else:
+        print(f"     ❌ #{idx} Error: {msg[:50]}", flush=True)
+
+    with _progress_lock:
+        entry = progress[playlist_name]
+        (entry['downloaded'] if success else entry['failed']).add(video['id'])
+        entry['last_updated'] = datetime.now().isoformat()
+    save_progress(progress)
+    return {'success': success, 'index': idx, 'error': msg}
+
 def main():
+    parser = argparse.ArgumentParser(description='Descarga de audio para videos sin subtítulos')
+    parser.add_argument('--workers', type=int, default=CONCURRENCY,
+                        help=f'Descargas simultáneas (default: {CONCURRENCY})')
+    parser.add_argument('--audio-format', choices=list(AUDIO_FORMATS), default=None,
+                        help='Formato para todas las playlists (default: "audio_format" de cada playlist)')
+    args = parser.parse_args()
+
     print("=" * 60)
     print("AUDIO DOWNLOADER ROBUSTO - Videos sin subtítulos")
     print("=" * 60)
     print(f"📁 Destino: {AUDIO_DIR}")
     print(f"📊 Progreso: {PROGRESS_FILE}")
+    print(f"⚡ Descargas simultáneas: {args.workers}")
     print()
     
     progress = load_progress()
     
     for playlist_name, config in PLAYLIST_CONFIG.items():
-        print(f"\n📚 {playlist_name.upper()}")
+        audio_format = args.audio_format or config.get("audio_format", "mp3")
+        print(f"\n📚 {playlist_name.upper()} ({audio_format})")
         
         # Initialize progress for playlist
         if playlist_name not in progress:
-            progress[playlist_name] = {
-                'downloaded': [],
-                'failed': [],
-                'skipped': [],
-                'last_updated': None
-            }
+            progress[playlist_name] = new_playlist_progress()
+        entry = progress[playlist_name]
         
         # Create directories
         transcript_folder = TRANSCRIPTS_DIR / config["folder"]
@@ -151,32 +202,31 @@ def main():
         
         print(f"  📊 Total videos en playlist: {len(videos)}")
         
+        # Un listado por carpeta en vez de un glob por video
+        with_subtitles = indexed_files(transcript_folder, ('.json3', '.json', '.txt'))
+        with_audio = indexed_files(audio_folder, AUDIO_EXTENSIONS)
+        
         # Find videos that need audio download
         to_download = []
         for idx, video in enumerate(videos, 1):
             # Skip if already has subtitle
-            if has_subtitle(transcript_folder, idx, video['id']):
-                if video['id'] not in progress[playlist_name]['skipped']:
-                    progress[playlist_name]['skipped'].append(video['id'])
+            if f"{idx:03d}" in with_subtitles:
+                entry['skipped'].add(video['id'])
                 continue
             
             # Skip if already downloaded audio
-            if has_audio(audio_folder, idx):
-                if video['id'] not in progress[playlist_name]['downloaded']:
-                    progress[playlist_name]['downloaded'].append(video['id'])
+            if f"{idx:03d}" in with_audio:
+                entry['downloaded'].add(video['id'])
                 continue
             
             # Skip if already processed (failed)
-            if video['id'] in progress[playlist_name]['failed']:
+            if video['id'] in entry['failed']:
                 continue
             
             to_download.append((idx, video))
         
-        already_done = len(progress[playlist_name]['downloaded'])
-        skipped = len(progress[playlist_name]['skipped'])
-        
-        print(f"  ✅ Ya descargados: {already_done}")
-        print(f"  ⏭️  Con subtítulos (skip): {skipped}")
+        print(f"  ✅ Ya descargados: {len(entry['downloaded'])}")
+        print(f"  ⏭️  Con subtítulos (skip): {len(entry['skipped'])}")
         print(f"  ⏳ Pendientes: {len(to_download)}")
         
         if not to_download:
@@ -185,36 +235,28 @@ def main():
         
         save_progress(progress)
         
-        # Download pending audios
-        for i, (idx, video) in enumerate(to_download, 1):
-            print(f"\n  [{i}/{len(to_download)}] #{idx} - {video['title'][:45]}...")
-            
-            success, msg = download_audio(video['id'], audio_folder, idx, video['title'])
-            
-            if success:
-                print(f"     ✅ Descargado")
-                progress[playlist_name]['downloaded'].append(video['id'])
-            else:
-                print(f"     ❌ Error: {msg[:50]}")
-                progress[playlist_name]['failed'].append(video['id'])
-            
-            progress[playlist_name]['last_updated'] = datetime.now().isoformat()
-            save_progress(progress)
-            
-            # Brief pause to avoid rate limiting
-            time.sleep(2)
+        # Download pending audios (varias en paralelo; el rate limit se adapta a los 429)
+        jobs = [(i, idx, video) for i, (idx, video) in enumerate(to_download, 1)]
+        fetch_all(
+            jobs,
+            lambda job: download_job(job, progress, playlist_name, config["folder"], audio_folder, len(jobs),
+                                     audio_format),
+            concurrency=args.workers,
+            rate=INITIAL_RATE,
+        )
+        print(f"\n  🚦 Bloqueos detectados: {limiter_for().blocks}")
         
         # Summary
         print(f"\n  📊 Progreso actual:")
-        print(f"     Descargados: {len(progress[playlist_name]['downloaded'])}")
-        print(f"     Fallidos: {len(progress[playlist_name]['failed'])}")
-        print(f"     Skipped (tienen subs): {len(progress[playlist_name]['skipped'])}")
+        print(f"     Descargados: {len(entry['downloaded'])}")
+        print(f"     Fallidos: {len(entry['failed'])}")
+        print(f"     Skipped (tienen subs): {len(entry['skipped'])}")
     
     print("\n" + "=" * 60)
     print("✅ Sesión completada")
     print(f"📁 Audios en: {AUDIO_DIR}")
     print(f"📊 Progreso guardado en: {PROGRESS_FILE}")
-    print("\n💡 Ejecuta de nuevo para continuar si fue interrumpido")
+    print("\n💡 Ejecuta de nuevo para continuar si fue interrumpido (los .part se reanudan)")
     print("=" * 60)
 
 if __name__ == "__main__":
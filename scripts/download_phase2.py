@@ -4,12 +4,16 @@ Adds new playlists: Aleph-Bet, 72 Names, Metatron Wisdom
 """
 
 import os
+import sys
 import json
 import time
 import subprocess
 from datetime import datetime
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent))
+from playlist_catalog import get_playlist_ids
+
 BASE_DIR = Path("c:/Users/paparinots/Documents/Kabbalah")
 TRANSCRIPTS_DIR = BASE_DIR / "transcripciones"
 STATUS_FILE = BASE_DIR / "download_status_phase2.json"
@@ -51,14 +55,8 @@ PLAYLISTS = {
 BATCH_SIZE = 3  # Per playlist per run
 
 def get_playlist_videos(playlist_url):
-    cmd = f'yt-dlp --flat-playlist --print id "{playlist_url}"'
-    try:
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=120, cwd=str(BASE_DIR))
-        if result.returncode == 0 and result.stdout.strip():
-            return [vid.strip() for vid in result.stdout.strip().split('\n') if vid.strip()]
-    except Exception as e:
-        print(f"Error: {e}")
-    return []
+    """Get list of video IDs in playlist (catálogo compartido con TTL)"""
+    return get_playlist_ids(playlist_url)
 
 def download_subtitle(video_id, output_dir, index):
     output_template = f"{index:03d}_%(title)s"
@@ -6,12 +6,17 @@ Robust Subtitle Downloader v2 - FIXED
 """
 
 import os
+import sys
 import json
 import time
 import subprocess
 from datetime import datetime
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent))
+from ytdlp_engine import get_engine
+from playlist_catalog import get_playlist_ids
+
 # Configuration - use absolute paths
 BASE_DIR = Path("c:/Users/paparinots/Documents/Kabbalah")
 TRANSCRIPTS_DIR = BASE_DIR / "transcripciones"
@@ -53,34 +58,13 @@ PLAYLISTS = {
 }
 
 def get_playlist_videos(playlist_url):
-    """Get list of video IDs in playlist"""
-    cmd = f'yt-dlp --flat-playlist --print id "{playlist_url}"'
-    try:
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=120, cwd=str(BASE_DIR))
-        if result.returncode == 0 and result.stdout.strip():
-            return [vid.strip() for vid in result.stdout.strip().split('\n') if vid.strip()]
-    except Exception as e:
-        print(f"Error: {e}")
-    return []
+    """Get list of video IDs in playlist (catálogo compartido con TTL)"""
+    return get_playlist_ids(playlist_url)
 
 def download_subtitle(video_id, output_dir, index):
-    """Download subtitle for a single video"""
-    # Change to output directory before running
-    output_template = f"{index:03d}_%(title)s"
-    url = f"https://www.youtube.com/watch?v={video_id}"
-    
-    cmd = f'yt-dlp --skip-download --write-auto-sub --sub-lang es --sub-format json3 -o "{output_template}" "{url}"'
-    
+    """Download subtitle for a single video (yt-dlp en proceso, sesión reutilizada)"""
     try:
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=120, cwd=str(output_dir))
-        if result.returncode == 0 and "Writing video subtitles" in result.stdout:
-            return True, "Success"
-        elif "no subtitles" in result.stdout.lower() or "no subtitles" in result.stderr.lower():
-            return False, "No subtitles available"
-        else:
-            return False, result.stderr[:100] if result.stderr else result.stdout[:100]
-    except subprocess.TimeoutExpired:
-        return False, "Timeout"
+        return get_engine().download_subtitles([(index, video_id)], Path(output_dir))[0]
     except Exception as e:
         return False, str(e)
 
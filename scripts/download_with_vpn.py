@@ -7,8 +7,11 @@ Compatible with youtube-transcript-api v1.2.3+
 from youtube_transcript_api import YouTubeTranscriptApi
 import json
 import os
+import sys
 import time
-import random
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from subtitle_fetcher import fetch_all, is_block_error
 
 PLAYLISTS = {
     'Secretos_del_Zohar': {
@@ -62,6 +65,8 @@ def download_transcript(video_id, output_dir, index):
         return True
         
     except Exception as e:
+        if is_block_error(e):
+            raise  # fetch_all reduce la tasa y reintenta
         error_msg = str(e)
         print(f"❌ {index:03d} - {video_id}: {error_msg[:60]}")
         
@@ -122,25 +127,13 @@ def main():
             print("   ✅ All done for this playlist!")
             continue
         
-        # Download with delays
-        success = 0
-        failed = 0
-        
-        for idx, (num, vid) in enumerate(to_download):
-            if download_transcript(vid, output_dir, num):
-                success += 1
-            else:
-                failed += 1
-            
-            # Random delay
-            if idx < len(to_download) - 1:
-                delay = random.uniform(2, 4)
-                time.sleep(delay)
-            
-            # Longer pause every 10
-            if (idx + 1) % 10 == 0:
-                print(f"   ⏸️ Pausing 20s...")
-                time.sleep(20)
+        # Download (rate limit adaptativo en subtitle_fetcher)
+        results = fetch_all(
+            to_download,
+            lambda job: {'success': download_transcript(job[1], output_dir, job[0])}
+        )
+        success = sum(1 for r in results if r['success'])
+        failed = len(results) - success
         
         total_success += success
         total_failed += failed
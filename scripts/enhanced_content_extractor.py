@@ -16,6 +16,12 @@ from openai import OpenAI
 from pathlib import Path
 from dotenv import load_dotenv
 import argparse
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent))
+from transcript_chunking import extract_chunked
+import llm_cache
+from llm_cache import cached_chat_completion, parse_json_response
 
 load_dotenv()
 
@@ -265,19 +271,14 @@ def create_transcript_text(transcript_data: List[Dict]) -> str:
         lines.append(f"{timestamp} {segment['text']}")
     return "\n".join(lines)
 
-def extract_enhanced_content(transcription: Dict[str, Any]) -> Dict[str, Any]:
-    """Extrae contenido enriquecido con IA"""
-    
-    metadata = transcription['metadata']
-    transcript_data = transcription['transcript']
+def extract_window_content(metadata: Dict[str, Any], segments: List[Dict],
+                           index: int = 1, total: int = 1) -> Dict[str, Any]:
+    """Extrae contenido enriquecido de una ventana de la transcripción"""
     
     # Crear texto de transcripción
-    transcript_text = create_transcript_text(transcript_data)
-    
-    # Limitar a ~15000 palabras
-    words = transcript_text.split()
-    if len(words) > 15000:
-        transcript_text = ' '.join(words[:15000]) + "\n\n[TRANSCRIPCIÓN TRUNCADA...]"
+    transcript_text = create_transcript_text(segments)
+    if total > 1:
+        transcript_text = f"[FRAGMENTO {index}/{total} DE LA CLASE]\n{transcript_text}"
     
     # Crear prompt
     prompt = EXTRACTION_PROMPT.format(
@@ -287,29 +288,40 @@ def extract_enhanced_content(transcription: Dict[str, Any]) -> Dict[str, Any]:
         transcript_text=transcript_text
     )
     
-    print(f"\n🤖 Procesando: {metadata['video_title'][:60]}...")
-    print(f"   📊 {metadata['total_words']} palabras, {metadata['duration_minutes']:.1f} min")
-    
     try:
-        response = client.chat.completions.create(
-            model=OLLAMA_MODEL,
-            messages=[
+        params = {
+            "model": OLLAMA_MODEL,
+            "messages": [
                 {"role": "system", "content": SYSTEM_PROMPT},
                 {"role": "user", "content": prompt}
             ],
-            temperature=0.3,
-            max_tokens=8000  # Permitir respuestas largas
-        )
+            "temperature": 0.3,
+            "max_tokens": 8000  # Permitir respuestas largas
+        }
         
-        content = response.choices[0].message.content
+        return cached_chat_completion(client, 'ollama', params, parse=parse_json_response)
         
-        # Limpiar JSON si viene con markdown
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0]
-        elif "```" in content:
-            content = content.split("```")[1].split("```")[0]
+    except Exception as e:
+        print(f"   ✗ Error ventana {index}/{total}: {str(e)}")
+        return None
+
+def extract_enhanced_content(transcription: Dict[str, Any]) -> Dict[str, Any]:
+    """Extrae contenido enriquecido con IA (por ventanas, sin truncar)"""
+    
+    metadata = transcription['metadata']
+    transcript_data = transcription['transcript']
+    
+    print(f"\n🤖 Procesando: {metadata['video_title'][:60]}...")
+    print(f"   📊 {metadata['total_words']} palabras, {metadata['duration_minutes']:.1f} min")
+    
+    try:
+        result = extract_chunked(
+            transcript_data,
+            lambda segments, index, total: extract_window_content(metadata, segments, index, total)
+        )
         
-        result = json.loads(content.strip())
+        if not result:
+            return None
         
         # Estadísticas
         stats = {
@@ -430,6 +442,7 @@ def process_directory(input_dir: str, limit: int = None):
     print(f"✗  Fallidos: {failed}")
     print(f"⏱️  Tiempo: {elapsed:.1f} minutos")
     print(f"💾 Guardados en: {OUTPUT_DIR.absolute()}")
+    llm_cache.print_stats()
     print(f"{'='*70}\n")
 
 if __name__ == "__main__":
@@ -438,7 +451,12 @@ if __name__ == "__main__":
                        help='Directorio con archivos JSON de transcripciones')
     parser.add_argument('--limit', type=int, default=None,
                        help='Límite de archivos a procesar (para pruebas)')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='No usar la caché de respuestas del modelo')
     
     args = parser.parse_args()
     
+    if args.no_cache:
+        llm_cache.set_enabled(False)
+    
     process_directory(args.input, args.limit)
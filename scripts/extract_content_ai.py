@@ -27,16 +27,24 @@ if sys.platform == 'win32':
 import os
 import json
 import time
+import threading
 import os
 import sys
 print(f"DEBUG: Starting script PID {os.getpid()}")
 from typing import Dict, List, Any, Optional
 print("DEBUG: Importing openai...")
 from openai import OpenAI
+from concurrent.futures import ThreadPoolExecutor, as_completed
 print("DEBUG: Importing pathlib...")
 from pathlib import Path
 print("DEBUG: Importing dotenv...")
 from dotenv import load_dotenv
+sys.path.insert(0, str(Path(__file__).parent))
+from transcript_chunking import extract_chunked
+import llm_cache
+import manifest_index
+import stage_queue
+from llm_cache import cached_chat_completion, parse_json_response
 print("DEBUG: Imports complete.")
 
 # Cargar variables de entorno desde .env
@@ -72,6 +80,7 @@ client.timeout = 1200.0  # 20 minutos para videos largos
 # Directorios base (ajustado para correr desde scripts/)
 OUTPUT_DIR = Path("contenido_procesado")
 OUTPUT_DIR.mkdir(exist_ok=True)
+PARTIAL_SUFFIX = '.partial.jsonl'  # prefijo de una transcripción en curso (streaming_transcription)
 
 # Configuración por playlist
 PLAYLIST_CONFIG = {
@@ -160,14 +169,47 @@ PLAYLIST_CONFIG = {
     }
 }
 
+# Carpetas de transcripciones cuyo nombre no coincide con PLAYLIST_CONFIG
+# (master_playlist_processor escribe secretos_zohar en Secretos_del_Zohar)
+TRANSCRIPTS_BASE = Path('transcripciones')
+FOLDER_ALIASES = {
+    'secretos_del_zohar': 'secretos_zohar',
+}
+
+def playlist_for_folder(folder: str) -> Optional[str]:
+    """Clave de PLAYLIST_CONFIG de una carpeta de transcripciones (eventos de la cola y manifest)
+
+    Los productores publican el nombre de la carpeta, no la clave de config.
+    """
+    name = folder.lower()
+    if name in PLAYLIST_CONFIG:
+        return name
+    for key, config in PLAYLIST_CONFIG.items():
+        if Path(config['dir']).name.lower() == name:
+            return key
+    return FOLDER_ALIASES.get(name)
+
 # Playlist seleccionada (se configura desde argv)
 CURRENT_PLAYLIST = 'secretos_zohar'  # Default
 TRANSCRIPTIONS_DIR = Path(PLAYLIST_CONFIG[CURRENT_PLAYLIST]['dir'])
-SYSTEM_PROMPT = f"""Eres un experto en Kabbalah y análisis de contenido espiritual.
-{PLAYLIST_CONFIG[CURRENT_PLAYLIST]['prompt']}
+SYSTEM_PROMPT = ""
+
+def playlist_system_prompt(playlist: str) -> str:
+    """System prompt de una playlist"""
+    return f"""Eres un experto en Kabbalah y análisis de contenido espiritual.
+{PLAYLIST_CONFIG[playlist]['prompt']}
 
 Devuelve SOLO un JSON válido sin explicaciones adicionales."""
 
+def configure_playlist(playlist: str):
+    """Selecciona la playlist activa (directorio y system prompt)"""
+    global CURRENT_PLAYLIST, TRANSCRIPTIONS_DIR, SYSTEM_PROMPT
+    CURRENT_PLAYLIST = playlist
+    TRANSCRIPTIONS_DIR = Path(PLAYLIST_CONFIG[playlist]['dir'])
+    SYSTEM_PROMPT = playlist_system_prompt(playlist)
+
+configure_playlist(CURRENT_PLAYLIST)
+
 EXTRACTION_PROMPT_TEMPLATE = """Analiza la siguiente clase de Kabbalah y extrae el contenido estructurado siguiendo estas REGLAS CRÍTICAS:
 
 1. **PROHIBIDO INVENTAR**: Solo extrae información que aparezca explícitamente en la transcripción.
@@ -214,8 +256,19 @@ TRANSCRIPCIÓN:
 
 def load_transcription(json_path: Path) -> Dict[str, Any]:
     """Carga una transcripción desde JSON"""
-    with open(json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    if json_path.name.endswith(PARTIAL_SUFFIX):
+        # Prefijo terminado de una transcripción en curso (streaming_transcription)
+        from streaming_transcription import read_partial
+        segments = read_partial(json_path)
+        data = {
+            'text': "".join(seg.get('text', '') for seg in segments),
+            'segments': segments,
+            'language': 'es'
+        }
+        json_path = json_path.with_name(json_path.name[:-len(PARTIAL_SUFFIX)] + '.partial')
+    else:
+        with open(json_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
     
     # Detector de formato json3 / raw chat
     if 'wireMagic' in data and 'events' in data:
@@ -277,22 +330,22 @@ def create_transcript_text(transcript_data: List[Dict]) -> str:
         lines.append(f"{timestamp} {segment['text']}")
     return "\n".join(lines)
 
-def extract_content_with_gpt4(transcription: Dict[str, Any]) -> Dict[str, Any]:
-    """Usa GPT-4 para extraer contenido estructurado"""
-    
-    metadata = transcription['metadata']
-    transcript_data = transcription['transcript']
+def extract_window_with_gpt4(metadata: Dict[str, Any], segments: List[Dict],
+                             index: int = 1, total: int = 1,
+                             system_prompt: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Extrae contenido estructurado de una ventana de la transcripción
+
+    system_prompt: el de otra playlist (default: el de configure_playlist)
+    """
     
     # Crear texto de transcripción
-    transcript_text = create_transcript_text(transcript_data)
-    
-    # Limitar a ~15000 palabras para no exceder límite de tokens
+    transcript_text = create_transcript_text(segments)
     words = transcript_text.split()
-    if len(words) > 15000:
-        transcript_text = ' '.join(words[:15000]) + "\n\n[TRANSCRIPCIÓN TRUNCADA...]"
+    if total > 1:
+        transcript_text = f"[FRAGMENTO {index}/{total} DE LA CLASE]\n{transcript_text}"
     
     # Crear prompt
-    if len(words) < 300:
+    if total == 1 and len(words) < 300:
         # Prompt simplificado para videos muy cortos
         prompt = f"""Analiza este fragmento breve de una clase de Kabbalah y extrae el contenido estructurado.
 clase: {metadata['video_title']}
@@ -310,15 +363,12 @@ No falles por falta de contenido, devuelve arrays vacíos si es necesario."""
             transcript_text=transcript_text
         )
     
-    print(f"\n[AI] Procesando con GPT-4: {metadata['video_title'][:60]}...")
-    print(f"   [STATS] {metadata['total_words']} palabras, {metadata['duration_minutes']:.1f} min")
-    
     try:
         # Configurar parámetros según proveedor
         params = {
             "model": MODEL,
             "messages": [
-                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "system", "content": system_prompt or SYSTEM_PROMPT},
                 {"role": "user", "content": prompt}
             ],
             "temperature": 0.3
@@ -333,22 +383,9 @@ No falles por falta de contenido, devuelve arrays vacíos si es necesario."""
         result = None
         for attempt in range(max_retries):
             try:
-                print(f"   [REQ] Enviando solicitud (Intento {attempt+1}/{max_retries})...", flush=True)
-                response = client.chat.completions.create(**params)
-                content = response.choices[0].message.content
-                
-                # Intentar parsear JSON (limpiar si es necesario)
-                try:
-                    result = json.loads(content)
-                except json.JSONDecodeError:
-                    # A veces DeepSeek/Ollama incluye markdown, limpiar
-                    if "```json" in content:
-                        clean_content = content.split("```json")[1].split("```")[0]
-                    elif "```" in content:
-                        clean_content = content.split("```")[1].split("```")[0]
-                    else:
-                        clean_content = content
-                    result = json.loads(clean_content.strip())
+                print(f"   [REQ] Ventana {index}/{total}: enviando solicitud (Intento {attempt+1}/{max_retries})...", flush=True)
+                # Caché en disco: un prompt idéntico no vuelve al modelo
+                result = cached_chat_completion(client, PROVIDER, params, parse=parse_json_response)
                 
                 # Si llegamos aquí sin excepción, break
                 break
@@ -356,10 +393,35 @@ No falles por falta de contenido, devuelve arrays vacíos si es necesario."""
             except Exception as e:
                 print(f"   [WARN] Error en intento {attempt+1}: {e}", flush=True)
                 if attempt == max_retries - 1:
-                    print(f"   [ERROR] Agotados intentos para este video.", flush=True)
+                    print(f"   [ERROR] Agotados intentos para esta ventana.", flush=True)
                     return None
                 time.sleep(5) # Esperar antes de reintentar
         
+        return result or None
+        
+    except Exception as e:
+        print(f"   [ERROR] Ventana {index}/{total}: {str(e)}")
+        return None
+
+def extract_content_with_gpt4(transcription: Dict[str, Any], system_prompt: Optional[str] = None) -> Dict[str, Any]:
+    """Usa GPT-4 para extraer contenido estructurado
+
+    Las clases largas se dividen en ventanas solapadas que se extraen en
+    paralelo y se combinan (ver transcript_chunking), sin truncar.
+    """
+    
+    metadata = transcription['metadata']
+    transcript_data = transcription['transcript']
+    
+    print(f"\n[AI] Procesando con GPT-4: {metadata['video_title'][:60]}...")
+    print(f"   [STATS] {metadata['total_words']} palabras, {metadata['duration_minutes']:.1f} min")
+    
+    try:
+        result = extract_chunked(
+            transcript_data,
+            lambda segments, index, total: extract_window_with_gpt4(metadata, segments, index, total, system_prompt)
+        )
+        
         if not result:
             return None
         
@@ -388,16 +450,49 @@ No falles por falta de contenido, devuelve arrays vacíos si es necesario."""
         print(f"   [ERROR]: {str(e)}")
         return None
 
-def process_video(json_file: Path) -> Dict[str, Any]:
-    """Procesa un video completo"""
+def write_json_atomic(output_file: Path, data: Dict[str, Any]):
+    """Escribe un JSON de forma atómica (archivo temporal + rename)
+
+    Evita dejar un _extracted.json a medio escribir si el proceso muere,
+    lo que haría que la siguiente corrida lo saltara como "ya procesado".
+    """
+    tmp_file = output_file.with_name(f".{output_file.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, output_file)
+    finally:
+        if tmp_file.exists():
+            tmp_file.unlink()
+
+def extraction_path(json_file: Path) -> Path:
+    """Archivo de salida de una transcripción
+
+    Los parciales van a {stem}_partial_extract.json: no coinciden con el
+    glob *_extracted.json de los consolidadores, así una clase en curso no
+    aparece dos veces cuando llega su extracción final.
+    """
+    if json_file.name.endswith(PARTIAL_SUFFIX):
+        return OUTPUT_DIR / f"{json_file.name[:-len(PARTIAL_SUFFIX)]}_partial_extract.json"
+    return OUTPUT_DIR / f"{json_file.stem}_extracted.json"
+
+def process_video(json_file: Path, playlist: Optional[str] = None, force: bool = False) -> Dict[str, Any]:
+    """Procesa un video completo
+
+    Con `playlist` usa el prompt de esa playlist sin tocar la configuración
+    global (varios hilos pueden extraer playlists distintas a la vez).
+    Con `force` re-extrae aunque ya exista la salida.
+    """
     
     print(f"\n{'='*70}", flush=True)
     print(f"[VIDEO] {json_file.stem}", flush=True)
     print(f"{'='*70}", flush=True)
     
-    # Verificar si ya existe
-    output_file = OUTPUT_DIR / f"{json_file.stem}_extracted.json"
-    if output_file.exists():
+    # Verificar si ya existe (los parciales se re-extraen: el prefijo crece
+    # y las ventanas ya vistas salen de la caché)
+    is_partial = json_file.name.endswith(PARTIAL_SUFFIX)
+    output_file = extraction_path(json_file)
+    if output_file.exists() and not is_partial and not force:
         print(f"   [SKIP] Ya procesado: {output_file.name}", flush=True)
         return {'status': 'skipped', 'file': str(output_file)}
 
@@ -405,7 +500,7 @@ def process_video(json_file: Path) -> Dict[str, Any]:
     transcription = load_transcription(json_file)
     
     # Extraer contenido
-    extracted = extract_content_with_gpt4(transcription)
+    extracted = extract_content_with_gpt4(transcription, playlist_system_prompt(playlist) if playlist else None)
     
     if extracted:
         # Agregar metadata original
@@ -413,17 +508,49 @@ def process_video(json_file: Path) -> Dict[str, Any]:
         extracted['processed_at'] = time.strftime('%Y-%m-%d %H:%M:%S')
         
         # Guardar resultado
-        output_file = OUTPUT_DIR / f"{json_file.stem}_extracted.json"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(extracted, f, ensure_ascii=False, indent=2)
+        write_json_atomic(output_file, extracted)
+        if not is_partial:
+            manifest_index.mark_processed(json_file.parent.name, json_file.stem)
+            # La extracción final reemplaza a la del prefijo parcial (y al
+            # nombre viejo {stem}.partial_extracted.json, que sí se consolidaba)
+            for partial_output in (extraction_path(json_file.with_name(json_file.stem + PARTIAL_SUFFIX)),
+                                   OUTPUT_DIR / f"{json_file.stem}.partial_extracted.json"):
+                if partial_output.exists():
+                    partial_output.unlink()
         
         print(f"   [SAVED] Guardado en: {output_file}", flush=True)
         return extracted
     
     return None
 
-def process_all_videos(limit: int = None):
-    """Procesa todos los videos en el directorio"""
+def provider_ready() -> bool:
+    """Valida la API key (o la conexión con Ollama) del proveedor configurado"""
+    if PROVIDER == 'deepseek' and not os.getenv('DEEPSEEK_API_KEY'):
+        print("\n[ERROR] No se encontró DEEPSEEK_API_KEY")
+        print("Por favor configura la variable de entorno")
+        return False
+    elif PROVIDER == 'openai' and not os.getenv('OPENAI_API_KEY'):
+        print("\n[ERROR] No se encontró OPENAI_API_KEY")
+        print("Por favor configura la variable de entorno")
+        return False
+    elif PROVIDER == 'ollama':
+        # Simple connectivity check
+        try:
+            print(f"   [DEBUG] Probando conexión a {client.base_url}...", flush=True)
+            client.models.list()
+            print("   [OK] Conexión con Ollama exitosa", flush=True)
+        except Exception as e:
+            print(f"\n[ERROR] No se pudo conectar con Ollama en {client.base_url}")
+            print(f"Error: {e}")
+            return False
+    return True
+
+def process_all_videos(limit: int = None, workers: int = 1, include_partial: bool = False):
+    """Procesa todos los videos en el directorio
+
+    Con workers > 1 mantiene hasta N solicitudes en vuelo contra el
+    proveedor (útil con Ollama, que atiende varias en paralelo).
+    """
     
     print("="*70)
     print("EXTRACCION DE CONTENIDO CON IA")
@@ -434,6 +561,15 @@ def process_all_videos(limit: int = None):
     json_files = sorted(list(TRANSCRIPTIONS_DIR.glob("*.json")) + list(TRANSCRIPTIONS_DIR.glob("*.json3")))
     json_files = [f for f in json_files if not f.name.startswith('_')]
     
+    if include_partial:
+        # Transcripciones Whisper en curso sin JSON final todavía
+        finished = {f.stem for f in json_files}
+        partials = [f for f in sorted(TRANSCRIPTIONS_DIR.glob("*" + PARTIAL_SUFFIX))
+                    if f.name[:-len(PARTIAL_SUFFIX)] not in finished]
+        json_files += partials
+        if partials:
+            print(f"[INFO] Incluyendo {len(partials)} transcripciones parciales", flush=True)
+    
     if limit:
         json_files = json_files[:limit]
 
@@ -462,25 +598,8 @@ def process_all_videos(limit: int = None):
     if critical_files:
         print(f"   [INFO] Priorizando {len(critical_files)} videos críticos.", flush=True)
     
-    # Validar API key según proveedor
-    if PROVIDER == 'deepseek' and not os.getenv('DEEPSEEK_API_KEY'):
-        print("\n[ERROR] No se encontró DEEPSEEK_API_KEY")
-        print("Por favor configura la variable de entorno")
+    if not provider_ready():
         return
-    elif PROVIDER == 'openai' and not os.getenv('OPENAI_API_KEY'):
-        print("\n[ERROR] No se encontró OPENAI_API_KEY")
-        print("Por favor configura la variable de entorno")
-        return
-    elif PROVIDER == 'ollama':
-        # Simple connectivity check
-        try:
-            print(f"   [DEBUG] Probando conexión a {client.base_url}...", flush=True)
-            client.models.list()
-            print("   [OK] Conexión con Ollama exitosa", flush=True)
-        except Exception as e:
-            print(f"\n[ERROR] No se pudo conectar con Ollama en {client.base_url}")
-            print(f"Error: {e}")
-            return
     
     #input("\n✋ Presiona ENTER para comenzar el procesamiento...")
     print("\n[INFO] Iniciando procesamiento automático...", flush=True)
@@ -490,11 +609,8 @@ def process_all_videos(limit: int = None):
     failed = 0
     start_time = time.time()
     
-    for idx, json_file in enumerate(json_files, 1):
-        print(f"\n[{idx}/{len(json_files)}]", flush=True)
-        
-        result = process_video(json_file)
-        
+    def record(result):
+        nonlocal successful, failed
         if result:
             if result.get('status') == 'skipped':
                 print("   [SKIP] Saltado.", flush=True)
@@ -503,11 +619,30 @@ def process_all_videos(limit: int = None):
                 successful += 1
         else:
             failed += 1
-        
-        # Pausa entre requests para no exceder rate limit
-        if idx < len(json_files):
-            print("   [WAIT] Pausa 2s...", flush=True)
-            time.sleep(2)
+    
+    if workers > 1:
+        print(f"[INFO] Modo concurrente: {workers} solicitudes en paralelo", flush=True)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(process_video, f): f for f in json_files}
+            for idx, future in enumerate(as_completed(futures), 1):
+                json_file = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"   [ERROR] {json_file.name}: {e}", flush=True)
+                    result = None
+                print(f"\n[{idx}/{len(json_files)}] Terminado: {json_file.name}", flush=True)
+                record(result)
+    else:
+        for idx, json_file in enumerate(json_files, 1):
+            print(f"\n[{idx}/{len(json_files)}]", flush=True)
+            
+            record(process_video(json_file))
+            
+            # Pausa entre requests para no exceder rate limit
+            if idx < len(json_files):
+                print("   [WAIT] Pausa 2s...", flush=True)
+                time.sleep(2)
     
     # Resumen final
     elapsed = (time.time() - start_time) / 60
@@ -518,12 +653,88 @@ def process_all_videos(limit: int = None):
     print(f"[OK] Procesados exitosamente: {successful}")
     print(f"[FAIL] Fallidos: {failed}")
     print(f"[TIME] Tiempo total: {elapsed:.1f} minutos")
+    if elapsed > 0:
+        print(f"[RATE] Throughput: {successful / elapsed:.2f} videos/min ({workers} workers)")
     print(f"[INFO] Archivos guardados en: {OUTPUT_DIR}")
+    llm_cache.print_stats()
     print(f"{'='*70}\n")
     
     # Crear resumen agregado
     create_summary(results)
 
+def resolve_transcript(folder: str, stem: str) -> Optional[Path]:
+    """Archivo de transcripción de un evento de la cola (.json o .json3)
+
+    Se busca en la carpeta publicada y, si no está, en la del config.
+    """
+    folders = [TRANSCRIPTS_BASE / folder]
+    playlist = playlist_for_folder(folder)
+    if playlist:
+        folders.append(Path(PLAYLIST_CONFIG[playlist]['dir']))
+    for directory in folders:
+        for suffix in ('.json', '.json3'):
+            path = directory / f"{stem}{suffix}"
+            if path.exists():
+                return path
+    return None
+
+def follow_queue(workers: int = 1, seed: bool = True):
+    """Extrae cada transcripción en cuanto una etapa anterior la publica (stage_queue)
+
+    Reemplaza re-ejecutar el script por playlist cada N segundos: los eventos
+    llegan por la cola y no se vuelve a recorrer ninguna carpeta. Al arrancar
+    se encolan las transcripciones del manifest que aún no tienen extracción.
+    """
+    print("="*70)
+    print("EXTRACCION DE CONTENIDO CON IA - MODO COLA (--follow)")
+    print("="*70)
+
+    if not provider_ready():
+        return
+
+    if seed:
+        backlog = [(folder, stem) for folder, stem in manifest_index.unprocessed()
+                   if playlist_for_folder(folder)]
+        stage_queue.enqueue_many(stage_queue.EXTRACT, backlog)
+        print(f"[INFO] {len(backlog)} transcripciones sin procesar encoladas desde el manifest", flush=True)
+
+    print(f"[INFO] Esperando eventos ({workers} en paralelo)...", flush=True)
+
+    def run(event):
+        playlist = playlist_for_folder(event['playlist'])
+        if playlist is None:
+            return f"playlist sin configuración: {event['playlist']}"
+        json_file = resolve_transcript(event['playlist'], event['stem'])
+        if json_file is None:
+            return "transcripción no encontrada"
+        # Transcripción re-publicada (p. ej. Whisper reemplazó a los subtítulos):
+        # si es más nueva que su extracción se vuelve a extraer
+        output_file = extraction_path(json_file)
+        stale = output_file.exists() and json_file.stat().st_mtime > output_file.stat().st_mtime
+        # Prompt por evento: un lote puede mezclar playlists sin tocar el estado global
+        result = process_video(json_file, playlist, force=stale)
+        return None if result else "extracción fallida"
+
+    processed = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            events = stage_queue.claim_batch(stage_queue.EXTRACT, limit=workers, timeout=60,
+                                             same_playlist=False)
+            if not events:
+                continue
+
+            futures = {executor.submit(run, event): event for event in events}
+            for future in as_completed(futures):
+                event = futures[future]
+                try:
+                    error = future.result()
+                except Exception as e:
+                    error = str(e)
+                stage_queue.complete(event['id'], error=error)
+                processed += 1
+                status = "[OK]" if error is None else f"[FAIL] {error}"
+                print(f"[EVENT] {event['playlist']}/{event['stem']} {status} ({processed} en esta sesión)", flush=True)
+
 def create_summary(results: List[Dict[str, Any]]):
     """Crea un resumen consolidado de todo el contenido extraído"""
     
@@ -608,20 +819,30 @@ if __name__ == "__main__":
     
     parser = argparse.ArgumentParser(description='Extraer contenido estructurado de videos con IA')
     parser.add_argument('--playlist', type=str, default='secretos_zohar',
-                        choices=['secretos_zohar', 'arbol_vida', 'sefer_yetzirah', 'tefila', 'puertas_luz', 'shir_hashirim', 'nombres_72', 'letras_hebreas'],
+                        choices=list(PLAYLIST_CONFIG.keys()),
                        help='Playlist a procesar')
     parser.add_argument('--limit', type=int, default=None,
                        help='Número máximo de videos a procesar (para pruebas)')
+    parser.add_argument('--workers', type=int, default=1,
+                       help='Solicitudes concurrentes al proveedor IA (default: 1, secuencial)')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='No usar la caché de respuestas del modelo')
+    parser.add_argument('--include-partial', action='store_true',
+                       help='Extraer también el prefijo de transcripciones en curso (*.partial.jsonl)')
+    parser.add_argument('--follow', action='store_true',
+                       help='Quedarse escuchando la cola de etapas y extraer cada transcripción nueva al llegar')
     
     args = parser.parse_args()
     
+    if args.no_cache:
+        llm_cache.set_enabled(False)
+    
+    if args.follow:
+        follow_queue(workers=max(1, args.workers))
+        sys.exit(0)
+    
     # Configurar playlist
-    CURRENT_PLAYLIST = args.playlist
-    TRANSCRIPTIONS_DIR = Path(PLAYLIST_CONFIG[CURRENT_PLAYLIST]['dir'])
-    SYSTEM_PROMPT = f"""Eres un experto en Kabbalah y análisis de contenido espiritual.
-{PLAYLIST_CONFIG[CURRENT_PLAYLIST]['prompt']}
-
-Devuelve SOLO un JSON válido sin explicaciones adicionales."""
+    configure_playlist(args.playlist)
     
     print(f"\n[PLAYLIST] Procesando: {CURRENT_PLAYLIST}")
     print(f"[DIR] Directorio: {TRANSCRIPTIONS_DIR}")
@@ -629,4 +850,4 @@ Devuelve SOLO un JSON válido sin explicaciones adicionales."""
     if args.limit:
         print(f"🧪 MODO PRUEBA: procesando solo {args.limit} videos")
     
-    process_all_videos(limit=args.limit)
+    process_all_videos(limit=args.limit, workers=max(1, args.workers), include_partial=args.include_partial)
@@ -0,0 +1,216 @@
+"""
+Extraction Pipeline - Pasada única con todos los extractores
+
+Carga y normaliza cada transcripción UNA sola vez y ejecuta sobre ella
+las etapas seleccionadas en paralelo, en lugar de que cada script haga
+su propio json.load y su propio recorrido del directorio:
+
+- content     -> {stem}_extracted.json    (extract_content_ai)
+- enhanced    -> {stem}_enhanced.json     (enhanced_content_extractor)
+- qa          -> {stem}_qa.json           (qa_extractor)
+- revelations -> {stem}_revelations.json  (revelations_extractor)
+
+Las salidas de cada video se escriben juntas al terminar todas sus
+etapas. Al final se arman las DBs agregadas de Q&A y revelaciones con el
+mismo formato que generan los scripts individuales.
+
+Uso:
+    python scripts/extraction_pipeline.py --playlist secretos_zohar
+    python scripts/extraction_pipeline.py --playlist tefila --stages content,qa --workers 3
+"""
+
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent))
+import llm_cache
+import manifest_index
+import extract_content_ai
+import enhanced_content_extractor
+import qa_extractor
+import revelations_extractor
+from extract_content_ai import load_transcription, write_json_atomic, configure_playlist, PLAYLIST_CONFIG
+
+OUTPUT_DIR = extract_content_ai.OUTPUT_DIR
+
+def _with_source(result: Optional[Dict[str, Any]], json_file: Path) -> Optional[Dict[str, Any]]:
+    """Agrega source_file/processed_at igual que los scripts individuales"""
+    if result:
+        result['source_file'] = str(json_file)
+        result['processed_at'] = time.strftime('%Y-%m-%d %H:%M:%S')
+    return result
+
+# Etapa -> (sufijo de salida, función(transcripción, archivo) -> resultado o None)
+STAGES: Dict[str, tuple] = {
+    'content': (
+        '_extracted.json',
+        lambda t, f: _with_source(extract_content_ai.extract_content_with_gpt4(t), f)
+    ),
+    'enhanced': (
+        '_enhanced.json',
+        lambda t, f: _with_source(enhanced_content_extractor.extract_enhanced_content(t), f)
+    ),
+    'qa': (
+        '_qa.json',
+        lambda t, f: qa_extractor.extract_qa(t, f.name)
+    ),
+    'revelations': (
+        '_revelations.json',
+        lambda t, f: revelations_extractor.extract_revelations(t, f.name)
+    ),
+}
+
+def process_video(json_file: Path, stages: List[str]) -> Dict[str, Any]:
+    """Ejecuta las etapas pendientes de un video sobre una única carga"""
+
+    outputs = {stage: OUTPUT_DIR / f"{json_file.stem}{STAGES[stage][0]}" for stage in stages}
+    pending = [stage for stage in stages if not outputs[stage].exists()]
+
+    if not pending:
+        print(f"   [SKIP] {json_file.stem}: todas las etapas ya procesadas", flush=True)
+        return {'status': 'skipped', 'outputs': outputs}
+
+    # Una sola lectura + normalización para todas las etapas
+    transcription = load_transcription(json_file)
+
+    print(f"   [PIPE] {json_file.stem}: etapas {', '.join(pending)}", flush=True)
+
+    results: Dict[str, Any] = {}
+    with ThreadPoolExecutor(max_workers=len(pending)) as executor:
+        futures = {executor.submit(STAGES[stage][1], transcription, json_file): stage for stage in pending}
+        for future in as_completed(futures):
+            stage = futures[future]
+            try:
+                results[stage] = future.result()
+            except Exception as e:
+                print(f"   [ERROR] {json_file.stem} [{stage}]: {e}", flush=True)
+                results[stage] = None
+
+    # Escribir todas las salidas juntas
+    failed = []
+    for stage in pending:
+        if results.get(stage):
+            write_json_atomic(outputs[stage], results[stage])
+            if stage == 'content':
+                manifest_index.mark_processed(json_file.parent.name, json_file.stem)
+        else:
+            failed.append(stage)
+
+    status = 'failed' if len(failed) == len(pending) else 'ok'
+    if failed:
+        print(f"   [WARN] {json_file.stem}: fallaron {', '.join(failed)}", flush=True)
+    else:
+        print(f"   [SAVED] {json_file.stem}: {len(pending)} salidas", flush=True)
+
+    return {'status': status, 'failed': failed, 'outputs': outputs}
+
+def _load_output(path: Path) -> Dict[str, Any]:
+    if not path.exists():
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def run_pipeline(input_dir: Path, stages: List[str], limit: int = None, workers: int = 1,
+                 qa_output: Optional[str] = None, revelations_output: Optional[str] = None):
+    """Procesa todas las transcripciones del directorio con las etapas indicadas"""
+
+    print("=" * 70)
+    print("PIPELINE DE EXTRACCION (pasada única)")
+    print(f"Directorio: {input_dir}")
+    print(f"Etapas: {', '.join(stages)}")
+    print("=" * 70)
+
+    json_files = sorted(list(input_dir.glob("*.json")) + list(input_dir.glob("*.json3")))
+    json_files = [f for f in json_files if not f.name.startswith('_')]
+
+    if limit:
+        json_files = json_files[:limit]
+
+    print(f"\n[INFO] Videos: {len(json_files)} | Workers: {workers}", flush=True)
+
+    outcomes: Dict[Path, Dict[str, Any]] = {}
+    start_time = time.time()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(process_video, f, stages): f for f in json_files}
+        for idx, future in enumerate(as_completed(futures), 1):
+            json_file = futures[future]
+            try:
+                outcomes[json_file] = future.result()
+            except Exception as e:
+                print(f"   [ERROR] {json_file.name}: {e}", flush=True)
+                outcomes[json_file] = {'status': 'failed', 'failed': stages}
+            print(f"[{idx}/{len(json_files)}] {json_file.name}", flush=True)
+
+    # DBs agregadas (mismo formato que qa_extractor / revelations_extractor)
+    if 'qa' in stages and qa_output:
+        all_qa = []
+        for f in json_files:
+            all_qa.extend(_load_output(OUTPUT_DIR / f"{f.stem}{STAGES['qa'][0]}").get('qa_pairs', []))
+        write_json_atomic(Path(qa_output), qa_extractor.build_qa_database(all_qa))
+        print(f"\n[SAVED] Q&A: {len(all_qa)} pares -> {qa_output}")
+
+    if 'revelations' in stages and revelations_output:
+        all_revelations = []
+        for f in json_files:
+            all_revelations.extend(_load_output(OUTPUT_DIR / f"{f.stem}{STAGES['revelations'][0]}").get('revelations', []))
+        write_json_atomic(Path(revelations_output), revelations_extractor.build_revelations_database(all_revelations))
+        print(f"[SAVED] Revelaciones: {len(all_revelations)} -> {revelations_output}")
+
+    elapsed = (time.time() - start_time) / 60
+    processed = sum(1 for o in outcomes.values() if o['status'] == 'ok')
+    skipped = sum(1 for o in outcomes.values() if o['status'] == 'skipped')
+    failed = sum(1 for o in outcomes.values() if o['status'] == 'failed')
+
+    print(f"\n{'='*70}")
+    print(f"{'  RESUMEN PIPELINE  ':^70}")
+    print(f"{'='*70}")
+    print(f"[OK] Procesados: {processed}")
+    print(f"[SKIP] Ya completos: {skipped}")
+    print(f"[FAIL] Fallidos: {failed}")
+    print(f"[TIME] Tiempo total: {elapsed:.1f} minutos")
+    if elapsed > 0:
+        print(f"[RATE] Throughput: {processed / elapsed:.2f} videos/min")
+    llm_cache.print_stats()
+    print(f"{'='*70}\n")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Pipeline de extracción en una sola pasada')
+    parser.add_argument('--playlist', type=str, default='secretos_zohar',
+                        choices=list(PLAYLIST_CONFIG.keys()),
+                        help='Playlist a procesar (define directorio y prompt)')
+    parser.add_argument('--input', type=str, default=None,
+                        help='Directorio de transcripciones (por defecto el de la playlist)')
+    parser.add_argument('--stages', type=str, default='content,enhanced,qa,revelations',
+                        help=f"Etapas separadas por coma ({', '.join(STAGES)})")
+    parser.add_argument('--limit', type=int, default=None,
+                        help='Número máximo de videos a procesar (para pruebas)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Videos procesados en paralelo')
+    parser.add_argument('--qa-output', default='kabbalah-app/data/qa_database.json',
+                        help='DB agregada de Q&A')
+    parser.add_argument('--revelations-output', default='kabbalah-app/data/revelations_db.json',
+                        help='DB agregada de revelaciones')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='No usar la caché de respuestas del modelo')
+
+    args = parser.parse_args()
+
+    stages = [s.strip() for s in args.stages.split(',') if s.strip()]
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown:
+        parser.error(f"Etapas desconocidas: {', '.join(unknown)}")
+
+    if args.no_cache:
+        llm_cache.set_enabled(False)
+
+    configure_playlist(args.playlist)
+    input_dir = Path(args.input) if args.input else extract_content_ai.TRANSCRIPTIONS_DIR
+
+    run_pipeline(input_dir, stages, limit=args.limit, workers=max(1, args.workers),
+                 qa_output=args.qa_output, revelations_output=args.revelations_output)
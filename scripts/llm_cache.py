@@ -0,0 +1,173 @@
+"""
+LLM Cache - Caché en disco (SQLite) de respuestas del modelo
+
+Evita reenviar a DeepSeek/Ollama prompts idénticos al re-ejecutar los
+extractores tras un crash o un cambio parcial de prompts.
+
+La clave es un hash SHA-256 de (proveedor, modelo, mensajes -system
+prompt y prompt renderizado-, temperatura y demás parámetros). Se guarda
+la respuesta cruda y el tiempo que tardó el modelo, para poder medir los
+minutos de GPU ahorrados. Cuando la base supera LLM_CACHE_MAX_MB se
+descartan las entradas usadas hace más tiempo.
+
+Uso:
+    from llm_cache import cached_chat_completion, parse_json_response
+    result = cached_chat_completion(client, PROVIDER, params, parse=parse_json_response)
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+CACHE_DB = Path(os.getenv('LLM_CACHE_DB', 'cache/llm_cache.sqlite'))
+CACHE_MAX_BYTES = int(float(os.getenv('LLM_CACHE_MAX_MB', '512')) * 1024 * 1024)
+CACHE_ENABLED = os.getenv('LLM_CACHE', '1') not in ('0', 'false', 'no')
+
+_lock = threading.Lock()
+_conn: Optional[sqlite3.Connection] = None
+_stats = {'hits': 0, 'misses': 0, 'saved_seconds': 0.0, 'model_seconds': 0.0}
+
+def set_enabled(enabled: bool):
+    """Activa/desactiva la caché (p.ej. con --no-cache)"""
+    global CACHE_ENABLED
+    CACHE_ENABLED = enabled
+
+def _get_conn() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        CACHE_DB.parent.mkdir(parents=True, exist_ok=True)
+        _conn = sqlite3.connect(str(CACHE_DB), check_same_thread=False, timeout=30)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("""
+            CREATE TABLE IF NOT EXISTS completions (
+                key TEXT PRIMARY KEY,
+                provider TEXT,
+                model TEXT,
+                completion TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                elapsed REAL NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        _conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON completions(last_used)")
+        _conn.commit()
+    return _conn
+
+def make_key(provider: str, params: Dict[str, Any]) -> str:
+    """Hash estable de la solicitud (proveedor + parámetros de chat.completions)"""
+    payload = json.dumps({'provider': provider, **params}, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def lookup(key: str) -> Optional[Tuple[str, float]]:
+    """Devuelve (respuesta, segundos que tardó el modelo) o None"""
+    with _lock:
+        conn = _get_conn()
+        row = conn.execute(
+            "SELECT completion, elapsed FROM completions WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE completions SET last_used = ? WHERE key = ?", (time.time(), key))
+        conn.commit()
+        return row[0], row[1]
+
+def store(key: str, provider: str, model: str, completion: str, elapsed: float):
+    """Guarda una respuesta y aplica el límite de tamaño"""
+    now = time.time()
+    size = len(completion.encode('utf-8'))
+    with _lock:
+        conn = _get_conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO completions VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, provider, model, completion, size, elapsed, now, now)
+        )
+        _evict(conn)
+        conn.commit()
+
+def _evict(conn: sqlite3.Connection):
+    """Elimina las entradas menos usadas hasta quedar en ~90% del máximo"""
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM completions").fetchone()[0]
+    if total <= CACHE_MAX_BYTES:
+        return
+    target = CACHE_MAX_BYTES * 0.9
+    for key, size in conn.execute(
+        "SELECT key, size FROM completions ORDER BY last_used ASC"
+    ).fetchall():
+        if total <= target:
+            break
+        conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+        total -= size
+
+def parse_json_response(content: str) -> Any:
+    """Parsea la respuesta del modelo como JSON (limpiando bloques markdown)"""
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError:
+        # A veces DeepSeek/Ollama incluye markdown, limpiar
+        if "```json" in content:
+            content = content.split("```json")[1].split("```")[0]
+        elif "```" in content:
+            content = content.split("```")[1].split("```")[0]
+        return json.loads(content.strip())
+
+def cached_chat_completion(client, provider: str, params: Dict[str, Any],
+                           parse: Optional[Callable[[str], Any]] = None) -> Any:
+    """chat.completions.create con caché
+
+    Si se pasa `parse`, la respuesta sólo se guarda cuando el parseo tiene
+    éxito (así un JSON inválido no queda cacheado y el reintento vuelve a
+    consultar al modelo) y se devuelve el valor parseado.
+    """
+    key = make_key(provider, params)
+
+    if CACHE_ENABLED:
+        cached = lookup(key)
+        if cached is not None:
+            completion, original_elapsed = cached
+            try:
+                result = parse(completion) if parse else completion
+                with _lock:
+                    _stats['hits'] += 1
+                    _stats['saved_seconds'] += original_elapsed
+                return result
+            except Exception:
+                pass  # Entrada inservible: volver a consultar al modelo
+
+    start = time.time()
+    response = client.chat.completions.create(**params)
+    elapsed = time.time() - start
+    content = response.choices[0].message.content
+    with _lock:
+        _stats['misses'] += 1
+        _stats['model_seconds'] += elapsed
+
+    result = parse(content) if parse else content
+
+    if CACHE_ENABLED:
+        store(key, provider, params.get('model', ''), content, elapsed)
+
+    return result
+
+def get_stats() -> Dict[str, Any]:
+    """Estadísticas de la ejecución actual"""
+    with _lock:
+        return dict(_stats)
+
+def print_stats():
+    """Imprime hits/misses y minutos de modelo ahorrados"""
+    stats = get_stats()
+    if not CACHE_ENABLED:
+        print(f"[CACHE] Desactivada - {stats['misses']} solicitudes al modelo "
+              f"({stats['model_seconds'] / 60:.1f} min)")
+        return
+    total = stats['hits'] + stats['misses']
+    ratio = (stats['hits'] / total * 100) if total else 0.0
+    print(f"[CACHE] {stats['hits']} hits / {stats['misses']} misses ({ratio:.0f}% hit rate)")
+    print(f"[CACHE] Tiempo de modelo ahorrado: {stats['saved_seconds'] / 60:.1f} min "
+          f"(consumido: {stats['model_seconds'] / 60:.1f} min) - {CACHE_DB}")
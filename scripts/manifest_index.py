@@ -0,0 +1,262 @@
+"""
+Manifest Index - Una fila por video con el estado de cada etapa
+
+Los scripts de status (show_status, master_playlist_processor,
+parallel_orchestrator, watchdog_monitor) recorrían con glob las carpetas
+de transcripciones/audios/contenido procesado en cada llamada. Ahora leen
+este índice SQLite (WAL), que las etapas del pipeline actualizan al
+terminar cada archivo:
+
+    playlist | stem | idx | video_id | transcript | audio | audio_bytes | audio_format | processed
+
+- transcript: 'youtube' | 'whisper' | NULL
+- audio_format: 'mp3' | 'opus' | 'flac' | 'wav' (ver AUDIO_FORMATS en ytdlp_engine)
+- stem: nombre del archivo de transcripción sin extensión; los procesados
+  son {stem}_extracted.json, así se asignan a su playlist sin adivinar
+  por patrones de nombre
+- El índice se construye escaneando el disco UNA vez (automático si está
+  vacío, o con --rebuild si algo se movió a mano)
+
+Uso:
+    python scripts/manifest_index.py            # resumen por playlist
+    python scripts/manifest_index.py --rebuild  # re-escanear el disco
+"""
+
+import os
+import re
+import json
+import sqlite3
+import threading
+import argparse
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from transcription_backends import AUDIO_EXTENSIONS
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+MANIFEST_DB = Path(os.getenv("MANIFEST_DB", BASE_DIR / "manifest_index.sqlite"))
+TRANSCRIPTS_DIR = BASE_DIR / "transcripciones"
+PROCESSED_DIR = BASE_DIR / "contenido_procesado"
+AUDIOS_DIR = BASE_DIR / "audios"
+
+EXCLUDED_MARKERS = ('ERROR', 'NO_SUBS', '_extracted')
+EXTRACTED_SUFFIX = "_extracted"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    playlist TEXT NOT NULL,
+    stem TEXT NOT NULL,
+    idx TEXT,
+    video_id TEXT,
+    transcript TEXT,
+    audio INTEGER NOT NULL DEFAULT 0,
+    audio_bytes INTEGER NOT NULL DEFAULT 0,
+    audio_format TEXT,
+    processed INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT,
+    PRIMARY KEY (playlist, stem)
+);
+CREATE INDEX IF NOT EXISTS videos_stem ON videos (stem);
+"""
+
+_local = threading.local()
+
+def _connect(auto_build: bool = True) -> sqlite3.Connection:
+    conn = getattr(_local, 'conn', None)
+    if conn is None or _local.pid != os.getpid():
+        MANIFEST_DB.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(MANIFEST_DB), timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        # Índices creados antes de que existiera la columna audio_format
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(videos)")}
+        if 'audio_format' not in columns:
+            conn.execute("ALTER TABLE videos ADD COLUMN audio_format TEXT")
+        _local.conn = conn
+        _local.pid = os.getpid()
+        if auto_build and not conn.execute("SELECT 1 FROM videos LIMIT 1").fetchone():
+            rebuild()
+    return conn
+
+def _index_from_stem(stem: str) -> Optional[str]:
+    match = re.match(r'^(\d+)_', stem)
+    return match.group(1) if match else None
+
+def _upsert(conn: sqlite3.Connection, playlist: str, stem: str, **fields):
+    conn.execute(
+        "INSERT OR IGNORE INTO videos (playlist, stem, idx) VALUES (?, ?, ?)",
+        (playlist, stem, _index_from_stem(stem))
+    )
+    fields['updated_at'] = datetime.now().isoformat()
+    assignments = ", ".join(f"{name} = ?" for name in fields)
+    conn.execute(f"UPDATE videos SET {assignments} WHERE playlist = ? AND stem = ?",
+                 (*fields.values(), playlist, stem))
+
+def _is_transcript(path: Path) -> bool:
+    return (path.suffix in ('.json', '.json3')
+            and not path.name.startswith('_')
+            and not any(marker in path.name for marker in EXCLUDED_MARKERS))
+
+# ============================================================================
+# ACTUALIZACIONES (llamadas por las etapas del pipeline)
+# ============================================================================
+
+def mark_transcript(playlist: str, stem: str, source: str, video_id: Optional[str] = None):
+    """Transcripción guardada ('youtube' o 'whisper')"""
+    fields = {'transcript': source}
+    if video_id:
+        fields['video_id'] = video_id
+    _upsert(_connect(), playlist, stem, **fields)
+
+def mark_audio(playlist: str, stem: str, present: bool = True, size_bytes: int = 0,
+               audio_format: Optional[str] = None):
+    """Audio descargado (present=True) o eliminado tras transcribir"""
+    fields = {'audio': int(present), 'audio_bytes': size_bytes if present else 0}
+    if audio_format:
+        fields['audio_format'] = audio_format
+    _upsert(_connect(), playlist, stem, **fields)
+
+def mark_processed(playlist: str, stem: str, processed: bool = True):
+    """Extracción IA guardada en {stem}_extracted.json"""
+    _upsert(_connect(), playlist, stem, processed=int(processed))
+
+# ============================================================================
+# CONSULTAS (status)
+# ============================================================================
+
+def get_counts(playlist: Optional[str] = None) -> Dict[str, Dict[str, int]]:
+    """{playlist: {videos, subtitles, audios, audio_bytes, processed}}
+
+    Una sola consulta agregada sobre el índice (sin tocar el disco).
+    """
+    query = ("SELECT playlist, COUNT(*), SUM(transcript IS NOT NULL), SUM(audio), SUM(audio_bytes), "
+             "SUM(processed) FROM videos")
+    params = ()
+    if playlist is not None:
+        query += " WHERE playlist = ?"
+        params = (playlist,)
+    counts = {}
+    for name, videos, subtitles, audios, audio_bytes, processed in _connect().execute(
+            query + " GROUP BY playlist ORDER BY playlist", params):
+        counts[name] = {
+            'videos': videos,
+            'subtitles': subtitles or 0,
+            'audios': audios or 0,
+            'audio_bytes': audio_bytes or 0,
+            'processed': processed or 0,
+        }
+    return counts
+
+def get_playlist_counts(playlist: str) -> Dict[str, int]:
+    """Conteos de una playlist (ceros si no está en el índice)"""
+    return get_counts(playlist).get(playlist, {
+        'videos': 0, 'subtitles': 0, 'audios': 0, 'audio_bytes': 0, 'processed': 0
+    })
+
+def unprocessed(playlist: Optional[str] = None) -> List[Tuple[str, str]]:
+    """[(playlist, stem)] con transcripción y sin extracción IA"""
+    query = "SELECT playlist, stem FROM videos WHERE transcript IS NOT NULL AND processed = 0"
+    params = ()
+    if playlist is not None:
+        query += " AND playlist = ?"
+        params = (playlist,)
+    return [tuple(row) for row in _connect().execute(query + " ORDER BY playlist, stem", params)]
+
+def total_processed() -> int:
+    """Total de videos con extracción IA (todas las playlists)"""
+    return _connect().execute("SELECT COUNT(*) FROM videos WHERE processed = 1").fetchone()[0]
+
+# ============================================================================
+# RECONSTRUCCIÓN DESDE DISCO
+# ============================================================================
+
+def _transcript_info(path: Path) -> Dict[str, Optional[str]]:
+    """Origen y video_id de una transcripción"""
+    if path.suffix == '.json3':
+        return {'transcript': 'youtube', 'video_id': None}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except Exception:
+        return {'transcript': 'youtube', 'video_id': None}
+    if isinstance(data, dict) and 'segments' in data:
+        return {'transcript': 'whisper', 'video_id': None}
+    metadata = data.get('metadata', {}) if isinstance(data, dict) else {}
+    return {'transcript': 'youtube', 'video_id': metadata.get('video_id')}
+
+def rebuild() -> int:
+    """Re-escanea transcripciones/, audios/ y contenido_procesado/ y reemplaza el índice"""
+    conn = _connect(auto_build=False)
+    rows: Dict[tuple, Dict] = {}
+
+    def row(playlist: str, stem: str) -> Dict:
+        return rows.setdefault((playlist, stem), {
+            'idx': _index_from_stem(stem), 'video_id': None, 'transcript': None,
+            'audio': 0, 'audio_bytes': 0, 'audio_format': None, 'processed': 0
+        })
+
+    if TRANSCRIPTS_DIR.exists():
+        for folder in sorted(p for p in TRANSCRIPTS_DIR.iterdir() if p.is_dir()):
+            for path in sorted(folder.iterdir()):
+                if _is_transcript(path):
+                    row(folder.name, path.stem).update(_transcript_info(path))
+
+    if AUDIOS_DIR.exists():
+        for folder in sorted(p for p in AUDIOS_DIR.iterdir() if p.is_dir()):
+            for path in folder.iterdir():
+                if path.suffix not in AUDIO_EXTENSIONS:
+                    continue
+                entry = row(folder.name, path.stem)
+                entry['audio'] = 1
+                entry['audio_bytes'] = path.stat().st_size
+                entry['audio_format'] = path.suffix[1:]
+
+    # Los procesados se asignan a su playlist por el stem de la transcripción
+    by_stem: Dict[str, list] = {}
+    for playlist, stem in rows:
+        by_stem.setdefault(stem, []).append(playlist)
+    if PROCESSED_DIR.exists():
+        for path in PROCESSED_DIR.rglob(f"*{EXTRACTED_SUFFIX}.json"):
+            stem = path.stem[:-len(EXTRACTED_SUFFIX)]
+            if path.parent != PROCESSED_DIR:
+                playlists = [path.parent.name]
+            else:
+                playlists = by_stem.get(stem) or ['']
+            for playlist in playlists:
+                row(playlist, stem)['processed'] = 1
+
+    now = datetime.now().isoformat()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("DELETE FROM videos")
+        conn.executemany(
+            "INSERT INTO videos (playlist, stem, idx, video_id, transcript, audio, audio_bytes, audio_format, "
+            "processed, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(playlist, stem, r['idx'], r['video_id'], r['transcript'], r['audio'], r['audio_bytes'],
+              r['audio_format'], r['processed'], now) for (playlist, stem), r in rows.items()]
+        )
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return len(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description='Índice de videos por etapa (manifest)')
+    parser.add_argument('--rebuild', action='store_true', help='Re-escanear el disco y reconstruir el índice')
+    args = parser.parse_args()
+
+    if args.rebuild:
+        print(f"🔄 Reconstruyendo índice desde {BASE_DIR}...")
+        print(f"✅ {rebuild()} videos indexados en {MANIFEST_DB.name}")
+
+    counts = get_counts()
+    print(f"\n{'PLAYLIST':<22} {'VIDEOS':>7} {'SUBS':>7} {'AUDIO':>7} {'IA':>7}")
+    print("-" * 54)
+    for playlist, c in counts.items():
+        print(f"{playlist or '(sin playlist)':<22} {c['videos']:>7} {c['subtitles']:>7} {c['audios']:>7} {c['processed']:>7}")
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,29 @@
 """
 Script de migración de contenido procesado a MongoDB
 Sube los archivos JSON enriquecidos a MongoDB y crea índices para búsqueda rápida
+
+- bulk_write por colección (ordered=False) en vez de un round trip por documento
+- _id determinístico por contenido: re-ejecutar actualiza en su lugar, no duplica
+  (tras migraciones viejas con ObjectId, usar --drop una vez)
+- Ledger (sync_ledger): tamaño, mtime, SHA-256 y _ids de cada archivo migrado;
+  --incremental sólo sube archivos nuevos o cambiados y borra los documentos
+  que desaparecieron de un archivo re-extraído
+- MONGODB_URI=mongomock:// usa mongomock en memoria (pruebas sin servidor)
+
+Uso:
+    python scripts/migrate_to_mongodb.py [--uri mongodb://localhost:27017/] [--drop]
+    python scripts/migrate_to_mongodb.py --incremental     # tras extraer algunas clases nuevas
 """
 
 import json
 import os
+import time
+import hashlib
+import argparse
 from pathlib import Path
-from pymongo import MongoClient, ASCENDING, TEXT
+from typing import Any, Dict, List, Optional
+from pymongo import MongoClient, ASCENDING, TEXT, DeleteOne, ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError
 from datetime import datetime
 
 # Configuración de MongoDB
@@ -16,9 +33,32 @@ DATABASE_NAME = 'kabbalah_app'
 # Directorio de contenido procesado
 CONTENT_DIR = Path(__file__).parent.parent / 'contenido_procesado'
 
-def connect_to_mongodb():
-    """Conecta a MongoDB"""
-    client = MongoClient(MONGODB_URI)
+BULK_BATCH = 1000  # operaciones por bulk_write
+LEDGER_COLLECTION = 'sync_ledger'  # un documento por *_enhanced.json migrado
+
+# Colección -> clave de la lista en *_enhanced.json (clases sale de resumen_clase)
+SOURCE_KEYS = {
+    'meditaciones': 'meditaciones',
+    'glosario': 'glosario_simbolos',
+    'preguntas': 'preguntas_respuestas',
+    'revelaciones': 'revelaciones_secretos',
+}
+COLLECTIONS = ('clases',) + tuple(SOURCE_KEYS)
+
+# Campos que identifican el documento; el resto de colecciones usa el hash de todo el contenido
+IDENTITY_FIELDS = {
+    'clases': ('video_id',),
+    'glosario': ('simbolo', 'video_id'),
+}
+VOLATILE_FIELDS = ('_id', 'migrated_at')
+
+def connect_to_mongodb(uri: str = MONGODB_URI):
+    """Conecta a MongoDB (mongomock:// = base en memoria para pruebas)"""
+    if uri.startswith('mongomock://'):
+        import mongomock
+        client = mongomock.MongoClient()
+    else:
+        client = MongoClient(uri)
     db = client[DATABASE_NAME]
     print(f"✅ Conectado a MongoDB: {DATABASE_NAME}")
     return db
@@ -56,100 +96,239 @@ def create_indexes(db):
     
     print("✅ Índices creados")
 
-def migrate_content(db):
-    """Migra contenido de archivos JSON a MongoDB"""
+def content_id(collection: str, doc: Dict[str, Any]) -> str:
+    """_id determinístico: hash de los campos de identidad (o de todo el contenido)
+
+    Re-ejecutar la migración produce los mismos _id, así que cada documento
+    se actualiza en su lugar en vez de duplicarse.
+    """
+    fields = IDENTITY_FIELDS.get(collection)
+    if fields:
+        key = {field: doc.get(field) for field in fields}
+    else:
+        key = {field: value for field, value in doc.items() if field not in VOLATILE_FIELDS}
+    payload = json.dumps([collection, key], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+def file_documents(json_file: Path) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+    """Documentos de un *_enhanced.json agrupados por colección (None si no tiene resumen_clase)"""
+    with open(json_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    resumen = data.get('resumen_clase')
+    if not resumen or not resumen.get('video_id'):
+        return None
+
+    video = {'video_id': resumen['video_id'], 'video_titulo': resumen.get('titulo')}
+    docs = {'clases': [dict(resumen, source_file=json_file.name)]}
+    for collection, key in SOURCE_KEYS.items():
+        docs[collection] = [dict(item, **video) for item in data.get(key, []) if isinstance(item, dict)]
+    return docs
+
+def upsert_operation(collection: str, doc: Dict[str, Any], migrated_at: datetime) -> UpdateOne:
+    """Upsert por _id; migrated_at sólo se fija al insertar (un re-run no modifica nada)"""
+    fields = {field: value for field, value in doc.items() if field not in VOLATILE_FIELDS}
+    return UpdateOne({'_id': content_id(collection, doc)},
+                     {'$set': fields, '$setOnInsert': {'migrated_at': migrated_at}},
+                     upsert=True)
+
+def new_totals() -> Dict[str, int]:
+    return {'insertados': 0, 'modificados': 0, 'sin_cambios': 0, 'eliminados': 0, 'errores': 0}
+
+def flush_operations(db, collection: str, operations: List[Any], totals: Dict[str, int],
+                     sources: Optional[List[Any]] = None) -> List[Any]:
+    """bulk_write desordenado (un error no frena el resto del lote) y acumula contadores
+
+    `sources` es paralela a `operations` (origen de cada operación); se
+    devuelven los orígenes de las operaciones que fallaron.
+    """
+    failed = []
+    if not operations:
+        return failed
+    try:
+        result = db[collection].bulk_write(operations, ordered=False)
+        details = result.bulk_api_result
+    except BulkWriteError as e:
+        details = e.details
+        errors = details.get('writeErrors', [])
+        print(f"   ⚠️ {collection}: {len(errors)} operaciones fallidas")
+        totals['errores'] += len(errors)
+        if sources is not None:
+            failed = [sources[error['index']] for error in errors]
+    totals['insertados'] += details.get('nUpserted', 0)
+    totals['modificados'] += details.get('nModified', 0)
+    totals['sin_cambios'] += details.get('nMatched', 0) - details.get('nModified', 0)
+    totals['eliminados'] += details.get('nRemoved', 0)
+    operations.clear()
+    if sources is not None:
+        sources.clear()
+    return failed
+
+def sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def migrate_content(db, json_files: Optional[List[Path]] = None, incremental: bool = False) -> Dict[str, int]:
+    """Migra contenido de archivos JSON a MongoDB
+
+    Una operación por documento, enviadas con bulk_write en lotes de
+    BULK_BATCH por colección (en vez de un insert_one/update_one por
+    documento). Los _id derivan del contenido: re-ejecutar es idempotente.
+
+    Cada archivo migrado queda en la colección LEDGER_COLLECTION con su
+    tamaño, mtime, SHA-256 y los _id que generó. Con incremental=True se
+    saltan los archivos sin cambios (mismo tamaño+mtime, o mismo hash). En
+    ambos modos se borran los documentos que desaparecieron de un archivo
+    re-extraído y los de archivos que ya no existen.
+
+    Si alguna operación de un archivo falla, su entrada del ledger queda
+    "pending" (sin tamaño/mtime/hash, con los _id pendientes de borrar) y
+    el próximo run incremental lo vuelve a sincronizar.
+    """
     
     # Buscar archivos JSON enriquecidos
-    json_files = list(CONTENT_DIR.glob("*_enhanced.json"))
+    scan_all = json_files is None
+    if scan_all:
+        json_files = sorted(CONTENT_DIR.glob("*_enhanced.json"))
     
     if not json_files:
         print("⚠️  No se encontraron archivos *_enhanced.json")
         print(f"Buscado en: {CONTENT_DIR}")
-        return
+        return {}
     
     print(f"\n📁 Encontrados {len(json_files)} archivos para migrar")
     
-    stats = {
-        'clases': 0,
-        'meditaciones': 0,
-        'simbolos': 0,
-        'preguntas': 0,
-        'revelaciones': 0
-    }
+    migrated_at = datetime.now()
+    stats = {collection: 0 for collection in COLLECTIONS}
+    totals = new_totals()
+    pending = {collection: [] for collection in COLLECTIONS}
+    sources = {collection: [] for collection in COLLECTIONS}   # (archivo, _id) de cada operación pendiente
+    ledger = {entry['_id']: entry for entry in db[LEDGER_COLLECTION].find({})}
+    ledger_ops = []
+    synced = {}       # archivo -> entrada nueva del ledger
+    removed = []      # archivos del ledger que ya no existen
+    failed = {}       # archivo -> {colección: _id con operaciones fallidas}
+    upserted = {collection: set() for collection in COLLECTIONS}
+    stale = {collection: {} for collection in COLLECTIONS}    # _id -> archivo que lo generaba
+    touched = set()
+    skipped = 0
+    start = time.time()
     
+    def flush(collection):
+        for name, doc_id in flush_operations(db, collection, pending[collection], totals, sources[collection]):
+            failed.setdefault(name, {}).setdefault(collection, set()).add(doc_id)
+
     for json_file in json_files:
-        print(f"\n📄 Procesando: {json_file.name}")
-        
-        with open(json_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        # Migrar resumen de clase
-        if 'resumen_clase' in data:
-            resumen = data['resumen_clase']
-            resumen['migrated_at'] = datetime.now()
-            resumen['source_file'] = json_file.name
-            
-            db.clases.update_one(
-                {'video_id': resumen['video_id']},
-                {'$set': resumen},
-                upsert=True
-            )
-            stats['clases'] += 1
+        info = json_file.stat()
+        entry = ledger.get(json_file.name)
+        if incremental and entry and entry.get('size') == info.st_size and entry.get('mtime') == info.st_mtime:
+            skipped += 1
+            continue
+        digest = sha256_file(json_file)
+        if incremental and entry and entry.get('sha256') == digest:
+            # Sólo cambió el mtime (copia, touch): se actualiza el ledger
+            ledger_ops.append(UpdateOne({'_id': json_file.name},
+                                        {'$set': {'size': info.st_size, 'mtime': info.st_mtime}}))
+            skipped += 1
+            continue
         
-        # Migrar meditaciones
-        for meditacion in data.get('meditaciones', []):
-            meditacion['video_id'] = data['resumen_clase']['video_id']
-            meditacion['video_titulo'] = data['resumen_clase']['titulo']
-            meditacion['migrated_at'] = datetime.now()
-            
-            db.meditaciones.insert_one(meditacion)
-            stats['meditaciones'] += 1
+        try:
+            docs = file_documents(json_file)
+        except Exception as e:
+            print(f"   ❌ {json_file.name}: {e}")
+            continue
+        if docs is None:
+            print(f"   ⚠️  {json_file.name}: sin resumen_clase/video_id, omitido")
+            docs = {}
         
-        # Migrar glosario de símbolos
-        for simbolo in data.get('glosario_simbolos', []):
-            simbolo['video_id'] = data['resumen_clase']['video_id']
-            simbolo['video_titulo'] = data['resumen_clase']['titulo']
-            simbolo['migrated_at'] = datetime.now()
-            
-            # Usar update para evitar duplicados de símbolos
-            db.glosario.update_one(
-                {
-                    'simbolo': simbolo['simbolo'],
-                    'video_id': simbolo['video_id']
-                },
-                {'$set': simbolo},
-                upsert=True
-            )
-            stats['simbolos'] += 1
+        ids = {collection: [] for collection in COLLECTIONS}
+        for collection, items in docs.items():
+            for doc in items:
+                doc_id = content_id(collection, doc)
+                pending[collection].append(upsert_operation(collection, doc, migrated_at))
+                sources[collection].append((json_file.name, doc_id))
+                ids[collection].append(doc_id)
+                stats[collection] += 1
+            if len(pending[collection]) >= BULK_BATCH:
+                flush(collection)
         
-        # Migrar Q&A
-        for qa in data.get('preguntas_respuestas', []):
-            qa['video_id'] = data['resumen_clase']['video_id']
-            qa['video_titulo'] = data['resumen_clase']['titulo']
-            qa['migrated_at'] = datetime.now()
-            
-            db.preguntas.insert_one(qa)
-            stats['preguntas'] += 1
-        
-        # Migrar revelaciones
-        for revelacion in data.get('revelaciones_secretos', []):
-            revelacion['video_id'] = data['resumen_clase']['video_id']
-            revelacion['video_titulo'] = data['resumen_clase']['titulo']
-            revelacion['migrated_at'] = datetime.now()
-            
-            db.revelaciones.insert_one(revelacion)
-            stats['revelaciones'] += 1
+        for collection in COLLECTIONS:
+            upserted[collection].update(ids[collection])
+            if entry:
+                for doc_id in entry.get('ids', {}).get(collection, []):
+                    stale[collection].setdefault(doc_id, json_file.name)
+        touched.add(json_file.name)
+        synced[json_file.name] = {
+            'size': info.st_size, 'mtime': info.st_mtime, 'sha256': digest,
+            'ids': ids, 'synced_at': migrated_at,
+        }
+    
+    # Archivos migrados antes que ya no existen
+    if scan_all:
+        present = {json_file.name for json_file in json_files}
+        for name, entry in ledger.items():
+            if name not in present:
+                for collection in COLLECTIONS:
+                    for doc_id in entry.get('ids', {}).get(collection, []):
+                        stale[collection].setdefault(doc_id, name)
+                touched.add(name)
+                removed.append(name)
+                print(f"   🗑️ {name}: ya no existe, se quitan sus documentos")
+    
+    for collection in COLLECTIONS:
+        flush(collection)
+    
+    # Se borran los _id que ya no genera ningún archivo (ni los re-migrados ni los sin tocar)
+    for collection in COLLECTIONS:
+        still_used = set(upserted[collection])
+        for name, entry in ledger.items():
+            if name not in touched:
+                still_used.update(entry.get('ids', {}).get(collection, []))
+        for doc_id in sorted(set(stale[collection]) - still_used):
+            pending[collection].append(DeleteOne({'_id': doc_id}))
+            sources[collection].append((stale[collection][doc_id], doc_id))
+            if len(pending[collection]) >= BULK_BATCH:
+                flush(collection)
+        flush(collection)
+    
+    # El ledger se escribe al final: si algo falla antes, el próximo run re-sincroniza esos archivos.
+    # Un archivo con operaciones fallidas queda "pending": sin size/mtime/sha256 no pasa el
+    # chequeo incremental, y sus _id fallidos siguen en "ids" para reintentar los borrados
+    for name in list(synced) + removed:
+        if name not in failed:
+            ledger_ops.append(ReplaceOne({'_id': name}, synced[name], upsert=True) if name in synced
+                              else DeleteOne({'_id': name}))
+            continue
+        ids = synced[name]['ids'] if name in synced else {collection: [] for collection in COLLECTIONS}
+        for collection, doc_ids in failed[name].items():
+            ids[collection] = sorted(set(ids[collection]) | doc_ids)
+        ledger_ops.append(ReplaceOne({'_id': name}, {'ids': ids, 'pending': True, 'synced_at': migrated_at},
+                                     upsert=True))
+    if failed:
+        print(f"   ⚠️ {len(failed)} archivos con operaciones fallidas: se re-sincronizan en el próximo run")
+    if ledger_ops:
+        db[LEDGER_COLLECTION].bulk_write(ledger_ops, ordered=False)
     
     # Resumen
     print(f"\n\n{'='*70}")
     print(f"{'  MIGRACIÓN COMPLETADA  ':^70}")
     print(f"{'='*70}")
+    if incremental:
+        print(f"⏭️ Archivos sin cambios: {skipped} | Sincronizados: {len(json_files) - skipped}")
     print(f"✅ Clases migradas: {stats['clases']}")
     print(f"✅ Meditaciones: {stats['meditaciones']}")
-    print(f"✅ Símbolos del glosario: {stats['simbolos']}")
+    print(f"✅ Símbolos del glosario: {stats['glosario']}")
     print(f"✅ Preguntas y respuestas: {stats['preguntas']}")
     print(f"✅ Revelaciones: {stats['revelaciones']}")
+    print(f"📦 Nuevos: {totals['insertados']} | Actualizados: {totals['modificados']} | "
+          f"Sin cambios: {totals['sin_cambios']} | Eliminados: {totals['eliminados']} | "
+          f"Errores: {totals['errores']}")
+    print(f"⏱️ {time.time() - start:.1f}s")
     print(f"{'='*70}\n")
+    return totals
 
 def verify_migration(db):
     """Verifica que la migración fue exitosa"""
@@ -193,14 +372,28 @@ def main():
 ╚══════════════════════════════════════════════════════════════════╝
     """)
     
+    parser = argparse.ArgumentParser(description='Migración de *_enhanced.json a MongoDB')
+    parser.add_argument('--uri', default=MONGODB_URI, help='URI de MongoDB (mongomock:// para pruebas)')
+    parser.add_argument('--drop', action='store_true',
+                        help='Vaciar las colecciones antes de migrar (limpia duplicados de migraciones anteriores)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Sólo archivos nuevos o modificados según el ledger (sin crear índices)')
+    args = parser.parse_args()
+    
     # Conectar a MongoDB
-    db = connect_to_mongodb()
+    db = connect_to_mongodb(args.uri)
+    
+    if args.drop:
+        for collection in COLLECTIONS + (LEDGER_COLLECTION,):
+            db[collection].drop()
+        print(f"🗑️ Colecciones vaciadas: {', '.join(COLLECTIONS + (LEDGER_COLLECTION,))}")
     
-    # Crear índices
-    create_indexes(db)
+    # Crear índices (ya existen en un sync incremental)
+    if not args.incremental:
+        create_indexes(db)
     
     # Migrar contenido
-    migrate_content(db)
+    migrate_content(db, incremental=args.incremental)
     
     # Verificar
     verify_migration(db)
@@ -0,0 +1,143 @@
+"""
+Parallel Segments - Transcripción de audios largos por ventanas en paralelo
+
+Una clase de 90 minutos es una sola llamada a transcribe() y sólo usa un
+worker. Aquí el audio se divide en ventanas solapadas que se transcriben
+en un pool de procesos (cada worker carga el modelo una vez) y luego se
+cosen:
+- Cada segmento se desplaza al tiempo absoluto de su ventana
+- En cada solapamiento se corta en el punto medio: de la ventana anterior
+  se quedan los segmentos cuyo centro cae antes del corte, de la siguiente
+  los que caen después
+- Si el último segmento antes del corte y el primero después tienen el
+  mismo texto, se descarta el duplicado
+- Los ids se renumeran para que el SRT quede continuo
+
+ParallelSegmentTranscriber tiene la misma interfaz que los backends de
+transcription_backends (transcribe(audio, language)), así que se puede
+combinar con vad_slicing.transcribe_with_vad.
+"""
+
+import os
+import re
+import multiprocessing
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from transcription_backends import load_backend
+
+SAMPLE_RATE = 16000
+WINDOW_S = 600.0    # 10 minutos por ventana
+OVERLAP_S = 15.0    # Solapamiento entre ventanas
+
+def split_windows(duration: float, window_s: float = WINDOW_S,
+                  overlap_s: float = OVERLAP_S) -> List[Tuple[float, float]]:
+    """Divide [0, duration] en ventanas [(inicio, fin)] solapadas"""
+    if duration <= window_s:
+        return [(0.0, duration)]
+    step = window_s - overlap_s
+    windows = []
+    start = 0.0
+    while start < duration:
+        end = min(start + window_s, duration)
+        windows.append((start, end))
+        if end >= duration:
+            break
+        start += step
+    return windows
+
+def _normalize(text: str) -> str:
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return ' '.join(re.sub(r'[^\w\s]', ' ', text.casefold()).split())
+
+def stitch_segments(windows: List[Tuple[float, float]],
+                    window_segments: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Cose los segmentos (ya en tiempo absoluto) de ventanas consecutivas"""
+    stitched: List[Dict[str, Any]] = []
+    for i, segments in enumerate(window_segments):
+        cut_before = (windows[i][0] + windows[i - 1][1]) / 2 if i > 0 else float('-inf')
+        cut_after = (windows[i + 1][0] + windows[i][1]) / 2 if i + 1 < len(windows) else float('inf')
+
+        kept = [seg for seg in segments
+                if cut_before <= (seg["start"] + seg["end"]) / 2 < cut_after]
+
+        # Duplicado en la frontera (la misma frase transcrita por ambas ventanas)
+        if stitched and kept and _normalize(stitched[-1]["text"]) == _normalize(kept[0]["text"]):
+            kept = kept[1:]
+
+        stitched.extend(kept)
+
+    for i, seg in enumerate(stitched):
+        seg["id"] = i
+    return stitched
+
+# Backend cargado en cada proceso worker (una sola vez por proceso)
+_engine = None
+
+def _init_engine(backend, model_name, device, threads, compute_type):
+    global _engine
+    _engine = load_backend(backend, model_name, device=device, threads=threads, compute_type=compute_type)
+    print(f"  📥 [PID {os.getpid()}] Modelo '{model_name}' ({backend}) cargado ({threads} threads)", flush=True)
+
+def _transcribe_window(job):
+    """Transcribe una ventana y desplaza sus timestamps al tiempo absoluto"""
+    index, offset, audio, language = job
+    result = _engine.transcribe(audio, language=language)
+    segments = []
+    for seg in result["segments"]:
+        seg = dict(seg)
+        seg["start"] += offset
+        seg["end"] += offset
+        if seg.get("words"):
+            seg["words"] = [{**w, "start": w["start"] + offset, "end": w["end"] + offset} for w in seg["words"]]
+        segments.append(seg)
+    return index, segments, result.get("language", language)
+
+class ParallelSegmentTranscriber:
+    """Pool de workers que transcribe un audio largo por ventanas en paralelo"""
+
+    def __init__(self, workers: int, backend: str = 'whisper', model_name: str = 'medium',
+                 device: Optional[str] = None, threads: Optional[int] = None,
+                 compute_type: Optional[str] = None,
+                 window_s: float = WINDOW_S, overlap_s: float = OVERLAP_S):
+        self.workers = max(1, workers)
+        self.window_s = window_s
+        self.overlap_s = overlap_s
+        threads = threads or max(1, (os.cpu_count() or 1) // self.workers)
+        self.pool = multiprocessing.Pool(
+            processes=self.workers,
+            initializer=_init_engine,
+            initargs=(backend, model_name, device, threads, compute_type)
+        )
+
+    def transcribe(self, audio, language: str = 'es', **kwargs) -> Dict[str, Any]:
+        """Acepta una ruta o un array 16 kHz mono; devuelve el formato de whisper.transcribe()"""
+        if isinstance(audio, (str, Path)):
+            from vad_slicing import load_audio
+            audio = load_audio(audio)
+
+        duration = len(audio) / SAMPLE_RATE
+        windows = split_windows(duration, self.window_s, self.overlap_s)
+        jobs = [
+            (i, start, audio[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)], language)
+            for i, (start, end) in enumerate(windows)
+        ]
+
+        window_segments: List[List[Dict[str, Any]]] = [[] for _ in windows]
+        detected_language = language
+        for index, segments, lang in self.pool.imap_unordered(_transcribe_window, jobs):
+            window_segments[index] = segments
+            detected_language = lang or detected_language
+
+        segments = stitch_segments(windows, window_segments)
+        return {
+            "text": "".join(seg["text"] for seg in segments),
+            "segments": segments,
+            "language": detected_language,
+        }
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
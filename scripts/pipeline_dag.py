@@ -0,0 +1,170 @@
+"""
+Pipeline DAG - Planificador por video con un pool de workers por etapa
+
+master_playlist_processor corría por fases: TODAS las descargas de TODAS
+las playlists (con pausas de 30 s) y recién después la IA, cada fase como
+un subprocess.run bloqueante. Aquí cada video es una tarea que avanza sola
+por el grafo de etapas:
+
+    download ──(sin subtítulos)──> audio ──> whisper ──┐
+        └───────────────────────────────────────────── extract ──> consolidate
+
+- Cada etapa tiene su propia cola con prioridad y su propio número de
+  workers: mientras un video se transcribe otro se descarga y otro pasa
+  por el LLM
+- La función de una etapa recibe la tarea (dict) y devuelve el nombre de
+  la siguiente etapa, o None si la tarea terminó
+- Etapas "batch" (p. ej. consolidate) reciben todas las tareas en cola de
+  una vez: N videos terminados = una sola consolidación
+- Un error reintenta la etapa tras retry_delay, hasta max_attempts
+- pause(etapa, s) congela una etapa (p. ej. YouTube bloqueando descargas)
+  sin frenar las demás
+
+Uso:
+    dag = PipelineDAG()
+    dag.add_stage('download', download, workers=2)
+    dag.add_stage('extract', extract, workers=2)
+    dag.submit('download', {'priority': (1, 7), ...})
+    stats = dag.run()
+"""
+
+import time
+import heapq
+import itertools
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+MAX_ATTEMPTS = 3
+RETRY_DELAY = 60          # segundos antes de reintentar una etapa fallida
+STATUS_INTERVAL = 60      # cada cuánto se informa el estado de las colas
+
+class PipelineDAG:
+    """Colas con prioridad por etapa + threads; run() vuelve cuando no quedan tareas vivas"""
+
+    def __init__(self, max_attempts: int = MAX_ATTEMPTS, retry_delay: float = RETRY_DELAY,
+                 log: Callable[[str], None] = print):
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.log = log
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._alive = 0           # tareas enviadas que aún no terminaron ni se descartaron
+        self._closed = False
+        self.stats: Dict[str, Counter] = {}
+
+    def add_stage(self, name: str, run: Callable, workers: int = 1, batch: bool = False):
+        self.stages[name] = {'run': run, 'workers': max(1, workers), 'batch': batch,
+                             'queue': [], 'active': 0, 'paused_until': 0.0}
+        self.stats[name] = Counter()
+
+    def submit(self, stage: str, task: Dict[str, Any]):
+        """Agrega una tarea nueva al grafo, empezando por `stage`"""
+        with self._cond:
+            self._alive += 1
+            self._push(stage, task)
+
+    def _push(self, stage: str, task: Dict[str, Any]):
+        task['stage'] = stage
+        heapq.heappush(self.stages[stage]['queue'], (task.get('priority', ()), next(self._seq), task))
+        self._cond.notify_all()
+
+    def _finish(self):
+        self._alive -= 1
+        if self._alive <= 0:
+            self._closed = True
+        self._cond.notify_all()
+
+    def pause(self, stage: str, seconds: float):
+        with self._cond:
+            self.stages[stage]['paused_until'] = max(self.stages[stage]['paused_until'], time.time() + seconds)
+        self.log(f"⏸️ Etapa '{stage}' en pausa {seconds:.0f}s")
+
+    def _retry_later(self, stage: str, task: Dict[str, Any]):
+        def push():
+            with self._cond:
+                self._push(stage, task)
+        timer = threading.Timer(self.retry_delay, push)
+        timer.daemon = True
+        timer.start()
+
+    def _take(self, stage: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+        """Bloquea hasta que haya tareas para esta etapa; None al cerrar el grafo"""
+        with self._cond:
+            while True:
+                if self._closed:
+                    return None
+                wait = stage['paused_until'] - time.time()
+                if stage['queue'] and wait <= 0:
+                    break
+                self._cond.wait(timeout=wait if stage['queue'] else None)
+            if stage['batch']:
+                tasks = [entry[-1] for entry in sorted(stage['queue'])]
+                stage['queue'].clear()
+            else:
+                tasks = [heapq.heappop(stage['queue'])[-1]]
+            stage['active'] += len(tasks)
+            return tasks
+
+    def _worker(self, name: str):
+        stage = self.stages[name]
+        while True:
+            tasks = self._take(stage)
+            if tasks is None:
+                return
+            try:
+                result = stage['run'](tasks if stage['batch'] else tasks[0])
+                outcomes = [(task, result if not stage['batch'] else None, None) for task in tasks]
+            except Exception as e:
+                outcomes = [(task, None, e) for task in tasks]
+
+            with self._cond:
+                stage['active'] -= len(tasks)
+                for task, next_stage, error in outcomes:
+                    if error is None:
+                        self.stats[name]['done'] += 1
+                        if next_stage:
+                            self._push(next_stage, task)
+                        else:
+                            self._finish()
+                        continue
+                    attempts = task.setdefault('attempts', Counter())
+                    attempts[name] += 1
+                    if attempts[name] < self.max_attempts:
+                        self.stats[name]['retried'] += 1
+                        self.log(f"⚠️ [{name}] {task.get('label', '?')}: {str(error)[:100]} "
+                                 f"(reintento {attempts[name]}/{self.max_attempts - 1} en {self.retry_delay:.0f}s)")
+                        self._retry_later(name, task)
+                    else:
+                        self.stats[name]['failed'] += 1
+                        self.log(f"✗ [{name}] {task.get('label', '?')}: {str(error)[:100]} (descartada)")
+                        self._finish()
+
+    def status_line(self) -> str:
+        with self._cond:
+            parts = [f"{name}: {len(stage['queue'])} en cola / {stage['active']} activas / "
+                     f"{self.stats[name]['done']} ok" +
+                     (f" / {self.stats[name]['failed']} ✗" if self.stats[name]['failed'] else "")
+                     for name, stage in self.stages.items()]
+        return " | ".join(parts)
+
+    def run(self, status_interval: float = STATUS_INTERVAL) -> Dict[str, Counter]:
+        """Arranca los pools y espera a que todas las tareas terminen"""
+        with self._cond:
+            if self._alive == 0:
+                self._closed = True
+        threads = [threading.Thread(target=self._worker, args=(name,), name=f"{name}-{i}", daemon=True)
+                   for name, stage in self.stages.items() for i in range(stage['workers'])]
+        for thread in threads:
+            thread.start()
+
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._closed, timeout=status_interval)
+                if self._closed:
+                    break
+            self.log(f"📊 {self.status_line()}")
+        for thread in threads:
+            thread.join()
+        return self.stats
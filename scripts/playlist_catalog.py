@@ -0,0 +1,147 @@
+"""
+Playlist Catalog - Caché compartida de playlists con TTL y diff incremental
+
+Cada downloader tenía su propio get_playlist_videos() que llamaba a
+`yt-dlp --flat-playlist` en CADA ejecución (timeouts de 120-180 s). Aquí
+la lista de videos se guarda en playlist_catalog.json y sólo se vuelve a
+pedir a YouTube cuando vence el TTL (PLAYLIST_TTL_HOURS, default 6 h).
+
+Al refrescar se compara con la versión anterior y se informa sólo lo que
+cambió (videos nuevos / eliminados). Si YouTube falla (lista vacía, 429 /
+bloqueo o error del extractor) se usa la última versión guardada aunque
+esté vencida; si no hay ninguna se devuelve una lista vacía.
+
+Uso:
+    from playlist_catalog import get_playlist, get_playlist_ids, diff_playlist
+    videos = get_playlist(url)            # [{'id', 'title'}]
+    diff = diff_playlist(url)             # {'videos', 'added', 'removed', 'refreshed'}
+
+    python scripts/playlist_catalog.py URL [--refresh]
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, str(Path(__file__).parent))
+from subtitle_fetcher import RateLimited
+
+CATALOG_FILE = Path(os.getenv("PLAYLIST_CATALOG", Path(__file__).resolve().parent.parent / "playlist_catalog.json"))
+PLAYLIST_TTL = float(os.getenv("PLAYLIST_TTL_HOURS", "6")) * 3600
+
+_lock = threading.Lock()
+
+def playlist_key(url: str) -> str:
+    """ID de la playlist (list=...) o la URL si no tiene"""
+    ids = parse_qs(urlparse(url).query).get('list')
+    return ids[0] if ids else url
+
+def _fingerprint(videos: List[Dict[str, str]]) -> str:
+    """Hash del orden de IDs (equivale a un ETag: cambia si cambia la playlist)"""
+    return hashlib.sha1("\n".join(v['id'] for v in videos).encode('utf-8')).hexdigest()[:16]
+
+def _load() -> Dict[str, Any]:
+    if CATALOG_FILE.exists():
+        try:
+            with open(CATALOG_FILE, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"⚠️ Catálogo ilegible ({e}), se regenera")
+    return {}
+
+def _save(catalog: Dict[str, Any]):
+    tmp = CATALOG_FILE.with_name(f".{CATALOG_FILE.name}.{os.getpid()}.tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(catalog, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, CATALOG_FILE)
+
+def _fetch(url: str) -> List[Dict[str, str]]:
+    from ytdlp_engine import get_engine
+    return get_engine().flat_playlist(url)
+
+def diff_playlist(url: str, ttl: float = PLAYLIST_TTL, refresh: bool = False) -> Dict[str, Any]:
+    """Videos actuales + diff contra la versión anterior del catálogo
+
+    Sólo consulta YouTube si la entrada no existe, venció el TTL o refresh=True.
+    """
+    key = playlist_key(url)
+    with _lock:
+        catalog = _load()
+        entry = catalog.get(key)
+
+        if entry and not refresh and time.time() - entry.get('fetched_ts', 0) < ttl:
+            return {'videos': entry['videos'], 'added': [], 'removed': [], 'refreshed': False}
+
+        # 429/bloqueo (RateLimited) o error del extractor: se usa la versión guardada
+        try:
+            videos, error = _fetch(url), None
+        except Exception as e:
+            videos, error = [], e
+        if not videos:
+            if entry:
+                reason = f" ({type(error).__name__}: {str(error)[:80]})" if error else ""
+                print(f"⚠️ No se pudo consultar la playlist{reason}, usando catálogo del {entry.get('fetched_at', '?')}")
+                return {'videos': entry['videos'], 'added': [], 'removed': [], 'refreshed': False}
+            # Sin catálogo previo: lista vacía, así los llamadores usan su propio
+            # respaldo (download_progress.json) en vez de abortar
+            if isinstance(error, RateLimited):
+                print("⚠️ YouTube bloqueó la consulta de la playlist y no hay catálogo guardado")
+            elif error:
+                print(f"❌ Error consultando la playlist: {str(error)[:100]}")
+            return {'videos': [], 'added': [], 'removed': [], 'refreshed': False}
+
+        old_videos = entry['videos'] if entry else []
+        old_ids = {v['id'] for v in old_videos}
+        new_ids = {v['id'] for v in videos}
+        # Sin versión anterior no hay diff (la primera vez no son "nuevos")
+        added = [v for v in videos if v['id'] not in old_ids] if entry else []
+        removed = [v for v in old_videos if v['id'] not in new_ids]
+
+        fingerprint = _fingerprint(videos)
+        catalog[key] = {
+            'url': url,
+            'videos': videos,
+            'fingerprint': fingerprint,
+            'fetched_ts': time.time(),
+            'fetched_at': datetime.now().isoformat(),
+            'changed_at': entry.get('changed_at') if entry and entry.get('fingerprint') == fingerprint
+                          else datetime.now().isoformat(),
+        }
+        _save(catalog)
+
+    if entry and (added or removed):
+        print(f"📋 Playlist {key}: +{len(added)} nuevos / -{len(removed)} eliminados")
+    return {'videos': videos, 'added': added, 'removed': removed, 'refreshed': True}
+
+def get_playlist(url: str, ttl: float = PLAYLIST_TTL, refresh: bool = False) -> List[Dict[str, str]]:
+    """[{'id', 'title'}] de la playlist (desde el catálogo si está vigente)"""
+    return diff_playlist(url, ttl=ttl, refresh=refresh)['videos']
+
+def get_playlist_ids(url: str, ttl: float = PLAYLIST_TTL, refresh: bool = False) -> List[str]:
+    return [v['id'] for v in get_playlist(url, ttl=ttl, refresh=refresh)]
+
+def main():
+    parser = argparse.ArgumentParser(description='Catálogo de playlists (caché con TTL)')
+    parser.add_argument('urls', nargs='+', help='URLs de playlists')
+    parser.add_argument('--refresh', action='store_true', help='Ignorar el TTL y consultar YouTube')
+    args = parser.parse_args()
+
+    for url in args.urls:
+        diff = diff_playlist(url, refresh=args.refresh)
+        origin = "YouTube" if diff['refreshed'] else "catálogo"
+        print(f"{playlist_key(url)}: {len(diff['videos'])} videos ({origin})")
+        for v in diff['added']:
+            print(f"   + {v['id']} {v['title'][:60]}")
+        for v in diff['removed']:
+            print(f"   - {v['id']} {v['title'][:60]}")
+
+if __name__ == "__main__":
+    main()
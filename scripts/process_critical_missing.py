@@ -7,6 +7,12 @@ import shutil
 from pathlib import Path
 import subprocess
 
+sys.path.insert(0, str(Path(__file__).parent))
+from sftp_sync import SftpSync
+import remote_whisper_client
+import manifest_index
+import stage_queue
+
 # Reuse config from remote_whisper_client
 SERVER_IP = "192.168.100.21"
 USERNAME = "willy"
@@ -75,99 +81,46 @@ def scan_rescue_files():
         
     return files_to_process
 
-def sync_up_audios(sftp, files):
-    """Uploads specific files to server"""
+def sync_up_audios(sync, files):
+    """Uploads specific files to server (only missing or changed ones)"""
     print(f"\n[INFO] Syncing {len(files)} Audios UP to {REMOTE_AUDIO_DIR}...")
     
-    # Ensure remote dir exists
-    try:
-        sftp.stat(REMOTE_AUDIO_DIR)
-    except FileNotFoundError:
-        sftp.mkdir(REMOTE_AUDIO_DIR)
-        
-    uploaded = 0
-    for mp3 in files:
-        remote_path = f"{REMOTE_AUDIO_DIR}/{mp3.name}"
-        try:
-            sftp.stat(remote_path)
-            # File exists, skip? Or overwrite? 
-            # Let's overwrite if size differs, but for now just skip if exists to save time
-            # actually server script needs it to not be processed, so existence is fine.
-        except FileNotFoundError:
-            print(f"   [UP] Uploading {mp3.name}...")
-            sftp.put(str(mp3), remote_path)
-            uploaded += 1
-            
-    print(f"   Done. {uploaded} new files uploaded.")
+    report = sync.push(files, REMOTE_AUDIO_DIR)
+    print(f"   Done. {len(report['transferred'])} uploaded, {len(report['skipped'])} unchanged, "
+          f"{len(report['failed'])} failed.")
 
-def run_remote_transcription(ssh):
-    """Runs the transcription script on the server"""
-    print(f"\n[INFO] Running Remote Whisper Transcription...")
-    
-    # Upload script first
-    sftp = ssh.open_sftp()
-    local_script = LOCAL_BASE / "scripts" / "transcribe_server.py"
-    remote_script = f"{REMOTE_BASE}/transcribe_server.py"
-    try:
-        sftp.put(str(local_script), remote_script)
-        print("   [OK] Script uploaded/updated")
-    except Exception as e:
-        print(f"   [ERR] Could not upload script: {e}")
-    sftp.close()
-    
-    # Execute with unbuffered output
-    cmd = f"python3 -u {remote_script}"
-    stdin, stdout, stderr = ssh.exec_command(cmd)
-    
-    # Stream output
-    for line in iter(stdout.readline, ""):
-        try:
-            print(line, end="")
-        except UnicodeEncodeError:
-            # Fallback for Windows console: replace non-encodable chars
-            clean_line = line.encode(sys.stdout.encoding, errors='replace').decode(sys.stdout.encoding)
-            print(clean_line, end="")
-        
-    exit_status = stdout.channel.recv_exit_status()
-    if exit_status != 0:
-        print("[ERR] Remote script failed.")
-        print(stderr.read().decode())
-        return False
-        
-    return True
+def run_remote_transcription(sync, files):
+    """Queues the rescue files in the server's transcription daemon and waits for them"""
+    print(f"\n[INFO] Running Remote Whisper Transcription (daemon)...")
+    # Same daemon/queue as remote_whisper_client: model stays loaded, jobs survive SSH drops
+    return remote_whisper_client.run_remote_transcription(sync, names=[f.name for f in files])
 
-def sync_down_and_distribute(sftp):
+def sync_down_and_distribute(sync):
     """Downloads new transcripts and moves them to correct folders"""
     print(f"\n[INFO] Syncing Transcripts DOWN...")
     
-    try:
-        files = sftp.listdir(REMOTE_TRANSCRIPT_DIR)
-    except FileNotFoundError:
+    def target(filename):
+        # Only our rescue files, placed directly in their playlist folder
+        if not (filename.endswith(".json") or filename.endswith(".srt")):
+            return None
+        playlist = file_playlist_map.get(Path(filename).stem)
+        return TRANSCRIPTS_BASE / playlist / filename if playlist else None
+    
+    # Local placeholders differ in size/hash from the real transcript, so they get replaced
+    report = sync.pull(REMOTE_TRANSCRIPT_DIR, target)
+    if report.get('missing_dir'):
         print("   Remote transcript directory not found.")
         return 0
-        
-    downloaded = 0
     
-    for filename in files:
-        if filename.endswith(".json") or filename.endswith(".srt"):
-            file_stem = Path(filename).stem
-            
-            # Check if this file is one of our rescue files
-            if file_stem in file_playlist_map:
-                playlist = file_playlist_map[file_stem]
-                target_dir = TRANSCRIPTS_BASE / playlist
-                target_dir.mkdir(parents=True, exist_ok=True)
-                
-                local_path = target_dir / filename
-                remote_path = f"{REMOTE_TRANSCRIPT_DIR}/{filename}"
-                
-                # Always download if we are rescuing (overwrite local placeholders if any)
-                print(f"   [DOWN] Downloading {filename} -> {playlist}/")
-                sftp.get(remote_path, str(local_path))
-                downloaded += 1
-                
-    print(f"   Done. {downloaded} transcripts downloaded and sorted.")
-    return downloaded
+    for filename in report['transferred']:
+        playlist = file_playlist_map[Path(filename).stem]
+        print(f"   [DOWN] {filename} -> {playlist}/")
+        if filename.endswith(".json"):
+            manifest_index.mark_transcript(playlist, Path(filename).stem, 'whisper')
+            stage_queue.enqueue(stage_queue.EXTRACT, playlist, Path(filename).stem)
+    print(f"   Done. {len(report['transferred'])} transcripts downloaded and sorted, "
+          f"{len(report['skipped'])} already up to date.")
+    return len(report['transferred'])
 
 import argparse
 
@@ -189,27 +142,28 @@ def main():
     if not ssh:
         return
         
+    # Single SSH session for uploads, remote transcription and downloads
+    sync = SftpSync(ssh)
     try:
-        sftp = ssh.open_sftp()
-        
         if not args.sync_only:
             # 1. Video download
             download_private_video()
             
             # 4. Upload
-            sync_up_audios(sftp, rescue_files)
+            sync_up_audios(sync, rescue_files)
             
             # 5. Transcribe
-            success = run_remote_transcription(ssh)
+            success = run_remote_transcription(sync, rescue_files)
             if not success:
                 print("[WARN] Transcription reported failure (might be running in background). Checking for results anyway...")
         
         # 6. Download and Sort (Always run if successful or forced)
-        sync_down_and_distribute(sftp)
+        sync_down_and_distribute(sync)
             
     except Exception as e:
         print(f"[ERR] unexpected error: {e}")
     finally:
+        sync.close()
         if ssh: 
             ssh.close()
             print("[OK] Connection closed.")
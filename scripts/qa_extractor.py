@@ -8,9 +8,14 @@ import os
 import json
 import re
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from openai import OpenAI
 from dotenv import load_dotenv
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent))
+import llm_cache
+from llm_cache import cached_chat_completion, parse_json_response
 
 load_dotenv()
 
@@ -56,6 +61,12 @@ def extract_qa_from_transcript(transcript_file: Path) -> Dict[str, Any]:
     with open(transcript_file, 'r', encoding='utf-8') as f:
         data = json.load(f)
     
+    # La CLI sigue con una lista vacía si la llamada falla
+    return extract_qa(data, transcript_file.name) or {"qa_pairs": []}
+
+def extract_qa(data: Dict[str, Any], name: str) -> Optional[Dict[str, Any]]:
+    """Extrae Q&A de una transcripción ya cargada (metadata + transcript)"""
+    
     metadata = data.get('metadata', {})
     transcript = data.get('transcript', [])
     
@@ -72,24 +83,16 @@ Texto: {text[:3000]}
 Extrae Q&A pairs en JSON."""
 
     try:
-        response = client.chat.completions.create(
-            model=MODEL,
-            messages=[
+        params = {
+            "model": MODEL,
+            "messages": [
                 {"role": "system", "content": SYSTEM_PROMPT},
                 {"role": "user", "content": prompt}
             ],
-            temperature=0.3
-        )
-        
-        content = response.choices[0].message.content
+            "temperature": 0.3
+        }
         
-        # Limpiar JSON si viene con markdown
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0]
-        elif "```" in content:
-            content = content.split("```")[1].split("```")[0]
-        
-        result = json.loads(content.strip())
+        result = cached_chat_completion(client, PROVIDER, params, parse=parse_json_response)
         
         # Agregar metadata
         for qa in result.get('qa_pairs', []):
@@ -99,8 +102,23 @@ Extrae Q&A pairs en JSON."""
         return result
         
     except Exception as e:
-        print(f"Error processing {transcript_file.name}: {e}")
-        return {"qa_pairs": []}
+        print(f"Error processing {name}: {e}")
+        return None  # None = falló (extraction_pipeline lo reintenta en la próxima corrida)
+
+def build_qa_database(all_qa: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Arma la DB de Q&A con conteo por categoría"""
+    output_data = {
+        "total_qa": len(all_qa),
+        "categories": {},
+        "qa_pairs": all_qa
+    }
+    
+    # Contar por categoría
+    for qa in all_qa:
+        cat = qa.get('category', 'Otros')
+        output_data['categories'][cat] = output_data['categories'].get(cat, 0) + 1
+    
+    return output_data
 
 def process_all_transcripts(input_dir: str, output_file: str):
     """Procesa todas las transcripciones y genera DB de Q&A"""
@@ -128,16 +146,7 @@ def process_all_transcripts(input_dir: str, output_file: str):
         time.sleep(2)
     
     # Guardar resultado
-    output_data = {
-        "total_qa": len(all_qa),
-        "categories": {},
-        "qa_pairs": all_qa
-    }
-    
-    # Contar por categoría
-    for qa in all_qa:
-        cat = qa.get('category', 'Otros')
-        output_data['categories'][cat] = output_data['categories'].get(cat, 0) + 1
+    output_data = build_qa_database(all_qa)
     
     with open(output_file, 'w', encoding='utf-8') as f:
         json.dump(output_data, f, ensure_ascii=False, indent=2)
@@ -145,6 +154,7 @@ def process_all_transcripts(input_dir: str, output_file: str):
     print(f"\nGuardado en: {output_file}")
     print(f"Total Q&A: {len(all_qa)}")
     print(f"Categorías: {output_data['categories']}")
+    llm_cache.print_stats()
 
 if __name__ == "__main__":
     import argparse
@@ -154,7 +164,12 @@ if __name__ == "__main__":
                        help='Directorio de transcripciones')
     parser.add_argument('--output', default='kabbalah-app/data/qa_database.json',
                        help='Archivo de salida')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='No usar la caché de respuestas del modelo')
     
     args = parser.parse_args()
     
+    if args.no_cache:
+        llm_cache.set_enabled(False)
+    
     process_all_transcripts(args.input, args.output)
@@ -2,9 +2,18 @@ import paramiko
 import os
 import sys
 import time
+import json
+import shlex
 import argparse
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent))
+from transcription_backends import AUDIO_EXTENSIONS
+from sftp_sync import SftpSync
+import manifest_index
+import stage_queue
+from transcription_daemon import HEARTBEAT_STALE_S, STATES, new_job
+
 # Configuration
 SERVER_IP = "192.168.100.21"
 USERNAME = "willy"
@@ -12,9 +21,16 @@ PASSWORD = "Passw0rd"
 REMOTE_BASE = "/home/willy"
 REMOTE_AUDIO_DIR = f"{REMOTE_BASE}/kabbalah_audios"
 REMOTE_TRANSCRIPT_DIR = f"{REMOTE_BASE}/kabbalah_transcripciones"
+REMOTE_QUEUE_DIR = f"{REMOTE_BASE}/kabbalah_jobs"
+REMOTE_DAEMON_LOG = f"{REMOTE_BASE}/transcription_daemon.log"
+POLL_SECONDS = 10
+DAEMON_DEAD_SECONDS = 120   # sin heartbeat este tiempo (con jobs pendientes) = daemon caído
 LOCAL_BASE = Path("c:/Users/paparinots/Documents/Kabbalah")
 LOCAL_AUDIO_DIR = LOCAL_BASE / "audios" / "secretos_zohar"
 LOCAL_TRANSCRIPT_DIR = LOCAL_BASE / "transcripciones" / "secretos_zohar"
+# Scripts del daemon (sólo se suben si cambiaron)
+SERVER_SCRIPTS = ["transcription_daemon.py", "transcribe_server.py", "transcription_backends.py",
+                  "vad_slicing.py", "parallel_segments.py"]
 
 def create_ssh_client():
     client = paramiko.SSHClient()
@@ -26,106 +42,195 @@ def create_ssh_client():
         print(f"❌ Connection failed: {e}")
         return None
 
-def sync_up_audios(sftp):
-    """Uploads missing MP3s to server"""
+def sync_up_audios(sync):
+    """Uploads missing or changed audios (MP3 or ASR formats) to server"""
     print(f"\n📤 Syncing Audios UP to {REMOTE_AUDIO_DIR}...")
     
-    # Ensure remote dir exists
-    try:
-        sftp.stat(REMOTE_AUDIO_DIR)
-    except FileNotFoundError:
-        sftp.mkdir(REMOTE_AUDIO_DIR)
-        
-    local_files = list(LOCAL_AUDIO_DIR.glob("*.mp3"))
+    local_files = [path for path in LOCAL_AUDIO_DIR.glob("*") if path.suffix in AUDIO_EXTENSIONS]
     if not local_files:
-        print("   No local MP3 files found.")
+        print("   No local audio files found.")
         return 0
-        
-    uploaded = 0
-    for mp3 in local_files:
-        remote_path = f"{REMOTE_AUDIO_DIR}/{mp3.name}"
-        try:
-            sftp.stat(remote_path)
-            # File exists, skip (assume same)
-        except FileNotFoundError:
-            print(f"   ⬆️ Uploading {mp3.name}...")
-            sftp.put(str(mp3), remote_path)
-            uploaded += 1
-            
-    print(f"   Done. {uploaded} new files uploaded.")
-    return uploaded
+    
+    # Un listado remoto + delta; subidas truncadas se detectan por tamaño/SHA-256
+    report = sync.push(local_files, REMOTE_AUDIO_DIR)
+    print(f"   Done. {len(report['transferred'])} uploaded, {len(report['skipped'])} unchanged, "
+          f"{len(report['failed'])} failed.")
+    return len(report['transferred'])
+
+def daemon_info(sync):
+    """daemon.json del servidor con 'alive' calculado por el heartbeat (None si nunca arrancó)"""
+    text = sync.read_text(f"{REMOTE_QUEUE_DIR}/daemon.json")
+    if not text:
+        return None
+    info = json.loads(text)
+    # El heartbeat usa el reloj del servidor: se compara contra su propia hora
+    remote_now = int(sync.ssh.exec_command("date +%s")[1].read().decode().strip() or 0)
+    info['alive'] = remote_now - info.get('heartbeat', 0) < HEARTBEAT_STALE_S
+    return info
 
-def run_remote_transcription(ssh):
-    """Runs the transcription script on the server"""
-    print(f"\n🎙️ Running Remote Whisper Transcription...")
+def ensure_daemon(sync, backend="whisper"):
+    """Sube los scripts si cambiaron y arranca el daemon si no está vivo"""
+    report = sync.push([LOCAL_BASE / "scripts" / name for name in SERVER_SCRIPTS], REMOTE_BASE)
+    if report['transferred']:
+        print(f"   📤 Scripts actualizados: {', '.join(report['transferred'])}")
     
-    # First, ensure the script is there
-    sftp = ssh.open_sftp()
-    local_script = LOCAL_BASE / "scripts" / "transcribe_server.py"
-    remote_script = f"{REMOTE_BASE}/transcribe_server.py"
-    sftp.put(str(local_script), remote_script)
-    sftp.close()
+    info = daemon_info(sync)
+    if info and info['alive']:
+        if info['backend'] != backend:
+            print(f"   ⚠️ El daemon ya corre con '{info['backend']}' (se usa ese modelo cargado)")
+        if report['transferred']:
+            print(f"   ⚠️ Scripts cambiaron: reinicia el daemon para usarlos (kill {info['pid']})")
+        print(f"   ✅ Daemon activo (pid {info['pid']}, {info['backend']}/{info['model']})")
+        return True
     
-    # Execute
-    stdin, stdout, stderr = ssh.exec_command(f"python3 -u {remote_script}")
+    print(f"   🚀 Iniciando daemon ({backend})...")
+    command = (f"cd {shlex.quote(REMOTE_BASE)} && nohup python3 -u transcription_daemon.py "
+               f"--backend {shlex.quote(backend)} >> {shlex.quote(REMOTE_DAEMON_LOG)} 2>&1 < /dev/null &")
+    sync.ssh.exec_command(command)
+    return True
+
+def job_states(sync):
+    """{job_id: estado} leyendo un listado por carpeta de la cola"""
+    states = {}
+    for state in STATES:
+        for name in (sync.listing(f"{REMOTE_QUEUE_DIR}/{state}") or {}):
+            if name.endswith(".json") and not name.startswith("."):
+                states[name[:-len(".json")]] = state
+    return states
+
+def submit_jobs(sync, names=None):
+    """Encola los audios remotos sin transcripción (o sólo `names`); devuelve los job ids pendientes"""
+    sync.ensure_dir(REMOTE_QUEUE_DIR)
+    for state in STATES:
+        sync.ensure_dir(f"{REMOTE_QUEUE_DIR}/{state}")
     
-    # Stream output
-    for line in iter(stdout.readline, ""):
-        print(line, end="")
+    audios = [name for name in (sync.listing(REMOTE_AUDIO_DIR) or {})
+              if Path(name).suffix in AUDIO_EXTENSIONS]
+    if names is not None:
+        wanted = set(names)
+        audios = [name for name in audios if name in wanted]
+    transcribed = {Path(name).stem for name in (sync.listing(REMOTE_TRANSCRIPT_DIR) or {}) if name.endswith(".srt")}
+    states = job_states(sync)
+    
+    pending, submitted = [], 0
+    for name in sorted(audios):
+        stem = Path(name).stem
+        if stem in transcribed:
+            continue
+        if states.get(stem) in ('queued', 'running'):
+            pending.append(stem)
+            continue
+        job = new_job(name)
+        sync.write_text(f"{REMOTE_QUEUE_DIR}/queued/{stem}.json", json.dumps(job, ensure_ascii=False, indent=2))
+        if states.get(stem) == 'failed':
+            sync.remove(f"{REMOTE_QUEUE_DIR}/failed/{stem}.json")
+        pending.append(stem)
+        submitted += 1
+    
+    print(f"   📨 {submitted} jobs nuevos, {len(pending) - submitted} ya en cola")
+    return pending
+
+def wait_for_jobs(sync, job_ids, poll_seconds=POLL_SECONDS, dead_seconds=DAEMON_DEAD_SECONDS):
+    """Consulta el estado de los jobs hasta que terminen; devuelve {estado: cantidad}
+
+    Devuelve None si el daemon deja de latir más de `dead_seconds` con jobs
+    pendientes (backend sin instalar, OOM al cargar el modelo, crash...).
+    """
+    last = {}
+    dead_since = None
+    while True:
+        states = job_states(sync)
+        current = {job_id: states.get(job_id, 'queued') for job_id in job_ids}
+        for job_id, state in current.items():
+            if last.get(job_id) != state and state != 'queued':
+                icon = {'running': '🎙️', 'done': '✅', 'failed': '❌'}[state]
+                print(f"   {icon} {job_id}: {state}", flush=True)
+        last = current
+        counts = {state: list(current.values()).count(state) for state in STATES}
+        if not counts['queued'] and not counts['running']:
+            return counts
         
-    exit_status = stdout.channel.recv_exit_status()
-    if exit_status != 0:
-        print("❌ Remote script failed.")
-        print(stderr.read().decode())
+        info = daemon_info(sync)
+        if info and info['alive']:
+            dead_since = None
+        elif dead_since is None:
+            dead_since = time.time()
+        elif time.time() - dead_since >= dead_seconds:
+            print(f"   ❌ El daemon no responde hace {time.time() - dead_since:.0f}s "
+                  f"({counts['queued']} en cola, {counts['running']} en curso). Log: {REMOTE_DAEMON_LOG}", flush=True)
+            return None
+        time.sleep(poll_seconds)
+
+def run_remote_transcription(sync, backend="whisper", names=None, wait=True):
+    """Encola los audios en el daemon del servidor y (opcionalmente) espera a que termine
+    
+    El modelo queda cargado en el servidor entre ejecuciones y la cola sobrevive
+    a una caída de la sesión SSH: volver a ejecutar sólo retoma el seguimiento.
+    """
+    print(f"\n🎙️ Remote Whisper Transcription (daemon)...")
+    ensure_daemon(sync, backend)
+    job_ids = submit_jobs(sync, names)
+    if not job_ids:
+        print("   ✅ Nada pendiente")
+        return True
+    if not wait:
+        print(f"   ⏳ {len(job_ids)} jobs en cola (sin esperar)")
+        return True
+    
+    counts = wait_for_jobs(sync, job_ids)
+    if counts is None:
         return False
-        
-    return True
+    print(f"   Done. {counts['done']} transcribed, {counts['failed']} failed.")
+    if counts['failed']:
+        print(f"   Detalle: python3 {REMOTE_BASE}/transcription_daemon.py --status (en el servidor)")
+    return counts['failed'] == 0
 
-def sync_down_transcripts(sftp, quiet=False):
-    """Downloads new transcripts from server"""
+def sync_down_transcripts(sync, quiet=False):
+    """Downloads new or changed transcripts from server"""
     if not quiet:
         print(f"\n📥 Syncing Transcripts DOWN from {REMOTE_TRANSCRIPT_DIR}...")
     
-    try:
-        files = sftp.listdir(REMOTE_TRANSCRIPT_DIR)
-    except FileNotFoundError:
+    def target(filename):
+        if filename.endswith(".json") or filename.endswith(".srt"):
+            return LOCAL_TRANSCRIPT_DIR / filename
+        return None
+    
+    report = sync.pull(REMOTE_TRANSCRIPT_DIR, target)
+    if report.get('missing_dir'):
         if not quiet: print("   Remote transcript directory not found.")
         return 0
-        
-    downloaded = 0
-    LOCAL_TRANSCRIPT_DIR.mkdir(parents=True, exist_ok=True)
     
-    for filename in files:
-        if filename.endswith(".json") or filename.endswith(".srt"):
-            local_path = LOCAL_TRANSCRIPT_DIR / filename
-            remote_path = f"{REMOTE_TRANSCRIPT_DIR}/{filename}"
-            
-            if not local_path.exists():
-                if not quiet: print(f"   ⬇️ Downloading {filename}...")
-                sftp.get(remote_path, str(local_path))
-                downloaded += 1
-                
-                # Also verify .json3 compatibility if needed? 
-                # Our pipeline uses .json mainly for AI now.
-                
+    # Cada JSON nuevo pasa directo a la extracción IA
+    playlist = LOCAL_TRANSCRIPT_DIR.name
+    for filename in report['transferred']:
+        if filename.endswith(".json"):
+            manifest_index.mark_transcript(playlist, Path(filename).stem, 'whisper')
+            stage_queue.enqueue(stage_queue.EXTRACT, playlist, Path(filename).stem)
+    
     if not quiet:
-        print(f"   Done. {downloaded} new transcripts downloaded.")
-    return downloaded
+        print(f"   Done. {len(report['transferred'])} transcripts downloaded, "
+              f"{len(report['failed'])} failed.")
+    return len(report['transferred'])
 
 def sync_remote_transcripts():
     """Wrapper function for external import"""
     ssh = create_ssh_client()
     if not ssh: return 0
+    sync = SftpSync(ssh, quiet=True)
     try:
-        sftp = ssh.open_sftp()
-        return sync_down_transcripts(sftp, quiet=True)
+        return sync_down_transcripts(sync, quiet=True)
     finally:
+        sync.close()
         ssh.close()
 
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument('--mode', choices=['full', 'sync', 'transcribe'], default='full',
-                        help='Operation mode: full (sync UP, transcribe, sync DOWN), sync (only downloading results), transcribe (only running remote script)')
+    parser.add_argument('--mode', choices=['full', 'sync', 'transcribe', 'status'], default='full',
+                        help='Operation mode: full (sync UP, transcribe, sync DOWN), sync (only downloading results), transcribe (only queueing jobs in the remote daemon), status (daemon and queue)')
+    parser.add_argument('--backend', choices=['whisper', 'faster-whisper'], default='whisper',
+                        help='Remote transcription engine (faster-whisper = int8 CTranslate2)')
+    parser.add_argument('--no-wait', action='store_true',
+                        help='Queue the jobs and return without waiting for the daemon')
     args = parser.parse_args()
 
     print("="*60)
@@ -136,26 +241,37 @@ def main():
     if not ssh:
         return
         
+    # Una sola sesión SSH: canales SFTP paralelos + comandos remotos
+    sync = SftpSync(ssh)
     try:
-        sftp = ssh.open_sftp()
+        if args.mode == 'status':
+            info = daemon_info(sync)
+            if info:
+                print(f"Daemon pid {info['pid']} ({info['backend']}/{info['model']}): "
+                      f"{'alive' if info['alive'] else 'NOT running'}, current: {info.get('current') or '-'}")
+            else:
+                print("Daemon: never started")
+            states = list(job_states(sync).values())
+            for state in STATES:
+                print(f"  {state:<8} {states.count(state)}")
         
         if args.mode in ['full', 'transcribe']:
             # 1. Upload Audios (only if full or explicit)
             if args.mode == 'full':
-                sync_up_audios(sftp)
+                sync_up_audios(sync)
             
             # 2. Run Remote Processing
-            success = run_remote_transcription(ssh)
+            success = run_remote_transcription(sync, args.backend, wait=not args.no_wait)
             
             if not success:
                print("⚠️ Transcription reporting failure or interrupted.")
 
         if args.mode in ['full', 'sync']:
             # 3. Download Results
-            sync_down_transcripts(sftp)
+            sync_down_transcripts(sync)
             
     finally:
-        sftp.close()
+        sync.close()
         ssh.close()
         print("\n✅ Session closed.")
 
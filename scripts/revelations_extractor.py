@@ -7,9 +7,14 @@ Identifica enseñanzas profundas y secretos revelados en las clases
 import os
 import json
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from openai import OpenAI
 from dotenv import load_dotenv
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent))
+import llm_cache
+from llm_cache import cached_chat_completion, parse_json_response
 
 load_dotenv()
 
@@ -62,6 +67,12 @@ def extract_revelations_from_transcript(transcript_file: Path) -> Dict[str, Any]
     with open(transcript_file, 'r', encoding='utf-8') as f:
         data = json.load(f)
     
+    # La CLI sigue con una lista vacía si la llamada falla
+    return extract_revelations(data, transcript_file.name) or {"revelations": []}
+
+def extract_revelations(data: Dict[str, Any], name: str) -> Optional[Dict[str, Any]]:
+    """Extrae revelaciones de una transcripción ya cargada (metadata + transcript)"""
+    
     metadata = data.get('metadata', {})
     transcript = data.get('transcript', [])
     
@@ -78,24 +89,16 @@ Texto: {text[:4000]}
 Identifica secretos revelados y explícalos en JSON."""
 
     try:
-        response = client.chat.completions.create(
-            model=MODEL,
-            messages=[
+        params = {
+            "model": MODEL,
+            "messages": [
                 {"role": "system", "content": SYSTEM_PROMPT},
                 {"role": "user", "content": prompt}
             ],
-            temperature=0.4  # Un poco más creativo
-        )
+            "temperature": 0.4  # Un poco más creativo
+        }
         
-        content = response.choices[0].message.content
-        
-        # Limpiar JSON
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0]
-        elif "```" in content:
-            content = content.split("```")[1].split("```")[0]
-        
-        result = json.loads(content.strip())
+        result = cached_chat_completion(client, PROVIDER, params, parse=parse_json_response)
         
         # Agregar metadata
         for rev in result.get('revelations', []):
@@ -106,8 +109,30 @@ Identifica secretos revelados y explícalos en JSON."""
         return result
         
     except Exception as e:
-        print(f"Error processing {transcript_file.name}: {e}")
-        return {"revelations": []}
+        print(f"Error processing {name}: {e}")
+        return None  # None = falló (extraction_pipeline lo reintenta en la próxima corrida)
+
+def build_revelations_database(all_revelations: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Arma la DB de revelaciones organizada por Parashá y nivel"""
+    
+    # Organizar por Parashá
+    by_parasha = {}
+    for rev in all_revelations:
+        parasha = rev.get('parasha', 'General')
+        if parasha not in by_parasha:
+            by_parasha[parasha] = []
+        by_parasha[parasha].append(rev)
+    
+    return {
+        "total_revelations": len(all_revelations),
+        "by_parasha": by_parasha,
+        "by_level": {
+            "principiante": len([r for r in all_revelations if r.get('level') == 'principiante']),
+            "intermedio": len([r for r in all_revelations if r.get('level') == 'intermedio']),
+            "avanzado": len([r for r in all_revelations if r.get('level') == 'avanzado']),
+        },
+        "revelations": all_revelations
+    }
 
 def process_all_transcripts(input_dir: str, output_file: str):
     """Procesa todas las transcripciones y genera DB de revelaciones"""
@@ -132,25 +157,9 @@ def process_all_transcripts(input_dir: str, output_file: str):
         import time
         time.sleep(2)
     
-    # Organizar por Parashá
-    by_parasha = {}
-    for rev in all_revelations:
-        parasha = rev.get('parasha', 'General')
-        if parasha not in by_parasha:
-            by_parasha[parasha] = []
-        by_parasha[parasha].append(rev)
-    
     # Guardar resultado
-    output_data = {
-        "total_revelations": len(all_revelations),
-        "by_parasha": by_parasha,
-        "by_level": {
-            "principiante": len([r for r in all_revelations if r.get('level') == 'principiante']),
-            "intermedio": len([r for r in all_revelations if r.get('level') == 'intermedio']),
-            "avanzado": len([r for r in all_revelations if r.get('level') == 'avanzado']),
-        },
-        "revelations": all_revelations
-    }
+    output_data = build_revelations_database(all_revelations)
+    by_parasha = output_data['by_parasha']
     
     with open(output_file, 'w', encoding='utf-8') as f:
         json.dump(output_data, f, ensure_ascii=False, indent=2)
@@ -159,6 +168,7 @@ def process_all_transcripts(input_dir: str, output_file: str):
     print(f"Total revelaciones: {len(all_revelations)}")
     print(f"Por nivel: {output_data['by_level']}")
     print(f"Parashat: {list(by_parasha.keys())}")
+    llm_cache.print_stats()
 
 if __name__ == "__main__":
     import argparse
@@ -168,7 +178,12 @@ if __name__ == "__main__":
                        help='Directorio de transcripciones')
     parser.add_argument('--output', default='kabbalah-app/data/revelations_db.json',
                        help='Archivo de salida')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='No usar la caché de respuestas del modelo')
     
     args = parser.parse_args()
     
+    if args.no_cache:
+        llm_cache.set_enabled(False)
+    
     process_all_transcripts(args.input, args.output)
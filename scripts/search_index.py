@@ -0,0 +1,381 @@
+"""
+Search Index - Índice invertido precalculado (BM25) para búsqueda offline
+
+La búsqueda dependía de los índices $text de MongoDB (create_indexes en
+migrate_to_mongodb.py) o de recorrer meditations_all.json entero. Los
+consolidadores ahora arman, al terminar, un índice invertido sobre los
+datos de la app:
+
+    meditacion  <- meditations_all.json
+    concepto    <- zohar_db.json (conceptos de cada video)
+    glosario    <- glossary.json
+    pregunta    <- qa_database.json (si existe)
+
+- Normalización: minúsculas, sin acentos (árbol == arbol), sin stopwords y
+  con stemming en español (snowballstemmer si está instalado; si no, un
+  stemmer ligero de sufijos). La posición de cada token se conserva para
+  las frases
+- Postings por campo (titulo, descripcion, texto, claves) con posiciones;
+  "videos" agrupa los documentos de cada video para filtrar sin escanear
+- Ranking BM25 por campo, ponderado con FIELD_WEIGHTS
+- Consultas: palabras sueltas (OR, como $text), "frase exacta" (obligatoria),
+  prefijo* y -excluir
+
+search_index.json (compacto):
+    {"version": 1, "stemmer": "snowball", "fields": [...],
+     "docs": [[kind, id, video_id, titulo, [len por campo]], ...],
+     "avg_len": [...], "videos": {video_id: [doc, ...]},
+     "terms": {term: [doc, campo, n, Δpos1, Δpos2, ..., doc, campo, n, ...]}}
+
+Uso:
+    python scripts/search_index.py --build
+    python scripts/search_index.py "árbol de la vida" [--kind meditacion] [--video ID]
+
+    from search_index import SearchIndex
+    index = SearchIndex.load()
+    index.search('"luz infinita" medit*', kinds=['meditacion'], limit=5)
+"""
+
+import os
+import re
+import sys
+import json
+import math
+import time
+import bisect
+import argparse
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+from data_bundles import DATA_DIR, write_json_compact
+
+try:
+    import snowballstemmer
+    _snowball = snowballstemmer.stemmer('spanish')
+except ImportError:
+    _snowball = None
+
+INDEX_FILE = DATA_DIR / "search_index.json"
+INDEX_VERSION = 1
+
+FIELDS = ['titulo', 'descripcion', 'texto', 'claves']
+FIELD_WEIGHTS = [3.0, 1.5, 1.0, 2.0]
+BM25_K1 = 1.2
+BM25_B = 0.75
+MAX_PREFIX_TERMS = 50     # expansiones de un prefijo* (las de mayor df)
+
+STOPWORDS = set("""
+a al algo algunas algunos ante antes como con contra cual cuando de del desde donde durante e el ella
+ellas ellos en entre era es esa esas ese eso esos esta estas este esto estos fue ha hay la las le les
+lo los mas me mi mis mucho muy ni no nos o otra otras otro otros para pero poco por porque que quien
+se sea ser si sin sobre son su sus tambien te tiene todo todos tu tus un una uno unos y ya yo
+""".split())
+
+# Stemmer ligero (sin dependencias): sufijos de mayor a menor longitud
+_SUFFIXES = sorted("""
+amientos imientos amiento imiento aciones uciones adoras adores ancias logias amente mente acion ucion
+ancia adora ador ables ibles istas idades idad ivos ivas osos osas able ible ista ivo iva oso osa
+ando iendo ados idos adas idas ado ido ada ida ar er ir es s
+""".split(), key=len, reverse=True)
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+def fold(text: str) -> str:
+    """Minúsculas y sin acentos: 'Árbol' -> 'arbol'"""
+    text = unicodedata.normalize('NFKD', str(text).lower())
+    return ''.join(ch for ch in text if not unicodedata.combining(ch))
+
+def _light_stem(word: str) -> str:
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[:-len(suffix)]
+            break
+    if len(word) > 3 and word[-1] in 'aeo':
+        word = word[:-1]
+    return word
+
+def stem(word: str) -> str:
+    if _snowball is not None:
+        return _snowball.stemWord(word)
+    return _light_stem(word)
+
+STEMMER = 'snowball' if _snowball is not None else 'ligero'
+
+def tokenize(text: str) -> List[Tuple[int, str]]:
+    """[(posición, término)]; las stopwords se descartan pero ocupan su posición"""
+    return [(pos, stem(word)) for pos, word in enumerate(_TOKEN.findall(fold(text)))
+            if word not in STOPWORDS]
+
+def _join(*values: Any) -> str:
+    parts = []
+    for value in values:
+        if isinstance(value, (list, tuple)):
+            parts.extend(str(v) for v in value if v)
+        elif value:
+            parts.append(str(value))
+    return " ".join(parts)
+
+# ============================================================================
+# DOCUMENTOS
+# ============================================================================
+
+def _load_json(path: Path, default: Any) -> Any:
+    if not path.exists():
+        return default
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"   ⚠️  {path}: {e}")
+        return default
+
+def collect_documents(data_dir: Path = DATA_DIR) -> List[Dict[str, Any]]:
+    """Documentos a indexar: {kind, id, video_id, titulo, fields: [texto por campo]}"""
+    docs = []
+
+    for med in _load_json(data_dir / "meditations_all.json", {}).get('meditaciones', []):
+        docs.append({'kind': 'meditacion', 'id': med.get('id', ''), 'video_id': med.get('video_id', ''),
+                     'titulo': med.get('titulo', ''),
+                     'fields': [med.get('titulo', ''), med.get('descripcion', ''), med.get('instrucciones', ''),
+                                _join(med.get('category'), med.get('clase_titulo'))]})
+
+    for item in _load_json(data_dir / "zohar_db.json", {}).get('items', []):
+        metadata = item.get('metadata', {})
+        for i, concept in enumerate(item.get('conceptos', [])):
+            docs.append({'kind': 'concepto', 'id': f"{metadata.get('video_id', '')}-{i}",
+                         'video_id': metadata.get('video_id', ''), 'titulo': concept.get('termino', ''),
+                         'fields': [concept.get('termino', ''), concept.get('definicion', ''),
+                                    concept.get('explicacion', ''),
+                                    _join(concept.get('referencias_cruzadas'), metadata.get('titulo'))]})
+
+    for term in _load_json(data_dir / "glossary.json", []):
+        docs.append({'kind': 'glosario', 'id': term.get('termino', ''), 'video_id': '',
+                     'titulo': term.get('termino', ''),
+                     'fields': [term.get('termino', ''), term.get('definicion', ''), term.get('explicacion', ''),
+                                _join(term.get('fuente'))]})
+
+    for i, qa in enumerate(_load_json(data_dir / "qa_database.json", {}).get('qa_pairs', [])):
+        docs.append({'kind': 'pregunta', 'id': f"qa-{i:04d}", 'video_id': qa.get('video_id', ''),
+                     'titulo': qa.get('question', ''),
+                     'fields': [qa.get('question', ''), '', qa.get('answer', ''),
+                                _join(qa.get('keywords'), qa.get('category'))]})
+
+    return docs
+
+# ============================================================================
+# CONSTRUCCIÓN
+# ============================================================================
+
+def build_index(data_dir: Path = DATA_DIR, output: Path = INDEX_FILE) -> Dict[str, Any]:
+    """Tokeniza los documentos y escribe search_index.json; devuelve el índice"""
+    docs = collect_documents(data_dir)
+    postings: Dict[str, List[int]] = {}
+    doc_rows, videos = [], {}
+    totals = [0] * len(FIELDS)
+
+    for doc_id, doc in enumerate(docs):
+        lengths = []
+        for field_id, text in enumerate(doc['fields']):
+            positions: Dict[str, List[int]] = {}
+            tokens = tokenize(text or '')
+            for pos, term in tokens:
+                positions.setdefault(term, []).append(pos)
+            for term, pos_list in positions.items():
+                deltas = [pos_list[0]] + [b - a for a, b in zip(pos_list, pos_list[1:])]
+                postings.setdefault(term, []).extend([doc_id, field_id, len(pos_list), *deltas])
+            lengths.append(len(tokens))
+            totals[field_id] += len(tokens)
+        doc_rows.append([doc['kind'], doc['id'], doc['video_id'], doc['titulo'], lengths])
+        if doc['video_id']:
+            videos.setdefault(doc['video_id'], []).append(doc_id)
+
+    index = {
+        'version': INDEX_VERSION,
+        'stemmer': STEMMER,
+        'fields': FIELDS,
+        'docs': doc_rows,
+        'avg_len': [round(total / len(docs), 3) if docs else 0 for total in totals],
+        'videos': videos,
+        'terms': dict(sorted(postings.items())),
+    }
+    write_json_compact(output, index)
+    print(f"🔎 Índice de búsqueda: {len(docs)} documentos, {len(postings)} términos -> {output}")
+    return index
+
+# ============================================================================
+# BÚSQUEDA
+# ============================================================================
+
+def parse_query(query: str) -> Dict[str, List]:
+    """'"luz infinita" medit* -ego zohar' -> frases, prefijos, excluidos y términos sueltos"""
+    parsed = {'phrases': [], 'prefixes': [], 'excluded': [], 'terms': []}
+    for phrase in re.findall(r'"([^"]+)"', query):
+        tokens = tokenize(phrase)
+        if len(tokens) > 1:
+            parsed['phrases'].append([(pos - tokens[0][0], term) for pos, term in tokens])
+        else:
+            parsed['terms'].extend(term for _, term in tokens)
+    for word in re.sub(r'"[^"]*"', ' ', query).split():
+        if word.startswith('-'):
+            parsed['excluded'].extend(term for _, term in tokenize(word[1:]))
+        elif word.endswith('*'):
+            prefix = ''.join(_TOKEN.findall(fold(word)))
+            if prefix:
+                parsed['prefixes'].append(stem(prefix) if len(stem(prefix)) >= 2 else prefix)
+        else:
+            parsed['terms'].extend(term for _, term in tokenize(word))
+    return parsed
+
+class SearchIndex:
+    """search_index.json en memoria; los postings se decodifican por término y se memorizan"""
+
+    def __init__(self, data: Dict[str, Any]):
+        if data.get('version') != INDEX_VERSION:
+            raise ValueError(f"versión de índice {data.get('version')} (se espera {INDEX_VERSION})")
+        if data.get('stemmer') != STEMMER:
+            print(f"⚠️ Índice construido con stemmer '{data.get('stemmer')}', consultas con '{STEMMER}': "
+                  f"reconstruir con --build")
+        self.docs = data['docs']
+        self.avg_len = data['avg_len']
+        self.videos = data['videos']
+        self._raw = data['terms']
+        self._sorted_terms = sorted(self._raw)
+        self._decoded: Dict[str, Dict[int, Dict[int, List[int]]]] = {}
+
+    @classmethod
+    def load(cls, path: Path = INDEX_FILE) -> 'SearchIndex':
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def postings(self, term: str) -> Dict[int, Dict[int, List[int]]]:
+        """{doc: {campo: [posiciones]}}"""
+        decoded = self._decoded.get(term)
+        if decoded is None:
+            decoded = {}
+            flat = self._raw.get(term, [])
+            i = 0
+            while i < len(flat):
+                doc, field, n = flat[i], flat[i + 1], flat[i + 2]
+                positions, pos = [], 0
+                for delta in flat[i + 3:i + 3 + n]:
+                    pos += delta
+                    positions.append(pos)
+                decoded.setdefault(doc, {})[field] = positions
+                i += 3 + n
+            self._decoded[term] = decoded
+        return decoded
+
+    def expand_prefix(self, prefix: str) -> List[str]:
+        start = bisect.bisect_left(self._sorted_terms, prefix)
+        matches = []
+        for term in self._sorted_terms[start:]:
+            if not term.startswith(prefix):
+                break
+            matches.append(term)
+        if len(matches) > MAX_PREFIX_TERMS:
+            matches = sorted(matches, key=lambda t: -len(self.postings(t)))[:MAX_PREFIX_TERMS]
+        return matches
+
+    def _idf(self, term: str) -> float:
+        df = len(self.postings(term))
+        return math.log(1 + (len(self.docs) - df + 0.5) / (df + 0.5))
+
+    def _bm25(self, term: str, docs: Optional[Iterable[int]] = None) -> Dict[int, float]:
+        """Score BM25 por campo (ponderado) de `term` en cada documento que lo contiene"""
+        postings = self.postings(term)
+        idf = self._idf(term)
+        scores = {}
+        for doc in (postings if docs is None else docs):
+            score = 0.0
+            for field, positions in postings.get(doc, {}).items():
+                tf = len(positions)
+                avg = self.avg_len[field] or 1
+                norm = 1 - BM25_B + BM25_B * self.docs[doc][4][field] / avg
+                score += FIELD_WEIGHTS[field] * tf * (BM25_K1 + 1) / (tf + BM25_K1 * norm)
+            scores[doc] = idf * score
+        return scores
+
+    def _phrase_docs(self, phrase: List[Tuple[int, str]]) -> set:
+        """Documentos con la frase completa (mismos offsets) dentro de un mismo campo"""
+        lists = [self.postings(term) for _, term in phrase]
+        candidates = set(lists[0]).intersection(*lists[1:])
+        found = set()
+        for doc in candidates:
+            for field, starts in lists[0][doc].items():
+                if any(all(start + offset in lists[k][doc].get(field, ())
+                           for k, (offset, _) in enumerate(phrase) if k)
+                       for start in starts):
+                    found.add(doc)
+                    break
+        return found
+
+    def search(self, query: str, kinds: Optional[List[str]] = None, video_id: Optional[str] = None,
+               limit: int = 10) -> List[Dict[str, Any]]:
+        """Resultados ordenados por score: [{kind, id, video_id, titulo, score}]"""
+        parsed = parse_query(query)
+        allowed = None
+        if video_id:
+            allowed = set(self.videos.get(video_id, []))
+        for phrase in parsed['phrases']:
+            docs = self._phrase_docs(phrase)
+            allowed = docs if allowed is None else allowed & docs
+
+        terms = list(parsed['terms'])
+        for prefix in parsed['prefixes']:
+            terms.extend(self.expand_prefix(prefix))
+        for phrase in parsed['phrases']:
+            terms.extend(term for _, term in phrase)
+
+        scores: Dict[int, float] = {}
+        for term in dict.fromkeys(terms):
+            docs = None if allowed is None else allowed & set(self.postings(term))
+            for doc, score in self._bm25(term, docs).items():
+                scores[doc] = scores.get(doc, 0.0) + score
+
+        excluded = set()
+        for term in parsed['excluded']:
+            excluded.update(self.postings(term))
+
+        results = []
+        for doc, score in sorted(scores.items(), key=lambda kv: -kv[1]):
+            kind, doc_key, doc_video, title, _ = self.docs[doc]
+            if doc in excluded or (kinds and kind not in kinds):
+                continue
+            results.append({'kind': kind, 'id': doc_key, 'video_id': doc_video, 'titulo': title,
+                            'score': round(score, 4)})
+            if len(results) >= limit:
+                break
+        return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Índice invertido BM25 para búsqueda offline')
+    parser.add_argument('query', nargs='?', help='Consulta: palabras, "frase", prefijo*, -excluir')
+    parser.add_argument('--build', action='store_true', help='Reconstruir search_index.json')
+    parser.add_argument('--kind', action='append', choices=['meditacion', 'concepto', 'glosario', 'pregunta'],
+                        help='Filtrar por tipo (repetible)')
+    parser.add_argument('--video', help='Filtrar por video_id')
+    parser.add_argument('--limit', type=int, default=10)
+    args = parser.parse_args()
+
+    if args.build or not INDEX_FILE.exists():
+        build_index()
+    if not args.query:
+        return
+
+    start = time.perf_counter()
+    index = SearchIndex.load()
+    load_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    results = index.search(args.query, kinds=args.kind, video_id=args.video, limit=args.limit)
+    query_ms = (time.perf_counter() - start) * 1000
+
+    for result in results:
+        print(f"{result['score']:>8.3f}  [{result['kind']}] {result['titulo'][:70]}"
+              f"{'  (' + result['video_id'] + ')' if result['video_id'] else ''}")
+    if not results:
+        print("(sin resultados)")
+    print(f"⏱️ carga {load_ms:.1f} ms, consulta {query_ms:.3f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""
+SFTP Sync - Sincronización delta con transferencias paralelas y verificación
+
+Antes cada sync hacía un `sftp.stat` por archivo, transfería de a uno y
+daba por "igual" cualquier archivo que ya existiera (una subida truncada
+nunca se reparaba). Ahora:
+
+1. Un solo listado remoto (listdir_attr) con tamaño y mtime
+2. Delta: se transfiere lo que falta o difiere en tamaño; si sólo difiere
+   el mtime se comparan hashes (tras cada transferencia se copia el mtime,
+   así la próxima vez coincide sin hashear)
+3. Varios canales SFTP en paralelo sobre la MISMA sesión SSH
+4. Cada archivo se escribe como .part y se renombra al final; después se
+   verifica tamaño + SHA-256 (remoto con un único `sha256sum` por lote) y
+   se reintenta una vez si no coincide
+
+Uso:
+    from sftp_sync import SftpSync
+    sync = SftpSync(ssh)                                   # paramiko.SSHClient ya conectado
+    sync.push(local_files, "/home/willy/kabbalah_audios")
+    sync.pull("/home/willy/kabbalah_transcripciones",
+              lambda name: local_dir / name if name.endswith('.srt') else None)
+"""
+
+import os
+import stat
+import shlex
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+SYNC_WORKERS = 4          # Canales SFTP simultáneos
+HASH_BATCH = 200          # Archivos por llamada a sha256sum
+MTIME_TOLERANCE = 2       # Segundos (FAT/NTFS redondean el mtime)
+CHUNK_BYTES = 1024 * 1024
+
+def sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(CHUNK_BYTES), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _compare(local_size: int, local_mtime: float, remote: Optional[Tuple[int, int]]) -> str:
+    """'same' | 'check' (mismo tamaño, otro mtime: decidir por hash) | 'differ'"""
+    if remote is None or remote[0] != local_size:
+        return 'differ'
+    return 'same' if abs(remote[1] - local_mtime) <= MTIME_TOLERANCE else 'check'
+
+class SftpSync:
+    """Sync delta sobre una sesión SSH (un SFTPClient por thread, mismo transporte)"""
+
+    def __init__(self, ssh, workers: int = SYNC_WORKERS, quiet: bool = False):
+        self.ssh = ssh
+        self.workers = max(1, workers)
+        self.quiet = quiet
+        self._local = threading.local()
+        self._clients = []
+        self._clients_lock = threading.Lock()
+
+    def _log(self, message: str):
+        if not self.quiet:
+            print(message, flush=True)
+
+    def _sftp(self):
+        """Canal SFTP de este thread (se abre una vez sobre el transporte compartido)"""
+        import paramiko
+
+        sftp = getattr(self._local, 'sftp', None)
+        if sftp is None:
+            sftp = self._local.sftp = paramiko.SFTPClient.from_transport(self.ssh.get_transport())
+            with self._clients_lock:
+                self._clients.append(sftp)
+        return sftp
+
+    def close(self):
+        with self._clients_lock:
+            for sftp in self._clients:
+                sftp.close()
+            self._clients = []
+        self._local = threading.local()
+
+    # ------------------------------------------------------------------
+    # Listado y hashes remotos
+    # ------------------------------------------------------------------
+
+    def listing(self, remote_dir: str) -> Optional[Dict[str, Tuple[int, int]]]:
+        """{nombre: (tamaño, mtime)} de los archivos del directorio; None si no existe"""
+        try:
+            entries = self._sftp().listdir_attr(remote_dir)
+        except FileNotFoundError:
+            return None
+        return {e.filename: (e.st_size, e.st_mtime) for e in entries
+                if stat.S_ISREG(e.st_mode or 0) and not e.filename.endswith('.part')}
+
+    def ensure_dir(self, remote_dir: str):
+        try:
+            self._sftp().stat(remote_dir)
+        except FileNotFoundError:
+            self._sftp().mkdir(remote_dir)
+
+    def remote_hashes(self, paths: List[str]) -> Dict[str, str]:
+        """SHA-256 de archivos remotos con `sha256sum` (una llamada por lote)"""
+        hashes = {}
+        for start in range(0, len(paths), HASH_BATCH):
+            batch = paths[start:start + HASH_BATCH]
+            command = "sha256sum -- " + " ".join(shlex.quote(p) for p in batch)
+            _, stdout, _ = self.ssh.exec_command(command)
+            for line in stdout.read().decode('utf-8', errors='replace').splitlines():
+                digest, _, path = line.partition("  ")
+                if path:
+                    hashes[path] = digest
+        return hashes
+
+    def read_text(self, remote_path: str) -> Optional[str]:
+        """Contenido de un archivo remoto pequeño (None si no existe)"""
+        try:
+            with self._sftp().open(remote_path, 'r') as f:
+                return f.read().decode('utf-8')
+        except FileNotFoundError:
+            return None
+
+    def write_text(self, remote_path: str, text: str):
+        """Escribe un archivo remoto pequeño de forma atómica (.part + rename)"""
+        part = f"{remote_path}.part"
+        with self._sftp().open(part, 'w') as f:
+            f.write(text.encode('utf-8'))
+        self._sftp().posix_rename(part, remote_path)
+
+    def remove(self, remote_path: str):
+        try:
+            self._sftp().remove(remote_path)
+        except FileNotFoundError:
+            pass
+
+    # ------------------------------------------------------------------
+    # Transferencias
+    # ------------------------------------------------------------------
+
+    def _upload(self, local: Path, remote_path: str):
+        sftp = self._sftp()
+        part = f"{remote_path}.part"
+        info = local.stat()
+        sftp.put(str(local), part)
+        sftp.utime(part, (info.st_atime, info.st_mtime))
+        sftp.posix_rename(part, remote_path)
+
+    def _download(self, remote_path: str, local: Path, remote_mtime: int):
+        local.parent.mkdir(parents=True, exist_ok=True)
+        part = local.with_name(local.name + ".part")
+        self._sftp().get(remote_path, str(part))
+        os.utime(part, (remote_mtime, remote_mtime))
+        os.replace(part, local)
+
+    def _run(self, transfer: Callable, jobs: List[tuple]) -> List[Tuple[tuple, Optional[str]]]:
+        """Ejecuta transfer(*job) en paralelo; devuelve [(job, error o None)]"""
+        def run(job):
+            try:
+                transfer(*job)
+                return job, None
+            except Exception as e:
+                return job, str(e)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return list(pool.map(run, jobs))
+
+    def _verify(self, pairs: List[Tuple[Path, str]]) -> List[Tuple[Path, str]]:
+        """Pares (local, remoto) cuyo tamaño o SHA-256 no coinciden"""
+        if not pairs:
+            return []
+        remote_dir_sizes: Dict[str, Dict[str, Tuple[int, int]]] = {}
+        hashes = self.remote_hashes([remote for _, remote in pairs])
+        bad = []
+        for local, remote in pairs:
+            folder, _, name = remote.rpartition('/')
+            if folder not in remote_dir_sizes:
+                remote_dir_sizes[folder] = self.listing(folder) or {}
+            remote_info = remote_dir_sizes[folder].get(name)
+            if (not local.exists() or remote_info is None or remote_info[0] != local.stat().st_size
+                    or hashes.get(remote) != sha256_file(local)):
+                bad.append((local, remote))
+        return bad
+
+    def _sync(self, direction: str, jobs: List[tuple], pairs: List[Tuple[Path, str]]) -> Dict[str, List[str]]:
+        transfer = self._upload if direction == 'up' else self._download
+        by_pair = dict(zip(pairs, jobs))
+        report = {'transferred': [], 'failed': []}
+
+        for attempt in range(2):
+            results = self._run(transfer, [by_pair[pair] for pair in pairs])
+            done = []
+            for pair, (_, error) in zip(pairs, results):
+                if error:
+                    self._log(f"   ❌ {pair[0].name}: {error[:80]}")
+                    report['failed'].append(pair[0].name)
+                else:
+                    done.append(pair)
+            bad = self._verify(done)
+            for pair in done:
+                if pair not in bad:
+                    report['transferred'].append(pair[0].name)
+            if not bad:
+                break
+            if attempt == 0:
+                self._log(f"   ⚠️ {len(bad)} archivos no coinciden (tamaño/SHA-256), reintentando...")
+                pairs = bad
+            else:
+                report['failed'].extend(local.name for local, _ in bad)
+        return report
+
+    def _split_by_hash(self, candidates: List[Tuple[Path, str]]) -> List[Tuple[Path, str]]:
+        """De los pares con mismo tamaño y distinto mtime, devuelve los que difieren en contenido"""
+        if not candidates:
+            return []
+        hashes = self.remote_hashes([remote for _, remote in candidates])
+        return [(local, remote) for local, remote in candidates if hashes.get(remote) != sha256_file(local)]
+
+    def push(self, local_files: Iterable[Path], remote_dir: str) -> Dict[str, List[str]]:
+        """Sube lo que falta o difiere en remote_dir
+
+        Devuelve {'transferred', 'skipped', 'failed'} (nombres de archivo).
+        """
+        self.ensure_dir(remote_dir)
+        remote = self.listing(remote_dir) or {}
+        pairs, skipped, check = [], [], []
+        for local in local_files:
+            info = local.stat()
+            pair = (local, f"{remote_dir}/{local.name}")
+            state = _compare(info.st_size, info.st_mtime, remote.get(local.name))
+            if state == 'same':
+                skipped.append(local.name)
+            elif state == 'check':
+                check.append(pair)
+            else:
+                pairs.append(pair)
+
+        differ = self._split_by_hash(check)
+        for local, remote_path in check:
+            if (local, remote_path) in differ:
+                pairs.append((local, remote_path))
+            else:
+                info = local.stat()
+                self._sftp().utime(remote_path, (info.st_atime, info.st_mtime))
+                skipped.append(local.name)
+
+        for local, _ in pairs:
+            self._log(f"   ⬆️ {local.name} ({local.stat().st_size / 1024 / 1024:.1f} MB)")
+        jobs = list(pairs)
+
+        report = self._sync('up', jobs, pairs)
+        report['skipped'] = skipped
+        return report
+
+    def pull(self, remote_dir: str, target: Callable[[str], Optional[Path]]) -> Dict[str, List[str]]:
+        """Baja de remote_dir lo que falta o difiere localmente
+
+        target(nombre) devuelve la ruta local de cada archivo remoto, o None
+        para ignorarlo. Devuelve {'transferred', 'skipped', 'failed'}.
+        """
+        remote = self.listing(remote_dir)
+        if remote is None:
+            return {'transferred': [], 'skipped': [], 'failed': [], 'missing_dir': True}
+
+        pairs, skipped, check = [], [], []
+        for name, (size, mtime) in sorted(remote.items()):
+            local = target(name)
+            if local is None:
+                continue
+            pair = (local, f"{remote_dir}/{name}")
+            state = _compare(local.stat().st_size, local.stat().st_mtime, (size, mtime)) if local.exists() else 'differ'
+            if state == 'same':
+                skipped.append(name)
+            elif state == 'check':
+                check.append(pair)
+            else:
+                pairs.append(pair)
+
+        differ = self._split_by_hash(check)
+        for local, remote_path in check:
+            if (local, remote_path) in differ:
+                pairs.append((local, remote_path))
+            else:
+                mtime = remote[remote_path.rpartition('/')[2]][1]
+                os.utime(local, (mtime, mtime))
+                skipped.append(local.name)
+
+        for _, remote_path in pairs:
+            self._log(f"   ⬇️ {remote_path.rpartition('/')[2]}")
+        jobs = [(remote_path, local, remote[remote_path.rpartition('/')[2]][1]) for local, remote_path in pairs]
+
+        report = self._sync('down', jobs, pairs)
+        report['skipped'] = skipped
+        return report
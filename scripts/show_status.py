@@ -10,6 +10,7 @@ import sys
 
 sys.path.insert(0, str(Path(__file__).parent))
 from state_manager import load_state
+from manifest_index import get_playlist_counts, rebuild
 
 BASE_DIR = Path("c:/Users/paparinots/Documents/Kabbalah")
 TRANSCRIPTS_DIR = BASE_DIR / "transcripciones"
@@ -23,28 +24,13 @@ def count_files(folder: Path, pattern: str) -> int:
     return len(list(folder.glob(pattern)))
 
 def get_actual_counts(playlist: str) -> dict:
-    """Get actual file counts from filesystem"""
-    transcript_folder = TRANSCRIPTS_DIR / playlist
-    processed_folder = PROCESSED_DIR / playlist
-    audio_folder = AUDIOS_DIR / playlist
-    
-    # Count transcriptions (subtitles from YouTube or Whisper)
-    subtitles_count = 0
-    if transcript_folder.exists():
-        json_files = list(transcript_folder.glob("*.json")) + list(transcript_folder.glob("*.json3"))
-        # Exclude error files and extracted files
-        subtitles_count = len([f for f in json_files if not any(x in f.name for x in ['ERROR', 'NO_SUBS', '_extracted'])])
-    
-    # Count audios (MP3s)
-    audios_count = count_files(audio_folder, "*.mp3")
-    
-    # Count processed files
-    processed_count = count_files(processed_folder, "*_extracted.json")
-    
+    """Get actual file counts from the manifest index (sin re-escanear el disco)"""
+    counts = get_playlist_counts(playlist)
     return {
-        'subtitles': subtitles_count,
-        'audios': audios_count,
-        'processed': processed_count
+        'subtitles': counts['subtitles'],
+        'audios': counts['audios'],
+        'audio_bytes': counts['audio_bytes'],
+        'processed': counts['processed']
     }
 
 def show_status():
@@ -113,13 +99,8 @@ def show_status():
             print(f"[CLEAN] Limpieza completada: MP3s eliminados")
         elif actual['audios'] > 0:
             # Calculate space
-            audio_folder = AUDIOS_DIR / playlist
-            if audio_folder.exists():
-                mp3_files = list(audio_folder.glob("*.mp3"))
-                if mp3_files:
-                    total_size = sum(f.stat().st_size for f in mp3_files)
-                    size_gb = total_size / (1024 * 1024 * 1024)
-                    print(f"\n[SPACE] MP3s ocupan: {size_gb:.2f} GB")
+            size_gb = actual['audio_bytes'] / (1024 * 1024 * 1024)
+            print(f"\n[SPACE] MP3s ocupan: {size_gb:.2f} GB")
         
         # Last updated
         if last_updated:
@@ -152,4 +133,7 @@ def show_status():
     print()
 
 if __name__ == "__main__":
+    if "--rescan" in sys.argv:
+        # Re-escanear el disco si algo se movió fuera del pipeline
+        rebuild()
     show_status()
@@ -0,0 +1,203 @@
+"""
+Stage Queue - Cola de eventos entre etapas del pipeline
+
+Antes la extracción IA se enteraba de una transcripción nueva re-ejecutando
+extract_content_ai.py sobre cada playlist cada 120 s (glob completo de la
+carpeta en cada vuelta). Ahora cada etapa que termina un archivo publica un
+evento y el consumidor lo toma en menos de un segundo:
+
+    subtítulos / Whisper / sync remoto --enqueue('extract', ...)--> extract_content_ai.py --follow
+
+- SQLite en modo WAL (stage_queue.sqlite): funciona entre procesos y
+  sobrevive a reinicios
+- Un evento por (etapa, playlist, stem): publicar dos veces no duplica el
+  trabajo. Cada publicación sube "generation": si el evento ya estaba hecho
+  vuelve a quedar pendiente, y si estaba tomado, complete() lo deja
+  pendiente otra vez en vez de darlo por hecho (llegó una versión nueva
+  mientras se procesaba la anterior)
+- claim() toma eventos con un "lease": si el consumidor muere, el evento
+  vuelve a estar disponible al vencer LEASE_S
+- Los errores se reintentan hasta MAX_ATTEMPTS
+
+Uso:
+    import stage_queue
+    stage_queue.enqueue(stage_queue.EXTRACT, 'secretos_zohar', '001_Clase')
+    events = stage_queue.claim_batch(stage_queue.EXTRACT, limit=4, timeout=30)
+    stage_queue.complete(event['id'])               # o complete(id, error="...")
+
+    python scripts/stage_queue.py                  # pendientes por etapa
+"""
+
+import os
+import time
+import sqlite3
+import threading
+import argparse
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+STAGE_QUEUE_DB = Path(os.getenv("STAGE_QUEUE_DB", BASE_DIR / "stage_queue.sqlite"))
+
+EXTRACT = 'extract'
+POLL_S = 0.5              # Consulta indexada, no un escaneo de carpetas
+LEASE_S = 30 * 60         # Una extracción larga con Ollama puede tardar varios minutos
+MAX_ATTEMPTS = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    stage TEXT NOT NULL,
+    playlist TEXT NOT NULL,
+    stem TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    claimed_at REAL,
+    done_at REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    generation INTEGER NOT NULL DEFAULT 0,
+    claimed_generation INTEGER,
+    UNIQUE (stage, playlist, stem)
+);
+CREATE INDEX IF NOT EXISTS events_pending ON events (stage, done_at, id);
+"""
+
+_local = threading.local()
+
+def _connect() -> sqlite3.Connection:
+    conn = getattr(_local, 'conn', None)
+    if conn is None or _local.pid != os.getpid():
+        STAGE_QUEUE_DB.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(STAGE_QUEUE_DB), timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        columns = {row['name'] for row in conn.execute("PRAGMA table_info(events)")}
+        for column, ddl in (('generation', "INTEGER NOT NULL DEFAULT 0"), ('claimed_generation', "INTEGER")):
+            if column not in columns:
+                conn.execute(f"ALTER TABLE events ADD COLUMN {column} {ddl}")
+        _local.conn = conn
+        _local.pid = os.getpid()
+    return conn
+
+def enqueue(stage: str, playlist: str, stem: str):
+    """Publica que (playlist, stem) está listo para `stage`
+
+    Si el evento ya existía sube su generation: hecho -> pendiente otra vez;
+    pendiente o tomado -> sigue igual y complete() decide (ver arriba).
+    """
+    _connect().execute(
+        "INSERT INTO events (stage, playlist, stem, created_at) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT (stage, playlist, stem) DO UPDATE SET "
+        "generation = events.generation + 1, created_at = excluded.created_at, "
+        "done_at = NULL, attempts = 0, error = NULL, "
+        "claimed_at = CASE WHEN events.done_at IS NULL THEN events.claimed_at ELSE NULL END",
+        (stage, playlist, stem, time.time())
+    )
+
+def enqueue_many(stage: str, items: List[tuple]) -> int:
+    """enqueue() de [(playlist, stem)] en una sola transacción"""
+    conn = _connect()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for playlist, stem in items:
+            enqueue(stage, playlist, stem)
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return len(items)
+
+def _claim(stage: str, limit: int, same_playlist: bool) -> List[Dict[str, Any]]:
+    conn = _connect()
+    now = time.time()
+    available = ("stage = ? AND done_at IS NULL AND (claimed_at IS NULL OR claimed_at < ?)")
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        params = [stage, now - LEASE_S]
+        query = f"SELECT * FROM events WHERE {available}"
+        if same_playlist:
+            first = conn.execute(f"SELECT playlist FROM events WHERE {available} ORDER BY id LIMIT 1",
+                                 params).fetchone()
+            if first is None:
+                conn.execute("COMMIT")
+                return []
+            query += " AND playlist = ?"
+            params.append(first['playlist'])
+        rows = [dict(row, claimed_at=now, claimed_generation=row['generation'])
+                for row in conn.execute(query + " ORDER BY id LIMIT ?", (*params, limit))]
+        conn.executemany("UPDATE events SET claimed_at = ?, claimed_generation = generation WHERE id = ?",
+                         [(now, row['id']) for row in rows])
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return rows
+
+def claim_batch(stage: str, limit: int = 1, timeout: float = 0.0,
+                same_playlist: bool = True) -> List[Dict[str, Any]]:
+    """Toma hasta `limit` eventos pendientes (de una misma playlist por defecto)
+
+    Espera hasta `timeout` segundos a que llegue alguno; [] si no hubo.
+    """
+    deadline = time.time() + timeout
+    while True:
+        rows = _claim(stage, limit, same_playlist)
+        if rows or time.time() >= deadline:
+            return rows
+        time.sleep(POLL_S)
+
+def claim(stage: str, timeout: float = 0.0) -> Optional[Dict[str, Any]]:
+    rows = claim_batch(stage, 1, timeout)
+    return rows[0] if rows else None
+
+def complete(event_id: int, error: Optional[str] = None):
+    """Marca el evento como hecho; con error se reintenta hasta MAX_ATTEMPTS
+
+    Si se re-publicó mientras estaba tomado (generation > claimed_generation)
+    queda pendiente de nuevo, sin contar el intento.
+    """
+    conn = _connect()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        republished = conn.execute(
+            "UPDATE events SET claimed_at = NULL, attempts = 0, error = NULL, done_at = NULL "
+            "WHERE id = ? AND generation > COALESCE(claimed_generation, generation)", (event_id,)
+        ).rowcount
+        if not republished and error is None:
+            conn.execute("UPDATE events SET done_at = ?, error = NULL WHERE id = ?", (time.time(), event_id))
+        elif not republished:
+            conn.execute(
+                "UPDATE events SET attempts = attempts + 1, error = ?, claimed_at = NULL, "
+                "done_at = CASE WHEN attempts + 1 >= ? THEN ? ELSE NULL END WHERE id = ?",
+                (error[:500], MAX_ATTEMPTS, time.time(), event_id)
+            )
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+def pending_counts() -> Dict[str, int]:
+    """{etapa: eventos pendientes (incluye los tomados)}"""
+    return {row['stage']: row['n'] for row in _connect().execute(
+        "SELECT stage, COUNT(*) AS n FROM events WHERE done_at IS NULL GROUP BY stage")}
+
+def main():
+    parser = argparse.ArgumentParser(description='Cola de eventos entre etapas')
+    parser.add_argument('--failed', action='store_true', help='Listar eventos que agotaron los reintentos')
+    args = parser.parse_args()
+
+    counts = pending_counts()
+    print(f"{'ETAPA':<12} {'PENDIENTES':>10}")
+    for stage, n in sorted(counts.items()):
+        print(f"{stage:<12} {n:>10}")
+    if not counts:
+        print("(sin eventos pendientes)")
+
+    if args.failed:
+        for row in _connect().execute("SELECT * FROM events WHERE error IS NOT NULL AND done_at IS NOT NULL"):
+            print(f"❌ {row['stage']} {row['playlist']}/{row['stem']}: {row['error'][:80]}")
+
+if __name__ == "__main__":
+    main()
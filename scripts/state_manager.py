@@ -1,17 +1,31 @@
 """
 State Manager for Kabbalah Content Processing
 Manages the global processing state across all playlists
+
+El estado vive en SQLite (modo WAL) junto a processing_state.json:
+- Una fila por playlist, por estadística y por item (pending/completed),
+  así cada actualización toca sólo sus filas en vez de reescribir todo el JSON
+- Cada función es una transacción (BEGIN IMMEDIATE): varios procesos pueden
+  actualizar a la vez sin perder cambios
+- transaction() agrupa varias llamadas en una sola transacción (batch);
+  mark_completed_many / add_pending_many para listas de items
+- load_state() devuelve el mismo dict de siempre (compatible con los scripts
+  de status); el JSON existente se importa la primera vez
 """
 
 import sys
 import os
 import json
+import sqlite3
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional
 
 
 STATE_FILE = Path("c:/Users/paparinots/Documents/Kabbalah/processing_state.json")
+STATE_DB = STATE_FILE.with_suffix(".sqlite")
 
 def init_state() -> Dict:
     """Initialize empty state structure"""
@@ -60,77 +74,262 @@ def init_state() -> Dict:
         }
     }
 
-def load_state() -> Dict:
-    """Load state from file, create if doesn't exist"""
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS playlists (
+    playlist TEXT PRIMARY KEY,
+    phase TEXT NOT NULL,
+    cleanup INTEGER NOT NULL DEFAULT 0,
+    position INTEGER NOT NULL,
+    last_updated TEXT
+);
+CREATE TABLE IF NOT EXISTS stats (
+    playlist TEXT NOT NULL,
+    name TEXT NOT NULL,
+    value,
+    PRIMARY KEY (playlist, name)
+);
+CREATE TABLE IF NOT EXISTS items (
+    playlist TEXT NOT NULL,
+    category TEXT NOT NULL,
+    item_id NOT NULL,
+    status TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    PRIMARY KEY (playlist, category, item_id)
+);
+CREATE INDEX IF NOT EXISTS items_status ON items (playlist, category, status, seq);
+-- MAX(seq) en cada cambio de estado y ORDER BY seq en load_state(), sin escanear la tabla
+CREATE INDEX IF NOT EXISTS items_seq ON items (seq);
+"""
+
+# Una conexión por hilo; depth > 0 cuando hay una transacción abierta
+_local = threading.local()
+
+def _connect() -> sqlite3.Connection:
+    conn = getattr(_local, 'conn', None)
+    if conn is None or _local.pid != os.getpid():
+        # Nunca reutilizar una conexión heredada por fork
+        STATE_DB.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(STATE_DB), timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        _local.conn = conn
+        _local.pid = os.getpid()
+        _local.depth = 0
+        _bootstrap(conn)
+    return conn
+
+def _bootstrap(conn: sqlite3.Connection):
+    """Primera vez: importar processing_state.json (o el estado inicial)"""
+    if conn.execute("SELECT 1 FROM playlists LIMIT 1").fetchone():
+        return
+    state = None
     if STATE_FILE.exists():
         try:
             with open(STATE_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
+                state = json.load(f)
+            print(f"📥 Importando estado desde {STATE_FILE.name}")
         except Exception as e:
             print(f"⚠️ Error loading state: {e}")
             print("Creating new state file...")
-    
-    state = init_state()
-    save_state(state)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Otro proceso pudo importarlo mientras esperábamos el lock
+        if not conn.execute("SELECT 1 FROM playlists LIMIT 1").fetchone():
+            _write_state(conn, state or init_state())
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+@contextmanager
+def transaction():
+    """Agrupa varias actualizaciones en una sola transacción
+
+    with transaction():
+        mark_completed(playlist, idx, 'ai')
+        increment_stat(playlist, 'ai_processed', 1)
+    """
+    conn = _connect()
+    if _local.depth:
+        _local.depth += 1
+        try:
+            yield conn
+        finally:
+            _local.depth -= 1
+        return
+
+    conn.execute("BEGIN IMMEDIATE")
+    _local.depth = 1
+    try:
+        yield conn
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        _local.depth = 0
+
+def _now() -> str:
+    return datetime.now().isoformat()
+
+def _touch(conn: sqlite3.Connection, playlist: str, **fields):
+    """Crea la fila de la playlist si no existe y actualiza last_updated (+ campos)"""
+    conn.execute(
+        "INSERT OR IGNORE INTO playlists (playlist, phase, position) "
+        "VALUES (?, 'not_started', (SELECT COALESCE(MAX(position), -1) + 1 FROM playlists))",
+        (playlist,)
+    )
+    fields['last_updated'] = _now()
+    assignments = ", ".join(f"{name} = ?" for name in fields)
+    conn.execute(f"UPDATE playlists SET {assignments} WHERE playlist = ?", (*fields.values(), playlist))
+
+def _next_seq(conn: sqlite3.Connection) -> int:
+    return conn.execute("SELECT COALESCE(MAX(seq), 0) + 1 FROM items").fetchone()[0]
+
+def _set_item(conn: sqlite3.Connection, playlist: str, item_id, category: str, status: str, only_new: bool):
+    """Inserta el item con `status`; si existe lo mueve (salvo only_new)"""
+    row = conn.execute(
+        "SELECT status FROM items WHERE playlist = ? AND category = ? AND item_id = ?",
+        (playlist, category, item_id)
+    ).fetchone()
+    if row is None:
+        conn.execute(
+            "INSERT INTO items (playlist, category, item_id, status, seq) VALUES (?, ?, ?, ?, ?)",
+            (playlist, category, item_id, status, _next_seq(conn))
+        )
+    elif row[0] != status and not only_new:
+        conn.execute(
+            "UPDATE items SET status = ?, seq = ? WHERE playlist = ? AND category = ? AND item_id = ?",
+            (status, _next_seq(conn), playlist, category, item_id)
+        )
+
+def _write_state(conn: sqlite3.Connection, state: Dict):
+    """Reemplaza todo el contenido por el dict `state` (dentro de una transacción)"""
+    conn.execute("DELETE FROM playlists")
+    conn.execute("DELETE FROM stats")
+    conn.execute("DELETE FROM items")
+    seq = 0
+    for position, (playlist, data) in enumerate(state.items()):
+        completed = data.get("completed", {})
+        conn.execute(
+            "INSERT INTO playlists (playlist, phase, cleanup, position, last_updated) VALUES (?, ?, ?, ?, ?)",
+            (playlist, data.get("phase", "not_started"), int(bool(completed.get("cleanup"))),
+             position, data.get("last_updated"))
+        )
+        conn.executemany(
+            "INSERT INTO stats (playlist, name, value) VALUES (?, ?, ?)",
+            [(playlist, name, value) for name, value in data.get("stats", {}).items()]
+        )
+        for status, lists in (("pending", data.get("pending", {})), ("completed", completed)):
+            for category, items in lists.items():
+                if not isinstance(items, list):
+                    continue
+                for item_id in items:
+                    seq += 1
+                    conn.execute(
+                        "INSERT OR REPLACE INTO items (playlist, category, item_id, status, seq) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (playlist, category, item_id, status, seq)
+                    )
+
+def load_state() -> Dict:
+    """Load state (mismo formato que processing_state.json)"""
+    conn = _connect()
+    state: Dict = {}
+    for playlist, phase, cleanup, last_updated in conn.execute(
+            "SELECT playlist, phase, cleanup, last_updated FROM playlists ORDER BY position"):
+        state[playlist] = {
+            "phase": phase,
+            "stats": {},
+            "pending": {"whisper": [], "ai": []},
+            "completed": {"whisper": [], "ai": [], "cleanup": bool(cleanup)},
+            "last_updated": last_updated
+        }
+    for playlist, name, value in conn.execute("SELECT playlist, name, value FROM stats ORDER BY rowid"):
+        if playlist in state:
+            state[playlist]["stats"][name] = bool(value) if name == "verified" else value
+    for playlist, category, item_id, status in conn.execute(
+            "SELECT playlist, category, item_id, status FROM items ORDER BY seq"):
+        if playlist in state:
+            state[playlist][status].setdefault(category, []).append(item_id)
     return state
 
 def save_state(state: Dict):
-    """Save state to file"""
-    with open(STATE_FILE, 'w', encoding='utf-8') as f:
-        json.dump(state, f, indent=2, ensure_ascii=False)
+    """Save state (reemplaza el estado completo en una transacción)"""
+    with transaction() as conn:
+        _write_state(conn, state)
+
+def export_json(path: Optional[Path] = None) -> Path:
+    """Escribe un snapshot JSON del estado (para inspección/backup)"""
+    path = path or STATE_FILE
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(load_state(), f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+    return path
 
 def update_phase(playlist: str, new_phase: str):
     """Update the current phase for a playlist"""
-    state = load_state()
-    state[playlist]["phase"] = new_phase
-    state[playlist]["last_updated"] = datetime.now().isoformat()
-    save_state(state)
+    with transaction() as conn:
+        _touch(conn, playlist, phase=new_phase)
     print(f"✅ {playlist}: fase actualizada a '{new_phase}'")
 
 def increment_stat(playlist: str, stat_name: str, value: int = 1):
     """Increment a stat counter"""
-    state = load_state()
-    state[playlist]["stats"][stat_name] += value
-    state[playlist]["last_updated"] = datetime.now().isoformat()
-    save_state(state)
+    with transaction() as conn:
+        conn.execute(
+            "INSERT INTO stats (playlist, name, value) VALUES (?, ?, ?) "
+            "ON CONFLICT (playlist, name) DO UPDATE SET value = value + excluded.value",
+            (playlist, stat_name, value)
+        )
+        _touch(conn, playlist)
 
 def mark_completed(playlist: str, item_id: str, category: str):
     """Mark an item as completed (whisper or ai)"""
-    state = load_state()
-    
-    if item_id not in state[playlist]["completed"][category]:
-        state[playlist]["completed"][category].append(item_id)
-    
-    # Remove from pending if exists
-    if item_id in state[playlist]["pending"][category]:
-        state[playlist]["pending"][category].remove(item_id)
-    
-    state[playlist]["last_updated"] = datetime.now().isoformat()
-    save_state(state)
+    mark_completed_many(playlist, [item_id], category)
+
+def mark_completed_many(playlist: str, item_ids: Iterable[str], category: str):
+    """Mark several items as completed in one transaction"""
+    with transaction() as conn:
+        for item_id in item_ids:
+            _set_item(conn, playlist, item_id, category, "completed", only_new=False)
+        _touch(conn, playlist)
 
 def add_pending(playlist: str, item_id: str, category: str):
     """Add an item to pending list"""
-    state = load_state()
-    
-    if item_id not in state[playlist]["pending"][category]:
-        state[playlist]["pending"][category].append(item_id)
-    
-    state[playlist]["last_updated"] = datetime.now().isoformat()
-    save_state(state)
+    add_pending_many(playlist, [item_id], category)
+
+def add_pending_many(playlist: str, item_ids: Iterable[str], category: str):
+    """Add several items to the pending list in one transaction"""
+    with transaction() as conn:
+        for item_id in item_ids:
+            # Igual que antes: un item pendiente no se duplica
+            _set_item(conn, playlist, item_id, category, "pending", only_new=True)
+        _touch(conn, playlist)
 
 def mark_verified(playlist: str, verified: bool = True):
     """Mark playlist as verified"""
-    state = load_state()
-    state[playlist]["stats"]["verified"] = verified
-    state[playlist]["last_updated"] = datetime.now().isoformat()
-    save_state(state)
+    with transaction() as conn:
+        conn.execute(
+            "INSERT INTO stats (playlist, name, value) VALUES (?, 'verified', ?) "
+            "ON CONFLICT (playlist, name) DO UPDATE SET value = excluded.value",
+            (playlist, int(verified))
+        )
+        _touch(conn, playlist)
 
 def mark_cleanup_done(playlist: str):
     """Mark cleanup as completed"""
-    state = load_state()
-    state[playlist]["completed"]["cleanup"] = True
-    state[playlist]["last_updated"] = datetime.now().isoformat()
-    save_state(state)
+    with transaction() as conn:
+        _touch(conn, playlist, cleanup=1)
+
+def is_completed(playlist: str, item_id: str, category: str) -> bool:
+    """Consulta indexada de un item (sin cargar todo el estado)"""
+    row = _connect().execute(
+        "SELECT 1 FROM items WHERE playlist = ? AND category = ? AND item_id = ? AND status = 'completed'",
+        (playlist, category, item_id)
+    ).fetchone()
+    return row is not None
 
 def get_playlist_state(playlist: str) -> Dict:
     """Get state for a specific playlist"""
@@ -139,14 +338,16 @@ def get_playlist_state(playlist: str) -> Dict:
 
 def get_current_phase(playlist: str) -> str:
     """Get current phase for a playlist"""
-    state = load_state()
-    return state.get(playlist, {}).get("phase", "unknown")
+    row = _connect().execute("SELECT phase FROM playlists WHERE playlist = ?", (playlist,)).fetchone()
+    return row[0] if row else "unknown"
 
 if __name__ == "__main__":
     # Test/initialize state
     print("Inicializando estado...")
     state = load_state()
-    print(f"✅ Estado cargado desde: {STATE_FILE}")
+    print(f"✅ Estado cargado desde: {STATE_DB}")
     print(f"\nPlaylists configuradas:")
     for playlist, data in state.items():
         print(f"  - {playlist}: {data['phase']}")
+    if "--export" in sys.argv:
+        print(f"\n💾 Snapshot JSON: {export_json()}")
@@ -0,0 +1,120 @@
+"""
+Streaming Transcription - Escritura incremental y reanudación
+
+En vez de escribir el SRT/JSON sólo al final (y perder todo si el proceso
+muere en el minuto 80 de una clase de 90), el audio se transcribe en
+bloques consecutivos y cada segmento terminado se agrega de inmediato a
+{stem}.partial.jsonl (una línea JSON por segmento, con flush + fsync).
+
+- Reanudación: si ya existe el .partial.jsonl, se continúa desde el fin
+  del último segmento guardado.
+- Bordes de bloque: el último segmento de cada bloque puede estar cortado,
+  así que se descarta y el siguiente bloque empieza donde terminó el
+  penúltimo (corte natural entre frases).
+- Al terminar se escriben el .srt y el .json finales y se borra el parcial.
+
+Mientras tanto, la extracción IA puede leer el prefijo terminado con
+read_partial() (ver --include-partial en extract_content_ai.py).
+"""
+
+import os
+import json
+from pathlib import Path
+from typing import Any, Dict, List
+
+from transcription_backends import write_transcript_files
+
+SAMPLE_RATE = 16000
+CHUNK_S = 300.0   # Bloques de 5 minutos
+
+def partial_path(json_path: Path) -> Path:
+    """{stem}.json -> {stem}.partial.jsonl"""
+    return json_path.with_name(json_path.stem + ".partial.jsonl")
+
+def read_partial(path: Path) -> List[Dict[str, Any]]:
+    """Lee los segmentos ya terminados (ignora una última línea truncada)"""
+    segments = []
+    if not path.exists():
+        return segments
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                segments.append(json.loads(line))
+            except json.JSONDecodeError:
+                break  # Línea a medio escribir por un crash
+    return segments
+
+def _append_segments(path: Path, segments: List[Dict[str, Any]]):
+    with open(path, 'a', encoding='utf-8') as f:
+        for seg in segments:
+            f.write(json.dumps(seg, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+def transcribe_streaming(engine, audio_path, srt_path: Path, json_path: Path,
+                         language: str = 'es', chunk_s: float = CHUNK_S) -> Dict[str, Any]:
+    """Transcribe por bloques escribiendo cada segmento al parcial; reanuda si existe
+
+    `engine` es cualquier backend de transcription_backends (acepta arrays).
+    Devuelve el resultado completo (formato whisper.transcribe()) con
+    result["resumed_from"] = segundo desde el que se reanudó.
+    """
+    from vad_slicing import load_audio
+
+    partial = partial_path(json_path)
+    segments = read_partial(partial)
+    if segments:
+        # Reescribir sin la posible línea truncada antes de seguir agregando
+        partial.unlink()
+        _append_segments(partial, segments)
+
+    resumed_from = segments[-1]["end"] if segments else 0.0
+    if resumed_from:
+        print(f"  ⏩ Reanudando desde {resumed_from / 60:.1f} min ({len(segments)} segmentos)", flush=True)
+
+    audio = load_audio(audio_path)
+    duration = len(audio) / SAMPLE_RATE
+    offset = resumed_from
+    detected_language = language
+
+    while offset < duration - 0.5:
+        end = min(offset + chunk_s, duration)
+        chunk = audio[int(offset * SAMPLE_RATE):int(end * SAMPLE_RATE)]
+        result = engine.transcribe(chunk, language=language)
+        detected_language = result.get("language", detected_language)
+
+        chunk_segments = []
+        for seg in result["segments"]:
+            seg = {k: v for k, v in seg.items() if k != "tokens"}
+            seg["start"] += offset
+            seg["end"] = min(seg["end"] + offset, end)
+            chunk_segments.append(seg)
+
+        # El último segmento puede estar cortado por el borde del bloque
+        if end < duration and len(chunk_segments) > 1:
+            chunk_segments = chunk_segments[:-1]
+            next_offset = chunk_segments[-1]["end"]
+        else:
+            next_offset = end
+        if next_offset <= offset:
+            next_offset = end
+
+        for seg in chunk_segments:
+            seg["id"] = len(segments)
+            segments.append(seg)
+        _append_segments(partial, chunk_segments)
+        print(f"  💾 Parcial: {next_offset / 60:.1f}/{duration / 60:.1f} min", flush=True)
+        offset = next_offset
+
+    final = {
+        "text": "".join(seg["text"] for seg in segments),
+        "segments": segments,
+        "language": detected_language,
+    }
+    write_transcript_files(final, srt_path, json_path)
+    partial.unlink(missing_ok=True)
+    final["resumed_from"] = resumed_from
+    return final
@@ -0,0 +1,310 @@
+"""
+Subtitle Fetcher - Descarga concurrente de subtítulos con rate limiting adaptativo
+
+Reemplaza las pausas fijas (10-15 s aleatorios, 60 s cada 5 videos, lotes de
+3 cada 10 minutos) por:
+- Token bucket por host: como máximo `rate` peticiones/segundo hacia YouTube
+- AIMD: cada éxito sube la tasa un poco (+RATE_STEP); cada 429/bloqueo la
+  divide a la mitad y pausa el host (cooldown exponencial)
+- Pocas descargas en vuelo (asyncio + threads, CONCURRENCY) para acercarse
+  a la tasa permitida sin ráfagas
+- Los videos bloqueados vuelven a la cola (hasta MAX_RETRIES)
+
+Lo usan download_slow_safe.py, download_all_subtitles.py, download_with_vpn.py
+y auto_download.py. También se puede usar directo:
+
+    python scripts/subtitle_fetcher.py --playlist-file secretos_del_zohar_videos.json
+    python scripts/subtitle_fetcher.py --progress download_progress.json --playlists arbol_vida tefila
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from pathlib import Path
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+YOUTUBE_HOST = "www.youtube.com"
+CONCURRENCY = 3
+INITIAL_RATE = 0.5       # peticiones/segundo al empezar
+MIN_RATE = 1 / 60        # nunca menos de 1 por minuto
+MAX_RATE = 2.0
+RATE_STEP = 0.05         # incremento aditivo por éxito
+BLOCK_COOLDOWN = 30.0    # pausa tras el primer bloqueo (se duplica si se repite)
+MAX_COOLDOWN = 600.0
+MAX_RETRIES = 4
+
+BLOCK_MARKERS = ('429', 'too many requests', 'blocking requests', 'requestblocked', 'ipblocked',
+                 'sign in to confirm')
+
+class RateLimited(Exception):
+    """YouTube respondió 429 o bloqueó la IP"""
+
+def is_block_error(error: BaseException) -> bool:
+    """True si la excepción indica throttling/bloqueo (no un video sin subtítulos)"""
+    if isinstance(error, RateLimited):
+        return True
+    text = f"{type(error).__name__} {error}".lower()
+    return any(marker in text for marker in BLOCK_MARKERS)
+
+class AIMDRateLimiter:
+    """Token bucket cuya tasa se ajusta con AIMD según los bloqueos"""
+
+    def __init__(self, rate: float = INITIAL_RATE, min_rate: float = MIN_RATE,
+                 max_rate: float = MAX_RATE, step: float = RATE_STEP, capacity: float = 2.0):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.step = step
+        self.capacity = capacity
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.consecutive_blocks = 0
+        self.epoch = 0           # cambia en cada reducción de tasa
+        self.blocks = 0
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> int:
+        """Espera un token; devuelve la época con la que salió la petición"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return self.epoch
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def on_success(self):
+        """Aumento aditivo"""
+        self.consecutive_blocks = 0
+        self.rate = min(self.max_rate, self.rate + self.step)
+
+    def on_block(self, epoch: int) -> bool:
+        """Disminución multiplicativa + cooldown
+
+        Las peticiones que salieron antes de la última reducción no vuelven a
+        reducir (varias en vuelo suelen fallar juntas por el mismo bloqueo).
+        """
+        self.blocks += 1
+        if epoch != self.epoch:
+            return False
+        self.epoch += 1
+        self.consecutive_blocks += 1
+        self.rate = max(self.min_rate, self.rate / 2)
+        cooldown = min(MAX_COOLDOWN, BLOCK_COOLDOWN * 2 ** (self.consecutive_blocks - 1))
+        self.blocked_until = time.monotonic() + cooldown * random.uniform(1.0, 1.2)
+        self.tokens = 0.0
+        return True
+
+# Un limitador por host (compartido por todas las descargas del proceso)
+_limiters: Dict[str, AIMDRateLimiter] = {}
+
+def limiter_for(host: str = YOUTUBE_HOST, **kwargs) -> AIMDRateLimiter:
+    if host not in _limiters:
+        _limiters[host] = AIMDRateLimiter(**kwargs)
+    return _limiters[host]
+
+async def _fetch_all_async(jobs: List[Any], fetch: Callable[[Any], Dict[str, Any]],
+                           limiter: AIMDRateLimiter, concurrency: int,
+                           max_retries: int) -> List[Dict[str, Any]]:
+    limiter._lock = asyncio.Lock()  # ligado al event loop actual
+    queue: asyncio.Queue = asyncio.Queue()
+    for i, job in enumerate(jobs):
+        queue.put_nowait((i, job, 0))
+    results: List[Optional[Dict[str, Any]]] = [None] * len(jobs)
+    done = 0
+    start = time.time()
+
+    async def worker():
+        nonlocal done
+        while True:
+            try:
+                i, job, attempt = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            epoch = await limiter.acquire()
+            try:
+                result = await asyncio.to_thread(fetch, job)
+            except Exception as e:
+                if is_block_error(e):
+                    if limiter.on_block(epoch):
+                        print(f"   ⚠️ Bloqueo/429: tasa -> {limiter.rate * 60:.1f}/min, "
+                              f"pausa {limiter.blocked_until - time.monotonic():.0f}s", flush=True)
+                    if attempt + 1 < max_retries:
+                        queue.put_nowait((i, job, attempt + 1))
+                        continue
+                result = {'success': False, 'error': str(e)}
+
+            if result.get('success'):
+                limiter.on_success()
+            results[i] = result
+            done += 1
+            elapsed = time.time() - start
+            print(f"   📊 {done}/{len(jobs)} | tasa {limiter.rate * 60:.1f}/min | "
+                  f"{done / elapsed * 60 if elapsed else 0:.1f} videos/min", flush=True)
+
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    return results
+
+def fetch_all(jobs: List[Any], fetch: Callable[[Any], Dict[str, Any]], host: str = YOUTUBE_HOST,
+              concurrency: int = CONCURRENCY, max_retries: int = MAX_RETRIES,
+              rate: float = INITIAL_RATE) -> List[Dict[str, Any]]:
+    """Ejecuta fetch(job) para cada job respetando el rate limit del host
+
+    fetch es síncrono (corre en threads) y devuelve un dict con 'success';
+    si lanza una excepción de bloqueo (is_block_error) el job se reintenta.
+    Devuelve los resultados en el orden de `jobs`.
+    """
+    if not jobs:
+        return []
+    limiter = limiter_for(host, rate=rate)
+    return asyncio.run(_fetch_all_async(jobs, fetch, limiter, concurrency, max_retries))
+
+# ============================================================================
+# DESCARGA CON youtube_transcript_api
+# ============================================================================
+
+def sanitize_filename(filename):
+    """Limpia un nombre de archivo de caracteres no válidos"""
+    invalid_chars = '<>:"/\\|?*'
+    for char in invalid_chars:
+        filename = filename.replace(char, '_')
+    if len(filename) > 150:
+        filename = filename[:150]
+    return filename
+
+def download_transcript(video_id: str, title: str, output_dir: str, number: int,
+                        playlist: Optional[str] = None) -> Dict[str, Any]:
+    """Descarga y guarda {número}_{título}.json/.txt; lanza la excepción si es un bloqueo"""
+    from youtube_transcript_api import YouTubeTranscriptApi
+    import manifest_index
+    import stage_queue
+
+    try:
+        transcript_list = YouTubeTranscriptApi().list(video_id)
+        transcript_obj = transcript_list.find_transcript(['es', 'es-ES', 'es-MX', 'es-419'])
+        transcript_data = [
+            {'text': s.text, 'start': s.start, 'duration': s.duration}
+            for s in transcript_obj.fetch()
+        ]
+    except Exception as e:
+        if is_block_error(e):
+            raise
+        error_file = os.path.join(output_dir, f"ERROR_{number:03d}_{video_id}.txt")
+        with open(error_file, 'w', encoding='utf-8') as f:
+            f.write(f"Video: {title}\nVideo ID: {video_id}\nError: {e}\n"
+                    f"Timestamp: {datetime.now().isoformat()}\n")
+        print(f"   ✗ {number:03d}: {str(e)[:80]}", flush=True)
+        return {'success': False, 'video_id': video_id, 'video_number': number, 'error': str(e)}
+
+    total_words = sum(len(s['text'].split()) for s in transcript_data)
+    duration_minutes = transcript_data[-1]['start'] / 60 if transcript_data else 0
+    metadata = {
+        'video_id': video_id,
+        'video_title': title,
+        'video_number': number,
+        'video_url': f'https://www.youtube.com/watch?v={video_id}',
+        'language': transcript_obj.language,
+        'language_code': transcript_obj.language_code,
+        'is_auto_generated': transcript_obj.is_generated,
+        'total_segments': len(transcript_data),
+        'total_words': total_words,
+        'duration_minutes': round(duration_minutes, 2),
+        'downloaded_at': datetime.now().isoformat()
+    }
+
+    base_filename = f"{number:03d}_{sanitize_filename(title)}"
+    with open(os.path.join(output_dir, f"{base_filename}.json"), 'w', encoding='utf-8') as f:
+        json.dump({'metadata': metadata, 'transcript': transcript_data}, f, ensure_ascii=False, indent=2)
+    with open(os.path.join(output_dir, f"{base_filename}.txt"), 'w', encoding='utf-8') as f:
+        f.write(f"{'='*70}\n{title}\n{'='*70}\n")
+        f.write(f"Video: https://www.youtube.com/watch?v={video_id}\n")
+        f.write(f"Duración: {duration_minutes:.1f} min | Palabras: {total_words:,}\n{'='*70}\n\n")
+        for segment in transcript_data:
+            timestamp = f"{int(segment['start'] // 60):02d}:{int(segment['start'] % 60):02d}"
+            f.write(f"[{timestamp}] {segment['text']}\n")
+
+    playlist = playlist or os.path.basename(os.path.normpath(output_dir))
+    manifest_index.mark_transcript(playlist, base_filename, 'youtube', video_id=video_id)
+    stage_queue.enqueue(stage_queue.EXTRACT, playlist, base_filename)
+    print(f"   ✓ {number:03d}: {len(transcript_data)} seg | {total_words:,} palabras | {duration_minutes:.1f} min",
+          flush=True)
+    return {'success': True, 'video_id': video_id, 'video_title': title, 'video_number': number,
+            'metadata': metadata}
+
+def completed_numbers(output_dir: str) -> set:
+    """Números de video con .json ya descargado"""
+    completed = set()
+    if os.path.exists(output_dir):
+        for filename in os.listdir(output_dir):
+            if filename.endswith('.json') and not filename.startswith(('_', 'ERROR')):
+                prefix = filename.split('_', 1)[0]
+                if prefix.isdigit():
+                    completed.add(int(prefix))
+    return completed
+
+def main():
+    parser = argparse.ArgumentParser(description='Descarga concurrente de subtítulos con rate limiting adaptativo')
+    parser.add_argument('--playlist-file', default=None,
+                        help='JSON con {"playlist_name", "videos": [{"id", "title"}]}')
+    parser.add_argument('--progress', default='download_progress.json',
+                        help='download_progress.json con video_ids por playlist')
+    parser.add_argument('--playlists', nargs='*', default=None, help='Playlists del progress a descargar')
+    parser.add_argument('--output-base', default='transcripciones')
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY)
+    parser.add_argument('--rate', type=float, default=INITIAL_RATE, help='Tasa inicial (peticiones/segundo)')
+    args = parser.parse_args()
+
+    # (playlist, [(número, video_id, título)])
+    sources = []
+    if args.playlist_file:
+        with open(args.playlist_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        sources.append((data['playlist_name'],
+                        [(i, v['id'], v.get('title', f"Video {i}")) for i, v in enumerate(data['videos'], 1)]))
+    else:
+        with open(args.progress, 'r', encoding='utf-8') as f:
+            progress = json.load(f)
+        for playlist in args.playlists or list(progress.keys()):
+            video_ids = progress.get(playlist, {}).get('video_ids', [])
+            sources.append((playlist, [(i, vid, f"{playlist} - Video {i}") for i, vid in enumerate(video_ids, 1)]))
+
+    jobs = []
+    for playlist, videos in sources:
+        output_dir = os.path.join(args.output_base, playlist)
+        os.makedirs(output_dir, exist_ok=True)
+        done = completed_numbers(output_dir)
+        pending = [(vid, title, output_dir, number, playlist) for number, vid, title in videos if number not in done]
+        print(f"📁 {playlist}: {len(done)} descargados, {len(pending)} pendientes")
+        jobs.extend(pending)
+
+    if not jobs:
+        print("🎉 No hay subtítulos pendientes")
+        return
+
+    print(f"\n🚀 {len(jobs)} videos | concurrencia {args.concurrency} | tasa inicial {args.rate * 60:.0f}/min\n")
+    start = time.time()
+    results = fetch_all(jobs, lambda job: download_transcript(*job), concurrency=args.concurrency, rate=args.rate)
+    ok = sum(1 for r in results if r.get('success'))
+    print(f"\n✅ {ok} descargados | ❌ {len(results) - ok} fallidos | ⏱️ {(time.time() - start) / 60:.1f} min "
+          f"| bloqueos: {limiter_for().blocks}")
+
+if __name__ == "__main__":
+    main()
@@ -1,107 +1,147 @@
 """
 Complete Audio-to-SRT Transcription Pipeline
-- Transcribes MP3 files to SRT using Whisper
+- Transcribes audio files (MP3, or 16 kHz opus/flac/wav from download_audio's ASR mode) to SRT
+  using Whisper (or faster-whisper, see --backend)
 - Saves SRTs to transcripciones/{playlist}/ folder  
 - Deletes MP3 after successful transcription
-- Triggers AI processing on new SRTs
+- Triggers AI processing on new SRTs (event in stage_queue, picked up by
+  extract_content_ai.py --follow within seconds)
+
+Con --workers N (por defecto: núcleos / threads por worker) se usa un pool
+de procesos: cada worker carga el modelo UNA vez y va tomando MP3s de la
+cola compartida.
 
 Requirements:
-  pip install openai-whisper
+  pip install openai-whisper     (o: pip install faster-whisper)
 """
 
 import os
 import sys
+import time
 import argparse
+import multiprocessing
 from pathlib import Path
-from datetime import timedelta
 import subprocess
 
+sys.path.insert(0, str(Path(__file__).parent))
+from transcription_backends import AUDIO_EXTENSIONS, BACKENDS, backend_available, load_backend, write_transcript_files
+import manifest_index
+import stage_queue
+
 # Configuration
 BASE_DIR = Path("c:/Users/paparinots/Documents/Kabbalah")
 AUDIO_DIR = BASE_DIR / "audios"
 TRANSCRIPTS_DIR = BASE_DIR / "transcripciones"
 
-def format_timestamp(seconds):
-    """Convert seconds to SRT timestamp format (HH:MM:SS,mmm)"""
-    td = timedelta(seconds=seconds)
-    hours = int(td.total_seconds() // 3600)
-    minutes = int((td.total_seconds() % 3600) // 60)
-    secs = int(td.total_seconds() % 60)
-    millis = int((td.total_seconds() % 1) * 1000)
-    return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
-
-def transcribe_to_srt(audio_path, output_path, model_name="medium", language="es"):
+def transcribe_to_srt(audio_path, output_path, model_name="medium", language="es", backend="whisper"):
     """Transcribe audio file to SRT format"""
-    try:
-        import whisper
-    except ImportError:
-        print("❌ Whisper no está instalado. Ejecuta:")
-        print("   pip install openai-whisper")
+    if not backend_available(backend):
+        print(f"❌ Backend '{backend}' no está instalado. Ejecuta:")
+        print(f"   pip install {'openai-whisper' if backend == 'whisper' else backend}")
         return False
     
-    print(f"  📥 Cargando modelo '{model_name}'...")
-    model = whisper.load_model(model_name)
+    print(f"  📥 Cargando modelo '{model_name}' ({backend})...")
+    engine = load_backend(backend, model_name)
     
     print(f"  🎙️ Transcribiendo...")
-    result = model.transcribe(
-        str(audio_path),
-        language=language,
-        task="transcribe",
-        verbose=False
-    )
-    
-    # Generate SRT content
-    srt_content = []
-    for i, segment in enumerate(result["segments"], 1):
-        start = format_timestamp(segment["start"])
-        end = format_timestamp(segment["end"])
-        text = segment["text"].strip()
-        
-        srt_content.append(f"{i}")
-        srt_content.append(f"{start} --> {end}")
-        srt_content.append(text)
-        srt_content.append("")
-    
-    # Write SRT file
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write('\n'.join(srt_content))
-    
-    # Also save as JSON for AI processing compatibility
-    json_path = output_path.with_suffix('.json')
-    import json
-    json_content = {
-        "text": result["text"],
-        "segments": result["segments"],
-        "language": result["language"]
-    }
-    with open(json_path, 'w', encoding='utf-8') as f:
-        json.dump(json_content, f, ensure_ascii=False, indent=2)
+    result = engine.transcribe(audio_path, language=language)
+    
+    write_transcript_files(result, output_path, output_path.with_suffix('.json'))
     
     return True
 
-def trigger_ai_processing(srt_path):
-    """Trigger AI processing on a new SRT file"""
-    print(f"  🤖 Iniciando procesamiento IA...")
-    # The AI script will pick this up on next run
-    # For now we just mark it as ready
+# Modelo cargado en cada proceso worker (una sola vez por proceso)
+_worker_model = None
+_worker_language = "es"
+_worker_vad = False
+_worker_stream_chunk_s = 0.0
+
+def _init_worker(model_name, language, threads, backend="whisper", compute_type=None, vad=False,
+                 stream_chunk_s=0.0):
+    """Inicializador del pool: carga el backend con sus threads"""
+    global _worker_model, _worker_language, _worker_vad, _worker_stream_chunk_s
+    _worker_model = load_backend(backend, model_name, threads=threads, compute_type=compute_type)
+    _worker_language = language
+    _worker_vad = vad
+    _worker_stream_chunk_s = stream_chunk_s
+    print(f"  📥 [PID {os.getpid()}] Modelo '{model_name}' ({backend}) cargado ({threads} threads)", flush=True)
+
+def _transcribe_job(job):
+    """Transcribe un MP3 en el worker actual y devuelve métricas"""
+    mp3, srt_path, json_path = job
+    start = time.time()
+    try:
+        if _worker_stream_chunk_s:
+            # Escribe {stem}.partial.jsonl a medida que avanza y reanuda si ya existe
+            from streaming_transcription import transcribe_streaming
+            result = transcribe_streaming(_worker_model, mp3, srt_path, json_path,
+                                          language=_worker_language, chunk_s=_worker_stream_chunk_s)
+            audio_seconds = (result["segments"][-1]["end"] - result["resumed_from"]) if result["segments"] else 0.0
+            return {'mp3': mp3, 'srt': srt_path, 'ok': True, 'speech_ratio': None,
+                    'elapsed': time.time() - start, 'audio_seconds': audio_seconds}
+        elif _worker_vad:
+            # Sólo regiones con voz; timestamps re-mapeados al audio original
+            from vad_slicing import transcribe_with_vad
+            result = transcribe_with_vad(_worker_model, mp3, language=_worker_language)
+            audio_seconds = result["vad"]["original_seconds"]
+            speech_ratio = result["vad"]["speech_ratio"]
+        else:
+            result = _worker_model.transcribe(mp3, language=_worker_language)
+            audio_seconds = result["segments"][-1]["end"] if result["segments"] else 0.0
+            speech_ratio = None
+        write_transcript_files(result, srt_path, json_path)
+        return {'mp3': mp3, 'srt': srt_path, 'ok': True, 'speech_ratio': speech_ratio,
+                'elapsed': time.time() - start, 'audio_seconds': audio_seconds}
+    except Exception as e:
+        return {'mp3': mp3, 'srt': srt_path, 'ok': False, 'error': str(e),
+                'elapsed': time.time() - start, 'audio_seconds': 0.0}
+
+def trigger_ai_processing(playlist, stem):
+    """Trigger AI processing on a new transcript (extract_content_ai.py --follow lo toma de la cola)"""
+    stage_queue.enqueue(stage_queue.EXTRACT, playlist, stem)
+    print(f"  🤖 Encolado para procesamiento IA", flush=True)
     return True
 
 def main():
     parser = argparse.ArgumentParser(description='Transcribe audio files to SRT')
     parser.add_argument('--model', default='medium', 
-                        choices=['tiny', 'base', 'small', 'medium', 'large'],
+                        choices=['tiny', 'base', 'small', 'medium', 'large', 'large-v2', 'large-v3'],
                         help='Whisper model size (default: medium)')
+    parser.add_argument('--backend', default='whisper', choices=list(BACKENDS.keys()),
+                        help='Motor de transcripción (default: whisper; faster-whisper = int8 en CPU)')
+    parser.add_argument('--compute-type', default=None,
+                        help='Tipo de cómputo para faster-whisper (default: int8 en CPU)')
     parser.add_argument('--language', default='es', help='Language code (default: es)')
     parser.add_argument('--playlist', default='secretos_zohar', help='Playlist folder name')
     parser.add_argument('--keep-audio', action='store_true', help='Keep MP3 files after transcription')
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--vad', action='store_true',
+                      help='Detectar voz y transcribir sólo esas regiones (salta silencios/intros)')
+    mode.add_argument('--stream', action='store_true',
+                      help='Guardar segmentos en {stem}.partial.jsonl a medida que avanza y reanudar tras un crash')
+    parser.add_argument('--chunk-seconds', type=float, default=300.0,
+                        help='Tamaño de bloque para --stream (default: 300)')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='Procesos worker (default: núcleos / threads por worker)')
+    parser.add_argument('--threads-per-worker', type=int, default=None,
+                        help='Threads de PyTorch por worker (default: 4, o todos los núcleos con 1 worker)')
     args = parser.parse_args()
     
+    cpu_count = os.cpu_count() or 1
+    stream_chunk_s = args.chunk_seconds if args.stream else 0.0
+    threads = max(1, min(args.threads_per_worker or 4, cpu_count))
+    workers = args.workers if args.workers > 0 else max(1, cpu_count // threads)
+    if workers == 1 and args.threads_per_worker is None:
+        threads = cpu_count
+    
     print("=" * 60)
     print("TRANSCRIPTOR DE AUDIO A SRT (Whisper)")
     print("=" * 60)
-    print(f"Modelo: {args.model}")
+    print(f"Modelo: {args.model} ({args.backend})")
     print(f"Idioma: {args.language}")
     print(f"Playlist: {args.playlist}")
+    print(f"Workers: {workers} x {threads} threads ({cpu_count} núcleos)")
+    print(f"VAD: {'sí' if args.vad else 'no'} | Streaming: {'sí' if args.stream else 'no'}")
     print()
     
     audio_folder = AUDIO_DIR / args.playlist
@@ -113,14 +153,14 @@ def main():
         print("   Primero ejecuta: python scripts/download_audio.py")
         return
     
-    # Find MP3 files
-    mp3_files = sorted(audio_folder.glob("*.mp3"))
+    # Find audio files (MP3 o formatos ASR)
+    mp3_files = sorted(path for path in audio_folder.iterdir() if path.suffix in AUDIO_EXTENSIONS)
     
     if not mp3_files:
-        print("❌ No se encontraron archivos MP3")
+        print("❌ No se encontraron archivos de audio")
         return
     
-    print(f"📊 Archivos MP3 encontrados: {len(mp3_files)}")
+    print(f"📊 Archivos de audio encontrados: {len(mp3_files)}")
     
     # Filter out already transcribed
     pending = []
@@ -140,80 +180,77 @@ def main():
         print("✅ Todos los audios ya están transcritos")
         return
     
-    # Load model once
-    try:
-        import whisper
-        print(f"\n📥 Cargando modelo Whisper '{args.model}'...")
-        model = whisper.load_model(args.model)
-        print("✅ Modelo cargado")
-    except ImportError:
-        print("❌ Whisper no está instalado. Ejecuta:")
-        print("   pip install openai-whisper")
+    if not backend_available(args.backend):
+        print(f"❌ Backend '{args.backend}' no está instalado. Ejecuta:")
+        print(f"   pip install {'openai-whisper' if args.backend == 'whisper' else args.backend}")
         return
     
-    # Process each file
+    jobs = [(mp3, transcript_folder / (mp3.stem + ".srt"), transcript_folder / (mp3.stem + ".json"))
+            for mp3 in pending]
+    workers = min(workers, len(jobs))
+    
     success = 0
     failed = 0
+    total_elapsed = 0.0
+    total_audio = 0.0
     
-    for i, mp3 in enumerate(pending, 1):
-        print(f"\n[{i}/{len(pending)}] {mp3.name}")
+    def handle(i, outcome):
+        nonlocal success, failed, total_elapsed, total_audio
+        mp3 = outcome['mp3']
+        print(f"\n[{i}/{len(jobs)}] {mp3.name}", flush=True)
+        if not outcome['ok']:
+            print(f"  ❌ Error: {outcome['error']}", flush=True)
+            failed += 1
+            return
         
-        base_name = mp3.stem
-        srt_path = transcript_folder / (base_name + ".srt")
-        json_path = transcript_folder / (base_name + ".json")
+        rtf = outcome['elapsed'] / outcome['audio_seconds'] if outcome['audio_seconds'] else 0.0
+        print(f"  ✅ Guardado: {outcome['srt'].name} "
+              f"({outcome['audio_seconds'] / 60:.1f} min audio en {outcome['elapsed'] / 60:.1f} min, RTF {rtf:.2f})", flush=True)
+        if outcome.get('speech_ratio') is not None:
+            print(f"  🔇 VAD: {outcome['speech_ratio'] * 100:.0f}% del audio con voz", flush=True)
+        success += 1
+        manifest_index.mark_transcript(args.playlist, mp3.stem, 'whisper')
+        trigger_ai_processing(args.playlist, mp3.stem)
+        total_elapsed += outcome['elapsed']
+        total_audio += outcome['audio_seconds']
         
-        try:
-            print(f"  🎙️ Transcribiendo...")
-            result = model.transcribe(
-                str(mp3),
-                language=args.language,
-                task="transcribe",
-                verbose=False
-            )
-            
-            # Generate SRT content
-            srt_content = []
-            for j, segment in enumerate(result["segments"], 1):
-                start = format_timestamp(segment["start"])
-                end = format_timestamp(segment["end"])
-                text = segment["text"].strip()
-                
-                srt_content.append(f"{j}")
-                srt_content.append(f"{start} --> {end}")
-                srt_content.append(text)
-                srt_content.append("")
-            
-            # Write SRT file
-            with open(srt_path, 'w', encoding='utf-8') as f:
-                f.write('\n'.join(srt_content))
-            
-            # Also save as JSON for AI processing compatibility
-            import json
-            json_content = {
-                "text": result["text"],
-                "segments": result["segments"],
-                "language": result["language"]
-            }
-            with open(json_path, 'w', encoding='utf-8') as f:
-                json.dump(json_content, f, ensure_ascii=False, indent=2)
-            
-            print(f"  ✅ Guardado: {srt_path.name}")
-            success += 1
-            
-            # Delete MP3 if requested
-            if not args.keep_audio:
-                try:
-                    mp3.unlink()
-                    print(f"  🗑️ MP3 eliminado")
-                except Exception as e:
-                    print(f"  ⚠️ No se pudo eliminar MP3: {e}")
-                    
-        except Exception as e:
-            print(f"  ❌ Error: {e}")
-            failed += 1
+        # Delete MP3 if requested
+        if not args.keep_audio:
+            try:
+                mp3.unlink()
+                manifest_index.mark_audio(args.playlist, mp3.stem, False)
+                print(f"  🗑️ Audio eliminado")
+            except Exception as e:
+                print(f"  ⚠️ No se pudo eliminar el audio: {e}")
+    
+    wall_start = time.time()
+    
+    if workers == 1:
+        # Load model once (en este mismo proceso)
+        print(f"\n📥 Cargando modelo Whisper '{args.model}'...")
+        _init_worker(args.model, args.language, threads, args.backend, args.compute_type, args.vad,
+                     stream_chunk_s)
+        print("✅ Modelo cargado")
+        for i, job in enumerate(jobs, 1):
+            print(f"  🎙️ Transcribiendo {job[0].name}...", flush=True)
+            handle(i, _transcribe_job(job))
+    else:
+        print(f"\n📥 Iniciando {workers} workers (cada uno carga el modelo '{args.model}')...")
+        with multiprocessing.Pool(processes=workers, initializer=_init_worker,
+                                  initargs=(args.model, args.language, threads,
+                                            args.backend, args.compute_type, args.vad,
+                                            stream_chunk_s)) as pool:
+            for i, outcome in enumerate(pool.imap_unordered(_transcribe_job, jobs), 1):
+                handle(i, outcome)
+    
+    wall_elapsed = time.time() - wall_start
     
     print("\n" + "=" * 60)
     print(f"📊 Resumen: {success} transcritos, {failed} fallidos")
+    if total_audio:
+        print(f"⏱️ Audio: {total_audio / 60:.1f} min | Pared: {wall_elapsed / 60:.1f} min | "
+              f"RTF medio por archivo: {total_elapsed / total_audio:.2f} | "
+              f"RTF efectivo: {wall_elapsed / total_audio:.2f}")
     print(f"📁 SRTs guardados en: {transcript_folder}")
     print("=" * 60)
     
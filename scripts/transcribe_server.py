@@ -5,38 +5,52 @@ Run this on the server (192.168.100.21) after copying MP3 files.
 
 Usage:
   python3 transcribe_server.py
+  python3 transcribe_server.py --backend faster-whisper   # int8 on CPU
+
+  python3 transcribe_server.py --vad                      # skip silence/intros
+  python3 transcribe_server.py --parallel-windows 4       # split long classes across 4 workers
+
+Requires transcription_backends.py, vad_slicing.py and parallel_segments.py
+next to this script (the remote clients upload them).
 """
 
 import os
 import sys
+import argparse
 from pathlib import Path
-from datetime import timedelta
+
+sys.path.insert(0, str(Path(__file__).parent))
+from transcription_backends import AUDIO_EXTENSIONS, BACKENDS, backend_available, load_backend, write_transcript_files
 
 # Configuration - aligned with USB symlinks
 AUDIO_DIR = Path.home() / "kabbalah_audios"
 OUTPUT_DIR = Path.home() / "kabbalah_transcripciones"
 
-def format_timestamp(seconds):
-    """Convert seconds to SRT timestamp format (HH:MM:SS,mmm)"""
-    td = timedelta(seconds=seconds)
-    hours = int(td.total_seconds() // 3600)
-    minutes = int((td.total_seconds() % 3600) // 60)
-    secs = int(td.total_seconds() % 60)
-    millis = int((td.total_seconds() % 1) * 1000)
-    return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
-
 def main():
+    parser = argparse.ArgumentParser(description='Whisper transcription (server)')
+    parser.add_argument('--backend', default='whisper', choices=list(BACKENDS.keys()),
+                        help='Transcription engine (default: whisper)')
+    parser.add_argument('--model', default='medium', help='Model size (default: medium)')
+    parser.add_argument('--compute-type', default=None,
+                        help='faster-whisper compute type (default: int8 on CPU, float16 on GPU)')
+    parser.add_argument('--vad', action='store_true',
+                        help='Transcribe only speech regions (timestamps mapped back to the original)')
+    parser.add_argument('--parallel-windows', type=int, default=0,
+                        help='Split each file into overlapping windows transcribed by N workers (0 = off)')
+    parser.add_argument('--window-seconds', type=float, default=600.0,
+                        help='Window length for --parallel-windows (default: 600)')
+    args = parser.parse_args()
+    
     print("=" * 60)
     print("WHISPER TRANSCRIPTION - SERVER VERSION")
     print("=" * 60)
     
-    # Check Whisper installation
-    try:
-        import whisper
-        print(f"✅ Whisper version: {whisper.__version__}")
-    except ImportError:
-        print("❌ Whisper not installed. Run: pip install openai-whisper")
+    # Check backend installation
+    if not backend_available(args.backend):
+        print(f"❌ Backend '{args.backend}' not installed. Run: pip install "
+              f"{'openai-whisper' if args.backend == 'whisper' else args.backend}")
         sys.exit(1)
+    print(f"✅ Backend: {args.backend}")
     
     # Check CUDA availability
     try:
@@ -53,16 +67,17 @@ def main():
     
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
     
-    # Find MP3 files
-    mp3_files = sorted(AUDIO_DIR.glob("*.mp3"))
+    # Find audio files (MP3 or 16 kHz ASR formats)
+    mp3_files = sorted(path for path in AUDIO_DIR.iterdir() if path.suffix in AUDIO_EXTENSIONS) \
+        if AUDIO_DIR.exists() else []
     
     if not mp3_files:
-        print(f"❌ No MP3 files found in {AUDIO_DIR}")
+        print(f"❌ No audio files found in {AUDIO_DIR}")
         print("Copy MP3s from Windows PC first:")
         print(f"  scp user@windows_ip:/path/to/audios/*.mp3 {AUDIO_DIR}/")
         sys.exit(1)
     
-    print(f"📊 MP3 files found: {len(mp3_files)}")
+    print(f"📊 Audio files found: {len(mp3_files)}")
     
     # Filter already transcribed
     pending = []
@@ -78,12 +93,19 @@ def main():
         return
     
     # Load model
-    print("\n📥 Loading Whisper 'medium' model...")
-    model = whisper.load_model("medium", device=device)
+    if args.parallel_windows > 1:
+        from parallel_segments import ParallelSegmentTranscriber
+        print(f"\n📥 Starting {args.parallel_windows} window workers ('{args.model}', {args.backend})...")
+        model = ParallelSegmentTranscriber(
+            args.parallel_windows, backend=args.backend, model_name=args.model,
+            device=device, compute_type=args.compute_type, window_s=args.window_seconds
+        )
+    else:
+        print(f"\n📥 Loading '{args.model}' model ({args.backend})...")
+        model = load_backend(args.backend, args.model, device=device, compute_type=args.compute_type)
     print("✅ Model loaded")
     
     # Process files
-    import json
     success = 0
     failed = 0
     
@@ -92,34 +114,17 @@ def main():
         print("  🎙️ Transcribing...")
         
         try:
-            result = model.transcribe(
-                str(mp3),
-                language="es",
-                task="transcribe",
-                verbose=False
-            )
-            
-            # Generate SRT
-            srt_content = []
-            for j, segment in enumerate(result["segments"], 1):
-                start = format_timestamp(segment["start"])
-                end = format_timestamp(segment["end"])
-                text = segment["text"].strip()
-                srt_content.extend([str(j), f"{start} --> {end}", text, ""])
+            if args.vad:
+                from vad_slicing import transcribe_with_vad
+                result = transcribe_with_vad(model, mp3, language="es")
+                print(f"  🔇 VAD: {result['vad']['speech_ratio'] * 100:.0f}% speech")
+            else:
+                result = model.transcribe(mp3, language="es")
             
-            # Save SRT
+            # Save SRT + JSON
             srt_path = OUTPUT_DIR / (mp3.stem + ".srt")
-            with open(srt_path, 'w', encoding='utf-8') as f:
-                f.write('\n'.join(srt_content))
-            
-            # Save JSON
             json_path = OUTPUT_DIR / (mp3.stem + ".json")
-            with open(json_path, 'w', encoding='utf-8') as f:
-                json.dump({
-                    "text": result["text"],
-                    "segments": result["segments"],
-                    "language": result["language"]
-                }, f, ensure_ascii=False, indent=2)
+            write_transcript_files(result, srt_path, json_path)
             
             print(f"  ✅ Saved: {srt_path.name}")
             success += 1
@@ -132,6 +137,9 @@ def main():
             print(f"  ❌ Error: {e}")
             failed += 1
     
+    if hasattr(model, 'close'):
+        model.close()
+    
     print("\n" + "=" * 60)
     print(f"📊 Summary: {success} transcribed, {failed} failed")
     print(f"📁 Output: {OUTPUT_DIR}")
@@ -0,0 +1,148 @@
+"""
+Transcript Chunking - Extracción map-reduce por ventanas de transcripción
+
+En lugar de truncar las clases largas a 15,000 palabras, divide los
+segmentos en ventanas solapadas, extrae cada ventana en paralelo y
+combina los resultados de forma determinista:
+- Listas (meditaciones, conceptos, Q&A, ...) se concatenan en orden de
+  ventana y se deduplican por su campo identificador.
+- Objetos (metadata, resumen_clase) se quedan con el primer valor no
+  vacío y completan campos faltantes con las ventanas siguientes.
+"""
+
+import os
+import re
+import json
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+# Tamaño de ventana acotado para que el modelo 3B de Ollama no llegue a su límite de contexto
+CHUNK_WORDS = int(os.getenv('CHUNK_WORDS', '4000'))
+CHUNK_OVERLAP_WORDS = int(os.getenv('CHUNK_OVERLAP_WORDS', '300'))
+CHUNK_WORKERS = int(os.getenv('CHUNK_WORKERS', '2'))
+
+# Campos que identifican un item al deduplicar (en orden de preferencia)
+IDENTITY_FIELDS = [
+    'titulo', 'title', 'pregunta', 'question', 'concepto', 'simbolo',
+    'termino_hebreo', 'termino', 'tema', 'letra', 'nombre_hebreo',
+    'transliteracion', 'nombre', 'cita'
+]
+
+def split_transcript(transcript_data: List[Dict],
+                     max_words: int = CHUNK_WORDS,
+                     overlap_words: int = CHUNK_OVERLAP_WORDS) -> List[List[Dict]]:
+    """Divide los segmentos en ventanas de ~max_words palabras solapadas
+
+    Corta siempre en límites de segmento para conservar los timestamps
+    absolutos; cada ventana repite los últimos ~overlap_words palabras de
+    la anterior para no partir una meditación o pregunta por la mitad.
+    """
+    if not transcript_data:
+        return []
+
+    word_counts = [len(seg.get('text', '').split()) for seg in transcript_data]
+    if sum(word_counts) <= max_words:
+        return [transcript_data]
+
+    windows = []
+    start = 0
+    n = len(transcript_data)
+    while start < n:
+        end = start
+        words = 0
+        while end < n and (words + word_counts[end] <= max_words or end == start):
+            words += word_counts[end]
+            end += 1
+        windows.append(transcript_data[start:end])
+        if end >= n:
+            break
+
+        # Retroceder hasta cubrir el solapamiento, sin volver al inicio de la ventana
+        next_start = end
+        overlap = 0
+        while next_start > start + 1 and overlap < overlap_words:
+            next_start -= 1
+            overlap += word_counts[next_start]
+        start = next_start
+
+    return windows
+
+def _normalize(text: str) -> str:
+    """Normaliza texto para comparar (minúsculas, sin acentos ni puntuación)"""
+    text = unicodedata.normalize('NFKD', str(text))
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r'[^\w\s]', ' ', text.casefold())
+    return ' '.join(text.split())
+
+def _item_key(item: Any) -> str:
+    """Clave de deduplicación de un item extraído"""
+    if isinstance(item, dict):
+        for field in IDENTITY_FIELDS:
+            value = item.get(field)
+            if isinstance(value, str) and value.strip():
+                return f"{field}:{_normalize(value)}"
+        return json.dumps(item, ensure_ascii=False, sort_keys=True)
+    if isinstance(item, str):
+        return _normalize(item)
+    return json.dumps(item, ensure_ascii=False, sort_keys=True)
+
+def _is_empty(value: Any) -> bool:
+    return value is None or value == '' or value == [] or value == {}
+
+def merge_values(base: Any, other: Any) -> Any:
+    """Combina dos valores extraídos de ventanas consecutivas"""
+    if isinstance(base, dict) and isinstance(other, dict):
+        merged = dict(base)
+        for key, value in other.items():
+            merged[key] = merge_values(merged[key], value) if key in merged else value
+        return merged
+    if isinstance(base, list) and isinstance(other, list):
+        merged = []
+        seen = set()
+        for item in base + other:
+            key = _item_key(item)
+            if key not in seen:
+                seen.add(key)
+                merged.append(item)
+        return merged
+    return other if _is_empty(base) else base
+
+def merge_extractions(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combina los resultados por ventana en un único resultado (en orden de ventana)"""
+    merged: Dict[str, Any] = {}
+    for result in results:
+        merged = merge_values(merged, result)
+    return merged
+
+def extract_chunked(transcript_data: List[Dict],
+                    extract_window: Callable[[List[Dict], int, int], Optional[Dict[str, Any]]],
+                    workers: int = CHUNK_WORKERS) -> Optional[Dict[str, Any]]:
+    """Extrae cada ventana en paralelo y combina los resultados
+
+    extract_window(segmentos, indice, total) devuelve el JSON de la ventana
+    o None si falló. Si alguna ventana falla se devuelve None para que el
+    video se reintente completo en vez de guardarse con huecos.
+    """
+    windows = split_transcript(transcript_data)
+    if not windows:
+        windows = [transcript_data]
+
+    if len(windows) == 1:
+        return extract_window(windows[0], 1, 1)
+
+    print(f"   [CHUNK] {len(windows)} ventanas de ~{CHUNK_WORDS} palabras "
+          f"(solapamiento {CHUNK_OVERLAP_WORDS}, {workers} en paralelo)", flush=True)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        results = list(executor.map(
+            lambda args: extract_window(args[1], args[0], len(windows)),
+            enumerate(windows, 1)
+        ))
+
+    if any(r is None for r in results):
+        failed = sum(1 for r in results if r is None)
+        print(f"   [ERROR] {failed}/{len(windows)} ventanas fallaron", flush=True)
+        return None
+
+    return merge_extractions(results)
@@ -0,0 +1,165 @@
+"""
+Transcription Backends - Motores de transcripción intercambiables
+
+Todos los backends devuelven el mismo formato que whisper.transcribe():
+    {"text": str, "segments": [{"id", "start", "end", "text", ...}], "language": str}
+así el mismo código genera los SRT/JSON sin importar el motor.
+
+Backends:
+- whisper:        openai-whisper (PyTorch FP32/FP16)
+- faster-whisper: CTranslate2, int8 en CPU (varias veces más rápido en CPU)
+
+Requirements:
+  pip install openai-whisper     # backend 'whisper'
+  pip install faster-whisper     # backend 'faster-whisper'
+"""
+
+import json
+import wave
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+SAMPLE_RATE = 16000
+# Extensiones de audio que aceptan los transcriptores (MP3 o formatos ASR de 16 kHz)
+AUDIO_EXTENSIONS = ('.mp3', '.opus', '.flac', '.wav')
+
+def format_timestamp(seconds):
+    """Convert seconds to SRT timestamp format (HH:MM:SS,mmm)"""
+    td = timedelta(seconds=seconds)
+    hours = int(td.total_seconds() // 3600)
+    minutes = int((td.total_seconds() % 3600) // 60)
+    secs = int(td.total_seconds() % 60)
+    millis = int((td.total_seconds() % 1) * 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
+
+def segments_to_srt(segments: List[Dict[str, Any]]) -> str:
+    """Genera el contenido SRT a partir de los segmentos"""
+    srt_content = []
+    for i, segment in enumerate(segments, 1):
+        start = format_timestamp(segment["start"])
+        end = format_timestamp(segment["end"])
+        text = segment["text"].strip()
+        srt_content.extend([str(i), f"{start} --> {end}", text, ""])
+    return '\n'.join(srt_content)
+
+def write_transcript_files(result: Dict[str, Any], srt_path: Path, json_path: Path):
+    """Escribe el SRT y el JSON (compatible con la extracción IA) de un resultado"""
+    with open(srt_path, 'w', encoding='utf-8') as f:
+        f.write(segments_to_srt(result["segments"]))
+
+    json_content = {
+        "text": result["text"],
+        "segments": result["segments"],
+        "language": result["language"]
+    }
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(json_content, f, ensure_ascii=False, indent=2)
+
+def read_pcm_wav(path):
+    """WAV PCM s16 16 kHz mono -> array float32 (sin ffmpeg); None si es otro formato"""
+    if Path(path).suffix.lower() != '.wav':
+        return None
+    import numpy as np
+    with wave.open(str(path), 'rb') as wav:
+        if (wav.getframerate(), wav.getnchannels(), wav.getsampwidth()) != (SAMPLE_RATE, 1, 2):
+            return None
+        frames = wav.readframes(wav.getnframes())
+    return np.frombuffer(frames, np.int16).astype(np.float32) / 32768.0
+
+def _audio_input(audio):
+    """Ruta -> str; un array de muestras (16 kHz mono float32) pasa tal cual
+
+    Los WAV del modo ASR ya están a 16 kHz mono: se leen directo y se evita
+    el paso de decodificación/re-muestreo con ffmpeg.
+    """
+    if not isinstance(audio, (str, Path)):
+        return audio
+    samples = read_pcm_wav(audio)
+    return samples if samples is not None else str(audio)
+
+class WhisperBackend:
+    """openai-whisper sobre PyTorch"""
+
+    name = 'whisper'
+
+    def __init__(self, model_name: str = 'medium', device: Optional[str] = None,
+                 threads: Optional[int] = None, compute_type: Optional[str] = None):
+        import torch
+        import whisper
+        if threads:
+            torch.set_num_threads(threads)
+        self.model_name = model_name
+        self.model = whisper.load_model(model_name, device=device)
+
+    def transcribe(self, audio_path, language: str = 'es', **kwargs) -> Dict[str, Any]:
+        return self.model.transcribe(
+            _audio_input(audio_path),
+            language=language,
+            task="transcribe",
+            verbose=False,
+            **kwargs
+        )
+
+class FasterWhisperBackend:
+    """faster-whisper (CTranslate2), int8 por defecto en CPU"""
+
+    name = 'faster-whisper'
+
+    def __init__(self, model_name: str = 'medium', device: Optional[str] = None,
+                 threads: Optional[int] = None, compute_type: Optional[str] = None):
+        from faster_whisper import WhisperModel
+        device = device or 'cpu'
+        if compute_type is None:
+            compute_type = 'int8' if device == 'cpu' else 'float16'
+        self.model_name = model_name
+        self.model = WhisperModel(
+            model_name,
+            device=device,
+            compute_type=compute_type,
+            cpu_threads=threads or 0
+        )
+
+    def transcribe(self, audio_path, language: str = 'es', **kwargs) -> Dict[str, Any]:
+        segments_iter, info = self.model.transcribe(
+            _audio_input(audio_path),
+            language=language,
+            task="transcribe",
+            **kwargs
+        )
+        segments = []
+        for i, seg in enumerate(segments_iter):
+            segments.append({
+                "id": i,
+                "seek": getattr(seg, 'seek', 0),
+                "start": seg.start,
+                "end": seg.end,
+                "text": seg.text,
+                "temperature": getattr(seg, 'temperature', 0.0),
+                "avg_logprob": seg.avg_logprob,
+                "compression_ratio": seg.compression_ratio,
+                "no_speech_prob": seg.no_speech_prob,
+            })
+        return {
+            "text": "".join(s["text"] for s in segments),
+            "segments": segments,
+            "language": info.language
+        }
+
+BACKENDS = {
+    WhisperBackend.name: WhisperBackend,
+    FasterWhisperBackend.name: FasterWhisperBackend,
+}
+
+def load_backend(name: str = 'whisper', model_name: str = 'medium', device: Optional[str] = None,
+                 threads: Optional[int] = None, compute_type: Optional[str] = None):
+    """Instancia el backend indicado (el modelo queda cargado en memoria)"""
+    if name not in BACKENDS:
+        raise ValueError(f"Backend desconocido: {name} (disponibles: {', '.join(BACKENDS)})")
+    return BACKENDS[name](model_name, device=device, threads=threads, compute_type=compute_type)
+
+def backend_available(name: str) -> bool:
+    """True si el paquete del backend está instalado"""
+    import importlib.util
+    module = {'whisper': 'whisper', 'faster-whisper': 'faster_whisper'}.get(name)
+    return module is not None and importlib.util.find_spec(module) is not None
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Transcription Daemon - Long-running Whisper service with a durable job queue
+Run this on the server (192.168.100.21); the remote clients start it once
+and then only submit jobs and poll their status.
+
+transcribe_server.py was uploaded and run over `ssh.exec_command` on every
+sync: the model was reloaded, the audio folder re-scanned, and the progress
+was lost when the SSH session dropped. This daemon keeps the model loaded
+and takes jobs from a queue directory that survives restarts:
+
+    ~/kabbalah_jobs/queued/{stem}.json    submitted, waiting
+    ~/kabbalah_jobs/running/{stem}.json   claimed by the daemon (atomic rename)
+    ~/kabbalah_jobs/done/{stem}.json      transcript written to OUTPUT_DIR
+    ~/kabbalah_jobs/failed/{stem}.json    with "error"
+    ~/kabbalah_jobs/daemon.json           pid, backend, model, heartbeat, current job
+
+Jobs left in running/ by a crash are re-queued on start. daemon.json is
+written (and kept beating) before that and before the model loads, so a
+second daemon started meanwhile sees a live owner and exits instead of
+re-queueing the first one's running job.
+
+Usage:
+  nohup python3 -u transcription_daemon.py --backend faster-whisper > daemon.log 2>&1 &
+  python3 transcription_daemon.py --submit 001_Clase.mp3 002_Clase.opus
+  python3 transcription_daemon.py --status
+
+  # Local test without a model:
+  python3 transcription_daemon.py --backend stand-in --queue-dir /tmp/jobs \\
+      --audio-dir /tmp/audios --output-dir /tmp/out --once
+
+Requires transcribe_server.py, transcription_backends.py, vad_slicing.py and
+parallel_segments.py next to this script (the remote clients upload them).
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from pathlib import Path
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+from transcription_backends import BACKENDS, backend_available, load_backend, write_transcript_files
+from transcribe_server import AUDIO_DIR, OUTPUT_DIR
+
+QUEUE_DIR = Path.home() / "kabbalah_jobs"
+STATES = ('queued', 'running', 'done', 'failed')
+POLL_S = 2.0              # Queue check interval while idle
+HEARTBEAT_S = 15.0        # daemon.json refresh interval
+HEARTBEAT_STALE_S = HEARTBEAT_S * 4   # older than this = daemon dead
+STAND_IN_BACKEND = 'stand-in'
+
+class StandInBackend:
+    """Backend without a model (same result format) to test the daemon locally"""
+
+    name = STAND_IN_BACKEND
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+
+    def transcribe(self, audio_path, language: str = 'es', **kwargs) -> Dict[str, Any]:
+        time.sleep(self.delay)
+        text = f" [stand-in] {Path(str(audio_path)).stem}"
+        return {"text": text, "segments": [{"id": 0, "start": 0.0, "end": 1.0, "text": text}],
+                "language": language}
+
+# ============================================================================
+# QUEUE (directories + atomic renames; shared by daemon and --submit/--status)
+# ============================================================================
+
+def _write_json(path: Path, data: Dict[str, Any]):
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+def _read_json(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+def init_queue(queue_dir: Path = QUEUE_DIR):
+    for state in STATES:
+        (queue_dir / state).mkdir(parents=True, exist_ok=True)
+
+def new_job(audio_name: str, vad: bool = False) -> Dict[str, Any]:
+    return {
+        'id': Path(audio_name).stem,
+        'audio': audio_name,
+        'vad': vad,
+        'submitted_at': datetime.now().isoformat(),
+    }
+
+def submit(audio_name: str, vad: bool = False, queue_dir: Path = QUEUE_DIR) -> str:
+    """Queues a job for an audio file in AUDIO_DIR (re-queues it if it had failed)"""
+    job = new_job(audio_name, vad)
+    (queue_dir / 'failed' / f"{job['id']}.json").unlink(missing_ok=True)
+    _write_json(queue_dir / 'queued' / f"{job['id']}.json", job)
+    return job['id']
+
+def job_files(state: str, queue_dir: Path = QUEUE_DIR) -> List[Path]:
+    folder = queue_dir / state
+    if not folder.exists():
+        return []
+    return sorted(p for p in folder.iterdir() if p.suffix == '.json' and not p.name.startswith('.'))
+
+def job_status(job_id: str, queue_dir: Path = QUEUE_DIR) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+    """(state, job) of a job, or (None, None) if unknown"""
+    for state in reversed(STATES):
+        path = queue_dir / state / f"{job_id}.json"
+        if path.exists():
+            return state, _read_json(path)
+    return None, None
+
+def recover(queue_dir: Path = QUEUE_DIR) -> int:
+    """Jobs left in running/ by a crash go back to queued/"""
+    recovered = 0
+    for path in job_files('running', queue_dir):
+        os.replace(path, queue_dir / 'queued' / path.name)
+        recovered += 1
+    return recovered
+
+def claim_next(queue_dir: Path = QUEUE_DIR) -> Optional[Tuple[Path, Dict[str, Any]]]:
+    """Moves the first queued job to running/ (the rename is the lock)"""
+    for path in job_files('queued', queue_dir):
+        running = queue_dir / 'running' / path.name
+        try:
+            os.rename(path, running)
+        except FileNotFoundError:
+            continue  # Taken by someone else
+        job = _read_json(running)
+        if job is None:
+            os.replace(running, queue_dir / 'failed' / path.name)
+            continue
+        return running, job
+    return None
+
+def finish(running: Path, job: Dict[str, Any], state: str, queue_dir: Path = QUEUE_DIR):
+    job['finished_at'] = datetime.now().isoformat()
+    _write_json(queue_dir / state / running.name, job)
+    running.unlink(missing_ok=True)
+
+# ============================================================================
+# DAEMON
+# ============================================================================
+
+def pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+def live_daemon(queue_dir: Path = QUEUE_DIR) -> Optional[Dict[str, Any]]:
+    """daemon.json of another daemon that is still alive (fresh heartbeat and running pid), or None"""
+    daemon = _read_json(queue_dir / 'daemon.json')
+    if not daemon or daemon.get('pid') == os.getpid():
+        return None
+    if time.time() - daemon.get('heartbeat', 0) >= HEARTBEAT_STALE_S or not pid_alive(daemon.get('pid', 0)):
+        return None
+    return daemon
+
+def start_heartbeat(queue_dir: Path, info: Dict[str, Any]) -> Callable:
+    """Writes daemon.json now and every HEARTBEAT_S; returns heartbeat(current=...)"""
+    lock = threading.Lock()
+
+    def heartbeat(current=...):
+        with lock:
+            if current is not ...:
+                info['current'] = current
+            info['heartbeat'] = time.time()
+            _write_json(queue_dir / 'daemon.json', info)
+
+    def beat_forever():
+        # Also while the model loads and during long jobs, so clients don't take the daemon for dead
+        while True:
+            time.sleep(HEARTBEAT_S)
+            heartbeat()
+
+    heartbeat()
+    threading.Thread(target=beat_forever, daemon=True).start()
+    return heartbeat
+
+def load_model(args):
+    if args.backend == STAND_IN_BACKEND:
+        return StandInBackend(args.stand_in_delay)
+    device = "cpu"
+    try:
+        import torch
+        if torch.cuda.is_available():
+            device = "cuda"
+            print(f"✅ GPU: {torch.cuda.get_device_name(0)}")
+    except ImportError:
+        pass
+    if args.parallel_windows > 1:
+        from parallel_segments import ParallelSegmentTranscriber
+        print(f"📥 Starting {args.parallel_windows} window workers ('{args.model}', {args.backend})...")
+        return ParallelSegmentTranscriber(
+            args.parallel_windows, backend=args.backend, model_name=args.model,
+            device=device, compute_type=args.compute_type, window_s=args.window_seconds
+        )
+    print(f"📥 Loading '{args.model}' model ({args.backend}, {device})...")
+    return load_backend(args.backend, args.model, device=device, compute_type=args.compute_type)
+
+def run_job(model, job: Dict[str, Any], audio_dir: Path, output_dir: Path, vad_default: bool) -> Dict[str, Any]:
+    """Transcribes one job's audio and returns the job with its results"""
+    audio = audio_dir / job['audio']
+    if not audio.exists():
+        raise FileNotFoundError(f"Audio not found: {audio}")
+
+    start = time.time()
+    if job.get('vad') or vad_default:
+        from vad_slicing import transcribe_with_vad
+        result = transcribe_with_vad(model, audio, language="es")
+        job['speech_ratio'] = result['vad']['speech_ratio']
+    else:
+        result = model.transcribe(audio, language="es")
+
+    srt_path = output_dir / (audio.stem + ".srt")
+    json_path = output_dir / (audio.stem + ".json")
+    write_transcript_files(result, srt_path, json_path)
+
+    job['srt'] = srt_path.name
+    job['elapsed'] = round(time.time() - start, 1)
+    job['audio_seconds'] = result["segments"][-1]["end"] if result["segments"] else 0.0
+    return job
+
+def serve(model, args, info: Dict[str, Any], heartbeat: Callable):
+    queue_dir = Path(args.queue_dir)
+    audio_dir = Path(args.audio_dir)
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    info['state'] = 'ready'
+    heartbeat()
+    print(f"✅ Daemon ready (pid {os.getpid()}), watching {queue_dir / 'queued'}", flush=True)
+
+    while True:
+        claimed = claim_next(queue_dir)
+        if claimed is None:
+            if args.once:
+                break
+            time.sleep(POLL_S)
+            continue
+
+        running, job = claimed
+        job['started_at'] = datetime.now().isoformat()
+        job['pid'] = os.getpid()
+        _write_json(running, job)
+        heartbeat(job['id'])
+        print(f"\n🎙️ {job['audio']}", flush=True)
+
+        try:
+            job = run_job(model, job, audio_dir, output_dir, args.vad)
+            finish(running, job, 'done', queue_dir)
+            print(f"  ✅ {job['srt']} ({job['audio_seconds'] / 60:.1f} min audio in "
+                  f"{job['elapsed'] / 60:.1f} min)", flush=True)
+        except Exception as e:
+            job['error'] = str(e)
+            finish(running, job, 'failed', queue_dir)
+            print(f"  ❌ Error: {e}", flush=True)
+
+        info['processed'] += 1
+        heartbeat(None)
+
+def print_status(queue_dir: Path):
+    daemon = _read_json(queue_dir / 'daemon.json')
+    if daemon:
+        age = time.time() - daemon.get('heartbeat', 0)
+        alive = daemon.get('state', 'alive') if age < HEARTBEAT_STALE_S else f"no heartbeat for {age:.0f}s"
+        print(f"Daemon pid {daemon['pid']} ({daemon['backend']}/{daemon['model']}): {alive}, "
+              f"current: {daemon.get('current') or '-'}, processed: {daemon.get('processed', 0)}")
+    else:
+        print("Daemon: never started")
+    for state in STATES:
+        files = job_files(state, queue_dir)
+        print(f"  {state:<8} {len(files)}")
+        if state in ('running', 'failed'):
+            for path in files:
+                job = _read_json(path) or {}
+                print(f"     {path.stem}  {job.get('error', '')[:80]}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Whisper transcription daemon (server)')
+    parser.add_argument('--backend', default='whisper', choices=list(BACKENDS.keys()) + [STAND_IN_BACKEND],
+                        help='Transcription engine (default: whisper; stand-in = no model, for tests)')
+    parser.add_argument('--model', default='medium', help='Model size (default: medium)')
+    parser.add_argument('--compute-type', default=None,
+                        help='faster-whisper compute type (default: int8 on CPU, float16 on GPU)')
+    parser.add_argument('--vad', action='store_true',
+                        help='Default for jobs that do not say: transcribe only speech regions')
+    parser.add_argument('--parallel-windows', type=int, default=0,
+                        help='Split each file into overlapping windows transcribed by N workers (0 = off)')
+    parser.add_argument('--window-seconds', type=float, default=600.0,
+                        help='Window length for --parallel-windows (default: 600)')
+    parser.add_argument('--queue-dir', default=str(QUEUE_DIR), help=f'Queue directory (default: {QUEUE_DIR})')
+    parser.add_argument('--audio-dir', default=str(AUDIO_DIR), help=f'Audio directory (default: {AUDIO_DIR})')
+    parser.add_argument('--output-dir', default=str(OUTPUT_DIR), help=f'Transcripts directory (default: {OUTPUT_DIR})')
+    parser.add_argument('--once', action='store_true', help='Exit when the queue is empty')
+    parser.add_argument('--stand-in-delay', type=float, default=0.0,
+                        help='Seconds per job for the stand-in backend')
+    parser.add_argument('--submit', nargs='+', metavar='AUDIO', help='Queue these audio files (names in --audio-dir)')
+    parser.add_argument('--status', action='store_true', help='Show daemon and queue status')
+    args = parser.parse_args()
+
+    queue_dir = Path(args.queue_dir)
+    init_queue(queue_dir)
+
+    if args.submit or args.status:
+        for name in args.submit or []:
+            print(f"Queued: {submit(Path(name).name, args.vad, queue_dir)}")
+        if args.status:
+            print_status(queue_dir)
+        return
+
+    print("=" * 60)
+    print("WHISPER TRANSCRIPTION DAEMON")
+    print("=" * 60)
+
+    if args.backend != STAND_IN_BACKEND and not backend_available(args.backend):
+        print(f"❌ Backend '{args.backend}' not installed. Run: pip install "
+              f"{'openai-whisper' if args.backend == 'whisper' else args.backend}")
+        sys.exit(1)
+
+    # Claim daemon.json before recover()/load_model: a daemon that is still
+    # loading its model already counts as alive for the clients
+    other = live_daemon(queue_dir)
+    if other:
+        print(f"⏭️ Another daemon is alive (pid {other['pid']}, {other.get('state', 'ready')}), exiting")
+        return
+    info = {
+        'pid': os.getpid(),
+        'backend': args.backend,
+        'model': args.model,
+        'started_at': datetime.now().isoformat(),
+        'state': 'loading',
+        'current': None,
+        'processed': 0,
+    }
+    heartbeat = start_heartbeat(queue_dir, info)
+    # Two daemons started at the same moment: the last write wins, the other one exits
+    time.sleep(1.0)
+    if live_daemon(queue_dir):
+        print("⏭️ Another daemon claimed the queue at the same time, exiting")
+        return
+
+    recovered = recover(queue_dir)
+    if recovered:
+        print(f"♻️ {recovered} interrupted jobs re-queued")
+
+    model = load_model(args)
+    print("✅ Model loaded")
+    try:
+        serve(model, args, info, heartbeat)
+    except KeyboardInterrupt:
+        print("\n⏹️ Stopped")
+    finally:
+        if hasattr(model, 'close'):
+            model.close()
+
+if __name__ == "__main__":
+    main()
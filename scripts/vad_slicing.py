@@ -0,0 +1,178 @@
+"""
+VAD Slicing - Transcribir sólo las regiones con voz
+
+Las grabaciones de las clases tienen pausas largas, intros musicales y
+silencios. Este módulo:
+1. Decodifica el MP3 a 16 kHz mono (igual que Whisper, vía ffmpeg)
+2. Detecta regiones de voz (webrtcvad si está instalado, si no energía RMS)
+3. Concatena sólo la voz (con un pequeño silencio entre regiones) y se la
+   pasa al backend como array
+4. Re-mapea los timestamps de los segmentos a la línea de tiempo ORIGINAL,
+   para que los SRT y los timestamp_inicio de las meditaciones sigan siendo
+   correctos
+
+Requirements:
+  numpy + ffmpeg en el PATH (ya requeridos por Whisper)
+  pip install webrtcvad   (opcional, mejor que la detección por energía)
+"""
+
+import subprocess
+from bisect import bisect_right
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from transcription_backends import read_pcm_wav
+
+SAMPLE_RATE = 16000
+FRAME_MS = 30
+MIN_SILENCE_S = 1.0      # Silencios más cortos no cortan la región
+MIN_SPEECH_S = 0.3       # Regiones más cortas se descartan
+PAD_S = 0.2              # Margen alrededor de cada región
+GAP_S = 0.3              # Silencio insertado entre regiones concatenadas
+
+def load_audio(path, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Decodifica a float32 mono a sample_rate (mismo método que whisper.audio)"""
+    if sample_rate == SAMPLE_RATE:
+        samples = read_pcm_wav(path)   # WAV del modo ASR: ya está a 16 kHz mono
+        if samples is not None:
+            return samples
+    cmd = [
+        "ffmpeg", "-nostdin", "-threads", "0", "-i", str(path),
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(sample_rate), "-"
+    ]
+    out = subprocess.run(cmd, capture_output=True, check=True).stdout
+    return np.frombuffer(out, np.int16).flatten().astype(np.float32) / 32768.0
+
+def _energy_speech_frames(audio: np.ndarray, frame_len: int, margin_db: float = 12.0,
+                          floor_db: float = -45.0) -> np.ndarray:
+    """Marca como voz los frames con energía sobre el piso de ruido + margen"""
+    n_frames = len(audio) // frame_len
+    if n_frames == 0:
+        return np.zeros(0, dtype=bool)
+    frames = audio[:n_frames * frame_len].reshape(n_frames, frame_len)
+    rms = np.sqrt(np.mean(frames ** 2, axis=1) + 1e-12)
+    db = 20 * np.log10(rms)
+    threshold = max(np.percentile(db, 10) + margin_db, floor_db)
+    return db > threshold
+
+def _webrtc_speech_frames(audio: np.ndarray, frame_len: int, aggressiveness: int = 2) -> np.ndarray:
+    import webrtcvad
+    vad = webrtcvad.Vad(aggressiveness)
+    pcm = (np.clip(audio, -1, 1) * 32767).astype(np.int16).tobytes()
+    n_frames = len(audio) // frame_len
+    step = frame_len * 2
+    return np.array([vad.is_speech(pcm[i * step:(i + 1) * step], SAMPLE_RATE) for i in range(n_frames)],
+                    dtype=bool)
+
+def detect_speech_regions(audio: np.ndarray, method: str = 'auto') -> List[Tuple[float, float]]:
+    """Devuelve [(inicio_s, fin_s)] de las regiones con voz"""
+    frame_len = SAMPLE_RATE * FRAME_MS // 1000
+    frame_s = FRAME_MS / 1000
+
+    if method in ('auto', 'webrtc'):
+        try:
+            speech = _webrtc_speech_frames(audio, frame_len)
+        except ImportError:
+            if method == 'webrtc':
+                raise
+            speech = _energy_speech_frames(audio, frame_len)
+    else:
+        speech = _energy_speech_frames(audio, frame_len)
+
+    # Runs de frames con voz
+    regions = []
+    start = None
+    for i, is_speech in enumerate(speech):
+        if is_speech and start is None:
+            start = i
+        elif not is_speech and start is not None:
+            regions.append([start * frame_s, i * frame_s])
+            start = None
+    if start is not None:
+        regions.append([start * frame_s, len(speech) * frame_s])
+
+    # Unir regiones separadas por silencios cortos
+    merged: List[List[float]] = []
+    for region in regions:
+        if merged and region[0] - merged[-1][1] < MIN_SILENCE_S:
+            merged[-1][1] = region[1]
+        else:
+            merged.append(region)
+
+    duration = len(audio) / SAMPLE_RATE
+    result = []
+    for s, e in merged:
+        if e - s < MIN_SPEECH_S:
+            continue
+        s, e = max(0.0, s - PAD_S), min(duration, e + PAD_S)
+        if result and s <= result[-1][1]:
+            result[-1] = (result[-1][0], e)
+        else:
+            result.append((s, e))
+    return result
+
+class Timeline:
+    """Mapa entre la línea de tiempo del audio recortado y la original"""
+
+    def __init__(self, regions: List[Tuple[float, float]]):
+        self.regions = regions
+        self.compact_starts = []
+        t = 0.0
+        for s, e in regions:
+            self.compact_starts.append(t)
+            t += (e - s) + GAP_S
+        self.compact_duration = max(0.0, t - GAP_S)
+
+    def to_original(self, t: float) -> float:
+        """Convierte un instante del audio recortado al audio original"""
+        if not self.regions:
+            return t
+        i = max(0, bisect_right(self.compact_starts, t) - 1)
+        s, e = self.regions[i]
+        return min(s + (t - self.compact_starts[i]), e)
+
+def build_speech_audio(audio: np.ndarray, regions: List[Tuple[float, float]]) -> np.ndarray:
+    """Concatena las regiones con voz separadas por GAP_S de silencio"""
+    gap = np.zeros(int(GAP_S * SAMPLE_RATE), dtype=np.float32)
+    pieces = []
+    for i, (s, e) in enumerate(regions):
+        if i:
+            pieces.append(gap)
+        pieces.append(audio[int(s * SAMPLE_RATE):int(e * SAMPLE_RATE)])
+    return np.concatenate(pieces) if pieces else np.zeros(0, dtype=np.float32)
+
+def remap_result(result: Dict[str, Any], timeline: Timeline) -> Dict[str, Any]:
+    """Re-mapea start/end de segmentos (y palabras) a la línea de tiempo original"""
+    for seg in result.get("segments", []):
+        seg["start"] = timeline.to_original(seg["start"])
+        seg["end"] = max(seg["start"], timeline.to_original(seg["end"]))
+        for word in seg.get("words") or []:
+            word["start"] = timeline.to_original(word["start"])
+            word["end"] = timeline.to_original(word["end"])
+    return result
+
+def transcribe_with_vad(engine, audio_path, language: str = 'es', method: str = 'auto') -> Dict[str, Any]:
+    """Transcribe sólo la voz con `engine` (ver transcription_backends) y re-mapea timestamps
+
+    Agrega result["vad"] con la duración original y la fracción con voz.
+    """
+    audio = load_audio(audio_path)
+    original_seconds = len(audio) / SAMPLE_RATE
+    regions = detect_speech_regions(audio, method=method)
+    timeline = Timeline(regions)
+
+    if not regions:
+        result = {"text": "", "segments": [], "language": language}
+    else:
+        result = engine.transcribe(build_speech_audio(audio, regions), language=language)
+        remap_result(result, timeline)
+
+    speech_seconds = sum(e - s for s, e in regions)
+    result["vad"] = {
+        "original_seconds": round(original_seconds, 2),
+        "speech_seconds": round(speech_seconds, 2),
+        "speech_ratio": round(speech_seconds / original_seconds, 3) if original_seconds else 0.0,
+        "regions": len(regions),
+    }
+    return result
@@ -0,0 +1,211 @@
+"""
+yt-dlp Engine - yt-dlp en proceso (API de Python) en vez de un subprocess por video
+
+Cada `subprocess.run('yt-dlp ...', shell=True)` pagaba el arranque del
+intérprete, la carga de todos los extractores y una sesión HTTP nueva
+(cookies incluidas) por video. Aquí hay un YoutubeDL de larga vida por
+perfil (subtítulos, audio, playlist) y por thread, que reutiliza:
+- la sesión HTTP y el cookiejar
+- las instancias de extractores ya inicializadas
+- el estado de YouTube (player JS descargado, etc.)
+
+Uso:
+    from ytdlp_engine import get_engine
+    engine = get_engine()
+    videos = engine.flat_playlist(url)                       # [{'id', 'title'}]
+    engine.download_subtitles([(1, 'abc123'), (2, 'def456')], folder)
+    engine.download_audio([('001_Titulo', 'abc123')], folder)            # MP3 128k
+    engine.download_audio([('001_Titulo', 'abc123')], folder, 'opus')    # 16 kHz mono para ASR
+
+Requirements:
+  pip install yt-dlp    (+ ffmpeg en el PATH para extraer audio)
+  YTDLP_COOKIES=cookies.txt  (opcional, archivo de cookies Netscape)
+"""
+
+import os
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+from subtitle_fetcher import RateLimited, is_block_error
+
+COOKIES_FILE = os.getenv("YTDLP_COOKIES")
+AUDIO_CHUNK_BYTES = 10 * 1024 * 1024   # Pedidos HTTP de 10 MB: un corte sólo pierde el bloque en curso
+
+# Formatos de descarga de audio: (extensión, args de codificación de ffmpeg)
+# Los "ASR" ya salen a 16 kHz mono (lo que usa Whisper), así el transcriptor
+# no re-muestrea y los archivos pesan menos para subirlos al servidor:
+#   mp3  128 kbps estéreo  ~58 MB/hora (escucha)
+#   opus  24 kbps 16k mono ~11 MB/hora
+#   flac  sin pérdida 16k  ~25 MB/hora
+#   wav   PCM s16 16k mono ~115 MB/hora (se lee sin ffmpeg)
+# Siempre se re-codifica (_AudioEncodePP): FFmpegExtractAudio hace una copia
+# del stream cuando el codec ya coincide (el bestaudio de YouTube suele ser
+# opus) y ahí se pierden el bitrate y el re-muestreo
+ASR_ARGS = ['-ar', '16000', '-ac', '1']
+AUDIO_FORMATS = {
+    'mp3': ('mp3', ['-c:a', 'libmp3lame', '-b:a', '128k']),
+    'opus': ('opus', ['-c:a', 'libopus', '-b:a', '24k'] + ASR_ARGS),
+    'flac': ('flac', ['-c:a', 'flac', '-sample_fmt', 's16'] + ASR_ARGS),
+    'wav': ('wav', ['-c:a', 'pcm_s16le'] + ASR_ARGS),
+}
+
+def _audio_encoder(audio_format: str):
+    """Postprocesador de yt-dlp que SIEMPRE codifica al formato pedido (nunca copia el stream)"""
+    from yt_dlp.postprocessor import FFmpegPostProcessor
+    from yt_dlp.utils import prepend_extension, replace_extension
+
+    extension, encode_args = AUDIO_FORMATS[audio_format]
+
+    class _AudioEncodePP(FFmpegPostProcessor):
+        def run(self, info):
+            path = info['filepath']
+            new_path = replace_extension(path, extension, info['ext'])
+            temp_path = prepend_extension(new_path, 'temp')
+            self.to_screen(f'Encoding audio to {audio_format}: {new_path}')
+            self.run_ffmpeg(path, temp_path, ['-vn', *encode_args])
+            os.replace(temp_path, new_path)
+            info['filepath'], info['ext'] = new_path, extension
+            return ([path] if path != new_path else []), info
+
+    return _AudioEncodePP()
+
+class _Logger:
+    """Guarda el último warning/error en vez de imprimir todo el log de yt-dlp"""
+
+    def __init__(self):
+        self.last_message = ""
+
+    def debug(self, msg):
+        pass
+
+    def info(self, msg):
+        pass
+
+    def warning(self, msg):
+        self.last_message = msg
+
+    def error(self, msg):
+        self.last_message = msg
+
+class YtDlpEngine:
+    """YoutubeDL reutilizable por perfil y por thread (YoutubeDL no es thread-safe)"""
+
+    def __init__(self, cookiefile: Optional[str] = COOKIES_FILE):
+        self.cookiefile = cookiefile
+        self._local = threading.local()
+
+    def _base_params(self) -> Dict[str, Any]:
+        params = {
+            'quiet': True,
+            'no_warnings': False,
+            'noprogress': True,
+            'ignoreerrors': False,
+            'retries': 3,
+            'socket_timeout': 30,
+        }
+        if self.cookiefile:
+            params['cookiefile'] = self.cookiefile
+        return params
+
+    def _ydl(self, profile: str, setup: Optional[Callable] = None, **params):
+        """YoutubeDL del perfil para este thread (se crea una sola vez; setup(ydl) al crearlo)"""
+        import yt_dlp
+
+        instances = getattr(self._local, 'instances', None)
+        if instances is None:
+            instances = self._local.instances = {}
+        if profile not in instances:
+            logger = _Logger()
+            options = {**self._base_params(), **params, 'logger': logger}
+            ydl = yt_dlp.YoutubeDL(options)
+            if setup:
+                setup(ydl)
+            instances[profile] = (ydl, logger)
+        return instances[profile]
+
+    @staticmethod
+    def _set_output(ydl, output_dir: Path, template: str):
+        """Cambia carpeta y nombre de salida sin recrear el YoutubeDL"""
+        ydl.params['paths'] = {'home': str(output_dir)}
+        ydl.params['outtmpl']['default'] = template
+
+    def _run(self, ydl, logger: _Logger, url: str, download: bool = True) -> Tuple[Optional[Dict], str]:
+        """extract_info con errores como mensaje (y RateLimited ante 429)"""
+        from yt_dlp.utils import DownloadError
+
+        logger.last_message = ""
+        try:
+            return ydl.extract_info(url, download=download), ""
+        except DownloadError as e:
+            if is_block_error(e):
+                raise RateLimited(str(e)) from e
+            return None, str(e)
+
+    def flat_playlist(self, playlist_url: str) -> List[Dict[str, str]]:
+        """[{'id', 'title'}] de una playlist sin resolver cada video"""
+        ydl, logger = self._ydl('playlist', extract_flat='in_playlist', skip_download=True)
+        info, error = self._run(ydl, logger, playlist_url, download=False)
+        if not info:
+            print(f"Error fetching playlist: {error[:100]}")
+            return []
+        return [{'id': entry.get('id'), 'title': entry.get('title') or 'Unknown Title'}
+                for entry in info.get('entries') or [] if entry and entry.get('id')]
+
+    def download_subtitles(self, videos: List[Tuple[int, str]], output_dir: Path,
+                           lang: str = 'es', fmt: str = 'json3') -> List[Tuple[bool, str]]:
+        """Subtítulos automáticos de [(índice, video_id)] como {índice:03d}_{título}.{lang}.{fmt}"""
+        ydl, logger = self._ydl(
+            f'subs-{lang}-{fmt}',
+            skip_download=True,
+            writeautomaticsub=True,
+            subtitleslangs=[lang],
+            subtitlesformat=fmt,
+        )
+        results = []
+        for index, video_id in videos:
+            self._set_output(ydl, output_dir, f"{index:03d}_%(title)s.%(ext)s")
+            info, error = self._run(ydl, logger, f"https://www.youtube.com/watch?v={video_id}")
+            if info is None:
+                results.append((False, error[:100] or logger.last_message[:100]))
+            elif not info.get('requested_subtitles'):
+                results.append((False, "No subtitles available"))
+            else:
+                results.append((True, "Success"))
+        return results
+
+    def download_audio(self, videos: List[Tuple[str, str]], output_dir: Path,
+                       audio_format: str = 'mp3') -> List[Tuple[bool, str]]:
+        """Audio de [(nombre_sin_extensión, video_id)] en uno de AUDIO_FORMATS"""
+        ydl, logger = self._ydl(
+            f'audio-{audio_format}',
+            setup=lambda ydl: ydl.add_post_processor(_audio_encoder(audio_format), when='post_process'),
+            format='bestaudio/best',
+            noplaylist=True,
+            # Reanudación: el .part queda en disco y el siguiente intento
+            # continúa con un Range desde el último byte (no desde cero)
+            continuedl=True,
+            nopart=False,
+            http_chunk_size=AUDIO_CHUNK_BYTES,
+            retries=10,
+            fragment_retries=10,
+        )
+        results = []
+        for name, video_id in videos:
+            self._set_output(ydl, output_dir, f"{name}.%(ext)s")
+            info, error = self._run(ydl, logger, f"https://www.youtube.com/watch?v={video_id}")
+            results.append((True, "Success") if info else (False, error[:100] or logger.last_message[:100]))
+        return results
+
+_engine: Optional[YtDlpEngine] = None
+_engine_lock = threading.Lock()
+
+def get_engine() -> YtDlpEngine:
+    """Motor compartido por todo el proceso"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = YtDlpEngine()
+        return _engine
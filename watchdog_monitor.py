@@ -12,6 +12,9 @@ import os
 from datetime import datetime
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent / 'scripts'))
+from manifest_index import total_processed
+
 # Configuración
 CHECK_INTERVAL_SECONDS = 300  # 5 minutos
 LOG_FILE = Path('logs/watchdog.log')
@@ -53,11 +56,8 @@ def is_process_running():
         return False
 
 def count_processed_files():
-    """Cuenta archivos procesados"""
-    output_dir = Path('contenido_procesado')
-    if not output_dir.exists():
-        return 0
-    return len(list(output_dir.glob('*_extracted.json')))
+    """Cuenta archivos procesados (desde el manifest, sin glob)"""
+    return total_processed()
 
 def restart_process():
     """Reinicia el master processor"""